@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import logging
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.s3.transfer import TransferConfig
+
+MB = 1024 * 1024
+
+
+class PreparedArtifact(object):
+    """Memory mapped artifact cut in upload parts.
+
+    Holds everything the upload needs: the SHA-256 of the whole file and the MD5
+    of every part, so parts are sent straight from the mapping with their
+    Content-MD5 and nothing is read or hashed again.
+    """
+
+    def __init__(self, filename, part_size):
+        self.filename = filename
+        self.part_size = part_size
+        self.size = os.path.getsize(filename)
+        self.mtime = os.path.getmtime(filename)
+        self.sha256 = None
+        self.part_md5s = []
+        self.__file = open(filename, 'rb')
+        # mmap can not map empty files
+        self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    @property
+    def parts_count(self):
+        return max(1, (self.size + self.part_size - 1) // self.part_size)
+
+    def body(self):
+        """The whole artifact, for the uploads below the multipart threshold"""
+        return self.__data[:]
+
+    def part(self, part_number):
+        offset = (part_number - 1) * self.part_size
+        return self.__data[offset:offset + self.part_size]
+
+    def hash_part(self, part_number, digest):
+        """Feeds a part to a hashlib object without copying it out of the mapping"""
+        offset = (part_number - 1) * self.part_size
+        with memoryview(self.__data) as view, view[offset:offset + self.part_size] as chunk:
+            digest.update(chunk)
+        return digest
+
+    def part_content_md5(self, part_number):
+        return base64.b64encode(self.part_md5s[part_number - 1]).decode('ascii')
+
+    def part_etag(self, part_number):
+        """ETag S3 gives to this part once uploaded"""
+        return '"%s"' % (self.part_md5s[part_number - 1].hex())
+
+    def close(self):
+        if self.size:
+            self.__data.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ArtifactPipeline(object):
+    """Single pass artifact preparation.
+
+    The file is memory mapped and read once: the SHA-256 of the whole file is
+    computed in order while the MD5 of every part is computed on a thread pool
+    (hashlib releases the GIL). The prepared artifact then feeds the upload
+    directly, no temporary file is written.
+    """
+
+    def __init__(self, config=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.config = config or TransferConfig()
+
+    def prepare(self, filename):
+        start = time.time()
+        artifact = PreparedArtifact(filename, self.config.multipart_chunksize)
+        try:
+            sha256 = hashlib.sha256()
+            with ThreadPoolExecutor(max_workers=self.config.max_concurrency) as executor:
+                futures = [
+                    executor.submit(artifact.hash_part, part_number, hashlib.md5())
+                    for part_number in range(1, artifact.parts_count + 1)
+                ]
+                for part_number in range(1, artifact.parts_count + 1):
+                    artifact.hash_part(part_number, sha256)
+                artifact.part_md5s = [future.result().digest() for future in futures]
+            artifact.sha256 = sha256.hexdigest()
+        except Exception:
+            artifact.close()
+            raise
+
+        elapsed = time.time() - start
+        self.logger.info("prepared %s: %.2f MB in %.2f s (%.2f MB/s), sha256 %s"
+                         % (filename, artifact.size / MB, elapsed,
+                            artifact.size / MB / max(elapsed, 1e-6), artifact.sha256))
+        return artifact
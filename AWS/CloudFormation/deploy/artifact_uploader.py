@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+MB = 1024 * 1024
+
+
+class ArtifactUploader(object):
+    """Multipart, parallel and resumable S3 upload.
+
+    Part size, multipart threshold and number of threads are taken from a
+    boto3.s3.transfer.TransferConfig. Files and parts are sent straight from a
+    PreparedArtifact together with their Content-MD5. Every completed part is
+    recorded in a local manifest next to the uploaded file, so an interrupted
+    upload is resumed from the parts already stored in S3 instead of starting
+    from scratch.
+    """
+
+    MANIFEST_SUFFIX = '.upload-manifest.json'
+
+    def __init__(self, s3_client, config=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.s3_client = s3_client
+        self.config = config or TransferConfig()
+
+    def is_uploaded(self, bucket, key, sha256):
+        """True when s3://bucket/key already holds an object with this content hash"""
+        try:
+            response = self.s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError as err:
+            if err.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return response.get('Metadata', {}).get('sha256') == sha256
+
+    def upload(self, artifact, bucket, key, extra_args=None):
+        """Uploads a PreparedArtifact to s3://bucket/key"""
+        extra_args = extra_args or {}
+        start = time.time()
+
+        if artifact.size < self.config.multipart_threshold:
+            self.__upload_single(artifact, bucket, key, extra_args)
+        else:
+            self.__upload_multipart(artifact, bucket, key, extra_args)
+
+        self.__log_throughput('upload s3://%s/%s' % (bucket, key), artifact.size, time.time() - start)
+
+    def __upload_single(self, artifact, bucket, key, extra_args):
+        """One PutObject straight from the mapping of the PreparedArtifact, the file is not read again"""
+        arguments = dict(extra_args)
+        # Below the threshold the artifact is usually one part, whose MD5 is already known
+        if artifact.parts_count == 1:
+            arguments['ContentMD5'] = artifact.part_content_md5(1)
+        self.s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=artifact.body(),
+            **arguments
+        )
+
+    def __upload_multipart(self, artifact, bucket, key, extra_args):
+        manifest_name = artifact.filename + self.MANIFEST_SUFFIX
+        manifest = self.__load_manifest(manifest_name, artifact, bucket, key)
+
+        if manifest is None:
+            upload_id = self.s3_client.create_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                **extra_args
+            )['UploadId']
+            manifest = {
+                'bucket': bucket,
+                'key': key,
+                'upload_id': upload_id,
+                'size': artifact.size,
+                'mtime': artifact.mtime,
+                'part_size': artifact.part_size,
+                'parts': {}
+            }
+            self.__save_manifest(manifest_name, manifest)
+        else:
+            self.logger.info("resuming upload %s: %d parts already uploaded"
+                             % (manifest['upload_id'], len(manifest['parts'])))
+
+        upload_id = manifest['upload_id']
+        parts_count = artifact.parts_count
+        pending = [part_number for part_number in range(1, parts_count + 1)
+                   if str(part_number) not in manifest['parts']]
+
+        with ThreadPoolExecutor(max_workers=self.config.max_concurrency) as executor:
+            futures = [
+                executor.submit(self.__upload_part, artifact, bucket, key, upload_id, part_number)
+                for part_number in pending
+            ]
+            # The manifest is only written from this thread, no locking required.
+            errors = []
+            for future in as_completed(futures):
+                try:
+                    part_number, etag = future.result()
+                except Exception as err:
+                    errors.append(err)
+                    continue
+                manifest['parts'][str(part_number)] = etag
+                self.__save_manifest(manifest_name, manifest)
+
+        if errors:
+            self.logger.error("upload %s interrupted, run again to resume it" % (upload_id))
+            raise errors[0]
+
+        self.s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                'Parts': [
+                    {'PartNumber': part_number, 'ETag': manifest['parts'][str(part_number)]}
+                    for part_number in range(1, parts_count + 1)
+                ]
+            }
+        )
+        os.remove(manifest_name)
+
+    def __upload_part(self, artifact, bucket, key, upload_id, part_number):
+        body = artifact.part(part_number)
+
+        start = time.time()
+        response = self.s3_client.upload_part(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            ContentMD5=artifact.part_content_md5(part_number),
+            Body=body
+        )
+        self.__log_throughput('part %d' % (part_number), len(body), time.time() - start)
+        return part_number, response['ETag']
+
+    def __load_manifest(self, manifest_name, artifact, bucket, key):
+        """Returns the manifest of an interrupted upload of this very file, or None
+
+        The parts recorded locally are reconciled with the ones S3 really has, as the
+        process may have died between uploading a part and writing the manifest. Parts
+        whose ETag does not match the local MD5 are uploaded again.
+        """
+        if not os.path.exists(manifest_name):
+            return None
+
+        with open(manifest_name) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        if (
+            manifest['bucket'] != bucket or manifest['key'] != key or
+            manifest['size'] != artifact.size or manifest['mtime'] != artifact.mtime or
+            manifest['part_size'] != artifact.part_size
+        ):
+            self.logger.info("discarding stale manifest %s" % (manifest_name))
+            self.__abort(manifest)
+            return None
+
+        try:
+            parts = {}
+            paginator = self.s3_client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=manifest['upload_id']):
+                for part in page.get('Parts', []):
+                    if part['ETag'] == artifact.part_etag(part['PartNumber']):
+                        parts[str(part['PartNumber'])] = part['ETag']
+        except ClientError as err:
+            self.logger.info("can not resume upload %s: %s" % (manifest['upload_id'], err))
+            return None
+
+        manifest['parts'] = parts
+        return manifest
+
+    def __abort(self, manifest):
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=manifest['bucket'],
+                Key=manifest['key'],
+                UploadId=manifest['upload_id']
+            )
+        except ClientError as err:
+            self.logger.info("can not abort upload %s: %s" % (manifest['upload_id'], err))
+
+    @staticmethod
+    def __save_manifest(manifest_name, manifest):
+        tmp_name = manifest_name + '.tmp'
+        with open(tmp_name, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(tmp_name, manifest_name)
+
+    def __log_throughput(self, what, size, elapsed):
+        self.logger.info("%s: %.2f MB in %.2f s (%.2f MB/s)"
+                         % (what, size / MB, elapsed, size / MB / max(elapsed, 1e-6)))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+NO_CHANGES_REASONS = ("didn't contain changes", 'No updates are to be performed')
+THROTTLING_ERROR_CODES = ('Throttling', 'ThrottlingException', 'RequestLimitExceeded')
+
+CHANGE_SET_PENDING_STATUSES = ('CREATE_PENDING', 'CREATE_IN_PROGRESS')
+STACK_SUCCESS_STATUSES = ('CREATE_COMPLETE', 'UPDATE_COMPLETE', 'IMPORT_COMPLETE')
+STACK_FAILURE_STATUSES = ('CREATE_FAILED', 'ROLLBACK_COMPLETE', 'ROLLBACK_FAILED',
+                          'UPDATE_ROLLBACK_COMPLETE', 'UPDATE_ROLLBACK_FAILED',
+                          'IMPORT_ROLLBACK_COMPLETE', 'IMPORT_ROLLBACK_FAILED',
+                          'DELETE_COMPLETE', 'DELETE_FAILED')
+
+
+class Backoff(object):
+    """Adaptive exponential backoff with full jitter.
+
+    Every poll without news doubles the delay up to cap, a throttled call
+    doubles it twice, and news resets it to base. The jitter spreads the calls
+    of many runners deploying at the same time.
+    """
+
+    def __init__(self, base=2.0, cap=60.0):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def delay(self):
+        return random.uniform(self.base, min(self.cap, self.base * 2 ** self.attempt))
+
+    def wait(self, throttled=False):
+        time.sleep(self.delay())
+        self.attempt += 2 if throttled else 1
+
+    def reset(self):
+        self.attempt = 0
+
+
+class ChangeSetWaiter(object):
+    """Waits for a change set and streams the events of its execution
+
+    It is the same as running these commands from console, without hammering
+    the CloudFormation API:
+    aws cloudformation wait change-set-create-complete --change-set-name ARN
+    aws cloudformation execute-change-set --change-set-name ARN
+    aws cloudformation describe-stack-events --stack-name TropoLambdaGus
+    """
+
+    def __init__(self, cloudformation_client, backoff=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cloudformation_client = cloudformation_client
+        self.backoff = backoff or Backoff()
+
+    def wait_for_change_set(self, change_set_id):
+        """Polls the change set until it is ready
+
+        :return: the last describe_change_set response
+        """
+        self.backoff.reset()
+        while True:
+            response = self.__call(self.cloudformation_client.describe_change_set,
+                                   ChangeSetName=change_set_id)
+            if response is None or response['Status'] in CHANGE_SET_PENDING_STATUSES:
+                self.backoff.wait(throttled=response is None)
+                continue
+
+            self.__report("change set %s: %s %s"
+                          % (change_set_id, response['Status'], response.get('StatusReason', '')))
+            return response
+
+    @staticmethod
+    def has_no_changes(change_set):
+        """A change set without changes fails, but there is nothing wrong with the stack"""
+        return any(reason in change_set.get('StatusReason', '') for reason in NO_CHANGES_REASONS)
+
+    def execute(self, change_set_id, stack_name):
+        """Executes the change set and streams the stack events until the stack settles
+
+        :return: True when the stack reached a successful status
+        """
+        last_event_id = self.__latest_event_id(stack_name)
+        self.cloudformation_client.execute_change_set(ChangeSetName=change_set_id)
+
+        self.backoff.reset()
+        while True:
+            events = self.__new_events(stack_name, last_event_id)
+            if events is None:
+                self.backoff.wait(throttled=True)
+                continue
+
+            for event in events:
+                self.__report("%s %s %s %s %s" % (event['Timestamp'], event['LogicalResourceId'],
+                                                  event['ResourceType'], event['ResourceStatus'],
+                                                  event.get('ResourceStatusReason', '')))
+                last_event_id = event['EventId']
+                if (
+                    event['ResourceType'] == 'AWS::CloudFormation::Stack' and
+                    event['LogicalResourceId'] == stack_name
+                ):
+                    if event['ResourceStatus'] in STACK_SUCCESS_STATUSES:
+                        return True
+                    if event['ResourceStatus'] in STACK_FAILURE_STATUSES:
+                        return False
+
+            if events:
+                self.backoff.reset()
+            self.backoff.wait()
+
+    def __latest_event_id(self, stack_name):
+        while True:
+            response = self.__call(self.cloudformation_client.describe_stack_events, StackName=stack_name)
+            if response is not None:
+                events = response['StackEvents']
+                return events[0]['EventId'] if events else None
+            self.backoff.wait(throttled=True)
+
+    def __new_events(self, stack_name, last_event_id):
+        """Events newer than last_event_id, oldest first. None when throttled
+
+        describe_stack_events returns the newest events first, so pages are only
+        fetched until the last seen event shows up.
+        """
+        events = []
+        kwargs = {'StackName': stack_name}
+        while True:
+            response = self.__call(self.cloudformation_client.describe_stack_events, **kwargs)
+            if response is None:
+                return None
+            for event in response['StackEvents']:
+                if event['EventId'] == last_event_id:
+                    return list(reversed(events))
+                events.append(event)
+            if 'NextToken' not in response:
+                return list(reversed(events))
+            kwargs['NextToken'] = response['NextToken']
+
+    def __report(self, message):
+        """To the log file and to the operator watching the console"""
+        self.logger.info(message)
+        print(message)
+
+    def __call(self, method, **kwargs):
+        """Calls the API. Returns None when throttled"""
+        try:
+            return method(**kwargs)
+        except ClientError as err:
+            if not self.__is_throttling(err):
+                raise
+            self.logger.info("throttled: %s" % (err))
+            return None
+
+    @staticmethod
+    def __is_throttling(err):
+        return err.response['Error']['Code'] in THROTTLING_ERROR_CODES
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+CACHE_DIR = os.environ.get('CLOUDFORMATION_TEMPLATE_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'cloudformation-deployed'))
+
+
+def _stack_version(stack):
+    """Changes with every update of the stack, from this runner, the console or anyone else"""
+    return '%s %s' % (stack['StackId'], stack.get('LastUpdatedTime', stack['CreationTime']))
+
+
+class DeployedTemplates(object):
+    """Template and parameter values currently deployed in every stack
+
+    The parameter values come from describe_stacks. The template is kept in a
+    local file per stack, written after every successful deployment, along with
+    the LastUpdatedTime of the stack. When the stack was updated since (console,
+    another operator), the template is fetched again with get_template.
+    """
+
+    def __init__(self, cloudformation_client, cache_dir=CACHE_DIR):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cloudformation_client = cloudformation_client
+        self.cache_dir = cache_dir
+
+    def get(self, stack_name):
+        """:return: (template, parameters) or (None, None) when the stack is not deployed"""
+        stack = self.__describe(stack_name)
+        # A stack whose first change set was never executed has nothing deployed
+        if stack is None or stack['StackStatus'] == 'REVIEW_IN_PROGRESS':
+            return None, None
+        parameters = dict((parameter['ParameterKey'], parameter.get('ParameterValue'))
+                          for parameter in stack.get('Parameters', []))
+
+        cached = self.__load(stack_name)
+        if cached is not None and cached.get('version') == _stack_version(stack):
+            return cached['template'], parameters
+
+        self.logger.info("%s changed since it was cached, fetching its template" % (stack_name))
+        template = self.cloudformation_client.get_template(StackName=stack_name)['TemplateBody']
+        if not isinstance(template, dict):
+            template = json.loads(template)
+        self.__store(stack_name, _stack_version(stack), template)
+        return template, parameters
+
+    def put(self, stack_name, template):
+        """Stores the template just deployed"""
+        stack = self.__describe(stack_name)
+        if stack is not None:
+            self.__store(stack_name, _stack_version(stack), template)
+
+    def __describe(self, stack_name):
+        try:
+            return self.cloudformation_client.describe_stacks(StackName=stack_name)['Stacks'][0]
+        except ClientError as err:
+            if 'does not exist' in err.response['Error']['Message']:
+                return None
+            raise
+
+    def __load(self, stack_name):
+        try:
+            with open(self.__cache_file(stack_name)) as cached:
+                return json.load(cached)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def __store(self, stack_name, version, template):
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        tmp_file = self.__cache_file(stack_name) + '.tmp'
+        with open(tmp_file, 'w') as cached:
+            json.dump({'version': version, 'template': template}, cached)
+        os.replace(tmp_file, self.__cache_file(stack_name))
+
+    def __cache_file(self, stack_name):
+        return os.path.join(self.cache_dir, stack_name + '.json')
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+# Template sections whose entries are compared one by one
+KEYED_SECTIONS = ('Parameters', 'Mappings', 'Conditions', 'Resources', 'Outputs')
+
+
+def subtree_hash(value):
+    """Hash of the canonical JSON of a template subtree"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class TemplateDiff(object):
+    """Structural diff between two templates, given as dicts
+
+    Entries of every section are compared by the hash of their subtree, so only
+    the modified resources are walked, property by property. Parameter values
+    are compared too: a new KeyName is a change even with the same template.
+    """
+
+    def __init__(self, old_template, new_template, old_parameters=None, new_parameters=None):
+        self.changes = []
+        old_template = old_template or {}
+
+        if subtree_hash(old_template) != subtree_hash(new_template):
+            self.__diff_templates(old_template, new_template)
+        if (old_parameters or {}) != (new_parameters or {}):
+            for name in sorted(set(old_parameters or {}) | set(new_parameters or {})):
+                if (old_parameters or {}).get(name) != (new_parameters or {}).get(name):
+                    self.changes.append(('Modify', 'ParameterValues', name, None))
+
+    @property
+    def is_empty(self):
+        return not self.changes
+
+    def __diff_templates(self, old_template, new_template):
+        for section in sorted(set(old_template) | set(new_template)):
+            old_section = old_template.get(section)
+            new_section = new_template.get(section)
+            if section not in KEYED_SECTIONS:
+                if subtree_hash(old_section) != subtree_hash(new_section):
+                    self.changes.append(('Modify', section, None, None))
+                continue
+
+            old_section = old_section or {}
+            new_section = new_section or {}
+            old_hashes = dict((name, subtree_hash(value)) for name, value in old_section.items())
+            new_hashes = dict((name, subtree_hash(value)) for name, value in new_section.items())
+            for name in sorted(set(old_hashes) | set(new_hashes)):
+                if name not in new_hashes:
+                    self.changes.append(('Remove', section, name, None))
+                elif name not in old_hashes:
+                    self.changes.append(('Add', section, name, None))
+                elif old_hashes[name] != new_hashes[name]:
+                    self.changes.append(('Modify', section, name,
+                                         self.__modified_keys(old_section[name], new_section[name])))
+
+    @staticmethod
+    def __modified_keys(old_entry, new_entry):
+        """Modified attributes of an entry, and of its Properties for resources"""
+        if not isinstance(old_entry, dict) or not isinstance(new_entry, dict):
+            return None
+        keys = []
+        for key in sorted(set(old_entry) | set(new_entry)):
+            old_value = old_entry.get(key)
+            new_value = new_entry.get(key)
+            if key == 'Properties' and isinstance(old_value, dict) and isinstance(new_value, dict):
+                keys.extend('Properties.' + name for name in sorted(set(old_value) | set(new_value))
+                            if subtree_hash(old_value.get(name)) != subtree_hash(new_value.get(name)))
+            elif subtree_hash(old_value) != subtree_hash(new_value):
+                keys.append(key)
+        return keys
+
+    def __str__(self):
+        lines = []
+        for action, section, name, keys in self.changes:
+            line = '%s %s' % (action, section)
+            if name:
+                line += ' ' + name
+            if keys:
+                line += ' (%s)' % (', '.join(keys))
+            lines.append(line)
+        return '\n'.join(lines) if lines else 'No changes'
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+# Biggest TemplateBody accepted by CloudFormation. Bigger templates go through S3 (TemplateURL).
+TEMPLATE_BODY_LIMIT = 51200
+
+
+def minify(template):
+    """Compact JSON of a template dict: no indentation, no spaces after separators"""
+    return json.dumps(template, sort_keys=True, separators=(',', ':'))
+
+
+class TemplateSize(object):
+    """Size of the minified template and how much every resource contributes"""
+
+    def __init__(self, template):
+        self.body = minify(template)
+        self.size = len(self.body.encode('utf-8'))
+        self.sha256 = hashlib.sha256(self.body.encode('utf-8')).hexdigest()
+        self.resource_sizes = sorted(
+            ((len(minify(resource).encode('utf-8')), name)
+             for name, resource in template.get('Resources', {}).items()),
+            reverse=True
+        )
+
+    @property
+    def fits_inline(self):
+        return self.size <= TEMPLATE_BODY_LIMIT
+
+    def __str__(self):
+        lines = ['template: %d bytes (%.1f%% of the %d bytes TemplateBody limit)'
+                 % (self.size, 100.0 * self.size / TEMPLATE_BODY_LIMIT, TEMPLATE_BODY_LIMIT)]
+        for size, name in self.resource_sizes:
+            lines.append('  %-40s %8d bytes %5.1f%%' % (name, size, 100.0 * size / self.size))
+        return '\n'.join(lines)
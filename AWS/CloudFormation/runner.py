@@ -3,17 +3,23 @@
 
 import os
 import sys
+import json
 import getopt
-import boto3
 import logging
-from templates.lambdas.LambdaTemplate import LambdaTemplate
+
+# boto3, troposphere and the deploy modules are imported where they are used:
+# usage() must not pay for them.
 
 
 class Runner(object):
 
     def __init__(self, stack_name, key_name, change_set_name,
                  token, description, operation,
-                 bucket_name, filename):
+                 bucket_name, filename, transfer_config=None,
+                 wait=False, execute=False, force=False, performance_profile='default',
+                 subnet_ids='', security_group_ids='', event_source=None):
+        from boto3.s3.transfer import TransferConfig
+
         self.logger = logging.getLogger(self.__class__.__name__)
 
         self.stack_name = stack_name
@@ -24,6 +30,14 @@ class Runner(object):
         self.operation = operation
         self.bucket_name = bucket_name
         self.filename = filename
+        self.transfer_config = transfer_config or TransferConfig()
+        self.wait = wait or execute
+        self.execute = execute
+        self.force = force
+        self.performance_profile = performance_profile
+        self.subnet_ids = subnet_ids
+        self.security_group_ids = security_group_ids
+        self.event_source = event_source
 
         self.logger.info("stack_name: %s" % (self.stack_name))
         self.logger.info("key_name: %s" % (self.key_name))
@@ -33,6 +47,15 @@ class Runner(object):
         self.logger.info("operation: %s" % (self.operation))
         self.logger.info("bucket_name: %s" % (self.bucket_name))
         self.logger.info("filename: %s" % (self.filename))
+        self.logger.info("part_size: %d" % (self.transfer_config.multipart_chunksize))
+        self.logger.info("max_concurrency: %d" % (self.transfer_config.max_concurrency))
+        self.logger.info("wait: %s" % (self.wait))
+        self.logger.info("execute: %s" % (self.execute))
+        self.logger.info("force: %s" % (self.force))
+        self.logger.info("performance_profile: %s" % (self.performance_profile))
+        self.logger.info("subnet_ids: %s" % (self.subnet_ids))
+        self.logger.info("security_group_ids: %s" % (self.security_group_ids))
+        self.logger.info("event_source: %s" % (self.event_source))
 
     def _upload_file(self):
         """Uploads file to S3
@@ -41,19 +64,68 @@ class Runner(object):
         aws s3 cp --storage-class STANDARD --no-guess-mime-type --content-type application/x-java-archive
                   target/aws-example-lambda-1.0-SNAPSHOT-jar-with-dependencies.jar s3://guslambda
                 --grants full=id=CANONICAL_ID
+
+        Big files are uploaded in parallel parts and an interrupted upload is resumed
+        by the next run. See ArtifactUploader.
+
+        The key is content addressed (name-SHA256.extension) and the upload is skipped
+        when the bucket already holds those bytes. The file is read once, see
+        ArtifactPipeline.
+
+        :return: the S3 key of the artifact
         """
-        key = os.path.basename(self.filename)
-        self.logger.info("key: %s" % (key))
-
-        with open(self.filename, 'rb') as data:
-            s3_client = boto3.client('s3')
-            s3_client.upload_fileobj(
-                Fileobj=data,
-                Bucket=self.bucket_name,
-                Key=key
-            )
-
-    def _create_change_set(self):
+        import boto3
+        from deploy.artifact_pipeline import ArtifactPipeline
+        from deploy.artifact_uploader import ArtifactUploader
+
+        with ArtifactPipeline(self.transfer_config).prepare(self.filename) as artifact:
+            name, extension = os.path.splitext(os.path.basename(self.filename))
+            key = '%s-%s%s' % (name, artifact.sha256, extension)
+            self.logger.info("key: %s" % (key))
+
+            uploader = ArtifactUploader(boto3.client('s3'), self.transfer_config)
+            if uploader.is_uploaded(self.bucket_name, key, artifact.sha256):
+                self.logger.info("s3://%s/%s is up to date, skipping upload" % (self.bucket_name, key))
+            else:
+                uploader.upload(artifact, self.bucket_name, key, {'Metadata': {'sha256': artifact.sha256}})
+
+        return key
+
+    def _template(self, key):
+        from templates.lambdas.LambdaTemplate import LambdaTemplate
+        from templates.lambdas.performance_profile import performance_profile
+        from templates.lambdas.sqs_event_source import event_source
+
+        lambda_template = LambdaTemplate('LambdaTemplate: tropo + boto3',
+                                         s3_bucket=self.bucket_name, s3_key=key,
+                                         profile=performance_profile(self.performance_profile),
+                                         vpc=bool(self.subnet_ids),
+                                         event_source=(event_source(**self.event_source)
+                                                       if self.event_source is not None else None))
+        return lambda_template.do_template()
+
+    def _parameters(self):
+        parameters = {'KeyName': self.key_name}
+        if self.subnet_ids:
+            parameters['SubnetIds'] = self.subnet_ids
+            parameters['SecurityGroupIds'] = self.security_group_ids
+        return parameters
+
+    def _diff(self, template_body):
+        """Diff between the deployed template and template_body, computed locally
+
+        See DeployedTemplates about where the deployed template comes from.
+        """
+        import boto3
+        from deploy.deployed_templates import DeployedTemplates
+        from deploy.template_diff import TemplateDiff
+
+        deployed_template, deployed_parameters = DeployedTemplates(
+            boto3.client('cloudformation')).get(self.stack_name)
+        return TemplateDiff(deployed_template, json.loads(template_body),
+                            deployed_parameters, self._parameters())
+
+    def _create_change_set(self, template_body):
         """Creates change set
 
         It is the same as running this command from console:
@@ -62,19 +134,19 @@ class Runner(object):
                                              --change-set-name TropoLambdaGus-changeset-1 --client-token Tropolambda-changeset-1   \
                                              --description 'First change set' --change-set-type CREATE
         """
-        lambda_template = LambdaTemplate('LambdaTemplate: tropo + boto3')
+        import boto3
 
         cloudformation_client = boto3.client('cloudformation')
         return cloudformation_client.create_change_set(
             StackName=self.stack_name,
-            TemplateBody=lambda_template.do_template().to_json(),
             UsePreviousTemplate=False,
             Parameters=[
                 {
-                    'ParameterKey': 'KeyName',
-                    'ParameterValue': self.key_name,
+                    'ParameterKey': name,
+                    'ParameterValue': value,
                     'UsePreviousValue': False
                 }
+                for name, value in sorted(self._parameters().items())
             ],
             Capabilities=[
                 'CAPABILITY_NAMED_IAM',
@@ -82,13 +154,82 @@ class Runner(object):
             ChangeSetName=self.change_set_name,
             ClientToken=self.token,
             Description=self.description,
-            ChangeSetType=self.operation
+            ChangeSetType=self.operation,
+            **self._template_argument(template_body, cloudformation_client.meta.region_name)
         )
 
+    def _template_argument(self, template_body, region_name):
+        """TemplateBody, or TemplateURL when the template is over the TemplateBody limit
+
+        Big templates are uploaded to the bucket under a content hash, once.
+
+        It is the same as running this command from console:
+        aws s3 cp template.json s3://guslambda/templates/TropoLambdaGus-SHA256.json
+        """
+        import boto3
+        from deploy.artifact_uploader import ArtifactUploader
+        from deploy.template_size import TemplateSize
+
+        template_size = TemplateSize(json.loads(template_body))
+        self.logger.info("%s" % (template_size))
+        if template_size.fits_inline:
+            return {'TemplateBody': template_size.body}
+
+        key = 'templates/%s-%s.json' % (self.stack_name, template_size.sha256)
+        s3_client = boto3.client('s3')
+        if ArtifactUploader(s3_client).is_uploaded(self.bucket_name, key, template_size.sha256):
+            self.logger.info("s3://%s/%s is up to date, skipping upload" % (self.bucket_name, key))
+        else:
+            s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=template_size.body.encode('utf-8'),
+                                 ContentType='application/json', Metadata={'sha256': template_size.sha256})
+        return {'TemplateURL': 'https://%s.s3.%s.amazonaws.com/%s' % (self.bucket_name, region_name, key)}
+
+    def _wait_for_change_set(self, change_set_id, template_body):
+        """Waits for the change set and, if required, executes it
+
+        It is the same as running these commands from console:
+        aws cloudformation wait change-set-create-complete --change-set-name ARN
+        aws cloudformation execute-change-set --change-set-name ARN
+        aws cloudformation wait stack-create-complete --stack-name TropoLambdaGus
+
+        :return: exit status, 0 on success
+        """
+        import boto3
+        from deploy.change_set_waiter import ChangeSetWaiter
+        from deploy.deployed_templates import DeployedTemplates
+
+        cloudformation_client = boto3.client('cloudformation')
+        waiter = ChangeSetWaiter(cloudformation_client)
+        change_set = waiter.wait_for_change_set(change_set_id)
+        if change_set['Status'] != 'CREATE_COMPLETE':
+            return 0 if waiter.has_no_changes(change_set) else 1
+
+        if not self.execute:
+            return 0
+
+        if not waiter.execute(change_set_id, self.stack_name):
+            return 1
+
+        DeployedTemplates(cloudformation_client).put(self.stack_name, json.loads(template_body))
+        return 0
+
     def run(self):
-        self._upload_file()
+        key = self._upload_file()
+        template_body = self._template(key).to_json()
+
+        if not self.force:
+            diff = self._diff(template_body)
+            self.logger.info("diff:\n%s" % (diff))
+            print(diff)
+            if diff.is_empty:
+                return 0
 
-        print(self._create_change_set())
+        response = self._create_change_set(template_body)
+        print(response)
+
+        if self.wait:
+            return self._wait_for_change_set(response['Id'], template_body)
+        return 0
 
 
 def usage():
@@ -96,6 +237,10 @@ def usage():
     SYNOPSIS
         runner.py -s stack_name -f file_name -b bucket_name -k key_name
                   -c change_set_name -t token -d description -o operation
+                  [-p part_size] [-j threads] [-P profile]
+                  [-S subnet_ids -G security_group_ids]
+                  [-Q [-B batch_size] [-W batching_window] [-C concurrency] [-R]]
+                  [-w] [-x] [-F]
 
         Where:
             stack_name - Stack name
@@ -107,6 +252,31 @@ def usage():
             description - The change set description
             operation - Create or update change set. Values: CREATE|UPDATE.
                         CREATE by default.
+            part_size - Multipart upload part size in MB. 8 by default.
+            threads - Number of parts uploaded in parallel. 10 by default.
+            profile - Lambda performance profile. Values:
+                      default|snap-start|provisioned. default by default.
+            subnet_ids - Comma separated subnets of the function, one per
+                         availability zone. Without them the function is not
+                         attached to a VPC.
+            security_group_ids - Comma separated security groups of the
+                                 function. Required with subnet_ids.
+            -Q - The function consumes a SQS queue, its visibility timeout is
+                 6 times the function timeout plus the batching window.
+            batch_size - Messages per invocation. 10 by default, up to 10000
+                         with a batching window.
+            batching_window - Seconds to wait for a full batch. 0 by default.
+            concurrency - Maximum concurrent invocations for the queue, from 2
+                          up to 1000. Unlimited by default.
+            -R - The handler returns batchItemFailures: only the failed
+                 messages of a batch are received again. Without it a failed
+                 invocation retries the whole batch.
+            -w - Wait for the change set to be created. Exit status is 0 when
+                 it is ready or has no changes.
+            -x - Wait for the change set, execute it and stream the stack
+                 events. Exit status is 0 when the stack is updated.
+            -F - Create the change set even when the template and parameters
+                 are the same as the deployed ones.
 
     """
     print(usage_string)
@@ -118,7 +288,7 @@ def main():
     logging.basicConfig(filename='output.log', level=logging.DEBUG)
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 's:k:c:t:d:o:b:f:')
+        opts, args = getopt.getopt(sys.argv[1:], 's:k:c:t:d:o:b:f:p:j:P:S:G:QB:W:C:RwxF')
     except getopt.GetoptError as err:
         print(str(err))
         sys.exit(1)
@@ -131,6 +301,19 @@ def main():
     operation = 'CREATE'
     bucket_name = ''
     filename = ''
+    part_size = 8
+    threads = 10
+    profile = 'default'
+    subnet_ids = ''
+    security_group_ids = ''
+    event_source = None
+    batch_size = 10
+    batching_window = 0
+    concurrency = None
+    report_batch_item_failures = False
+    wait = False
+    execute = False
+    force = False
     for o, a in opts:
         if o in ('-s', '--stack-name'):
             stack_name = a
@@ -148,6 +331,32 @@ def main():
             bucket_name = a
         elif o in ('-f', '--filename'):
             filename = a
+        elif o in ('-p', '--part-size'):
+            part_size = int(a)
+        elif o in ('-j', '--threads'):
+            threads = int(a)
+        elif o in ('-P', '--profile'):
+            profile = a
+        elif o in ('-S', '--subnet-ids'):
+            subnet_ids = a
+        elif o in ('-G', '--security-group-ids'):
+            security_group_ids = a
+        elif o in ('-Q', '--queue'):
+            event_source = {}
+        elif o in ('-B', '--batch-size'):
+            batch_size = int(a)
+        elif o in ('-W', '--batching-window'):
+            batching_window = int(a)
+        elif o in ('-C', '--concurrency'):
+            concurrency = int(a)
+        elif o in ('-R', '--report-batch-item-failures'):
+            report_batch_item_failures = True
+        elif o in ('-w', '--wait'):
+            wait = True
+        elif o in ('-x', '--execute'):
+            execute = True
+        elif o in ('-F', '--force'):
+            force = True
         elif o in ('-h', '--help'):
             usage()
         else:
@@ -156,13 +365,29 @@ def main():
     # Options are required
     if (
         not stack_name or not key_name or not change_set_name or not token or
-        not description or not filename or not bucket_name
+        not description or not filename or not bucket_name or
+        bool(subnet_ids) != bool(security_group_ids)
     ):
         usage()
 
-    Runner(stack_name, key_name, change_set_name,
-           token, description, operation,
-           bucket_name, filename).run()
+    if event_source is not None:
+        event_source = {'batch_size': batch_size, 'maximum_batching_window': batching_window,
+                        'maximum_concurrency': concurrency, 'report_batch_item_failures': report_batch_item_failures}
+
+    from boto3.s3.transfer import TransferConfig
+    from deploy.artifact_uploader import MB
+
+    transfer_config = TransferConfig(
+        multipart_threshold=part_size * MB,
+        multipart_chunksize=part_size * MB,
+        max_concurrency=threads
+    )
+
+    sys.exit(Runner(stack_name, key_name, change_set_name,
+                    token, description, operation,
+                    bucket_name, filename, transfer_config,
+                    wait, execute, force, profile,
+                    subnet_ids, security_group_ids, event_source).run())
 
 
 if __name__ == '__main__':
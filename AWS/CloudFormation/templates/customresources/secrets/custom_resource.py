@@ -0,0 +1,158 @@
+import abc
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import httplib2
+
+SUCCESS = 'SUCCESS'
+FAILED = 'FAILED'
+
+# Kept from the time budget of the invocation to send the response after giving up on the work
+RESPONSE_MARGIN_MILLIS = 5000
+# Seconds, the response is a small PUT to S3
+RESPONSE_TIMEOUT = 4
+# Requests remembered by a warm container, CloudFormation and Lambda retries send the same ones again
+MAX_REMEMBERED_REQUESTS = 100
+# PhysicalResourceId of failed creates, their rollback Delete has nothing to delete
+FAILED_CREATE_PREFIX = 'failed-create-'
+
+logger = logging.getLogger()
+
+
+class CustomResource(abc.ABC):
+    """Handler of a CloudFormation custom resource
+
+    Subclasses implement create and, if they need them, update and delete.
+    Create and update return the PhysicalResourceId and the Data of the
+    response. The instance must live at module level, so warm invocations
+    share its HTTP connection to the S3 response endpoint and its memory of
+    requests and data:
+
+    handler = MyResource().handler
+
+    - A repeated RequestId gets the response already sent, without work.
+    - An Update with the same properties gets the last Data of the resource,
+      without work, if this container knows it.
+    - The Delete of a failed Create gets SUCCESS right away.
+    - Work that does not finish within the remaining time of the invocation
+      gets FAILED, instead of holding the stack operation for an hour.
+
+    Resources returning secrets set no_echo, their Data is masked by
+    CloudFormation.
+    """
+
+    no_echo = False
+
+    def __init__(self):
+        self.__http = httplib2.Http(timeout=RESPONSE_TIMEOUT)
+        self.__responses = OrderedDict()
+        self.__data = {}
+
+    @abc.abstractmethod
+    def create(self, event):
+        """Returns the PhysicalResourceId and the Data of the new resource"""
+
+    def update(self, event):
+        """Same as create by default"""
+        return self.create(event)
+
+    def delete(self, event):
+        """Nothing to delete by default"""
+        pass
+
+    def physical_resource_id(self, event):
+        """Stable between invocations, CloudFormation replaces the resource when it changes"""
+        return '%s-%s' % (event['StackId'].split('/')[1], event['LogicalResourceId'])
+
+    def handler(self, event, context):
+        # The event holds the pre-signed response URL and maybe secrets in its properties
+        logger.info('%s %s, request %s' % (event['RequestType'], event['LogicalResourceId'], event['RequestId']))
+
+        response = self.__responses.get(event['RequestId'])
+        if response is None:
+            response = self.__response(event, context)
+            self.__remember(event['RequestId'], response)
+        else:
+            logger.info('request %s already answered' % (event['RequestId']))
+
+        self.__send(event['ResponseURL'], response)
+        return response
+
+    def __response(self, event, context):
+        response = {
+            'StackId': event['StackId'],
+            'RequestId': event['RequestId'],
+            'LogicalResourceId': event['LogicalResourceId'],
+            'PhysicalResourceId': event.get('PhysicalResourceId') or self.physical_resource_id(event),
+            'Status': SUCCESS,
+        }
+        if self.no_echo:
+            response['NoEcho'] = True
+
+        if self.__is_noop(event):
+            data = self.__data.get(response['PhysicalResourceId'])
+            if data:
+                response['Data'] = data
+            return response
+
+        result = {}
+        worker = threading.Thread(target=self.__work, args=(event, result))
+        # A frozen container must not wait for it
+        worker.daemon = True
+        worker.start()
+        worker.join(max(0, context.get_remaining_time_in_millis() - RESPONSE_MARGIN_MILLIS) / 1000.0)
+
+        if worker.is_alive() or 'error' in result:
+            response['Status'] = FAILED
+            response['Reason'] = '%s, see CloudWatch log stream %s' % (result.get('error', 'Timed out'),
+                                                                       context.log_stream_name)
+            if event['RequestType'] == 'Create':
+                response['PhysicalResourceId'] = FAILED_CREATE_PREFIX + event['RequestId']
+        elif result.get('value') is not None:
+            response['PhysicalResourceId'], data = result['value']
+            if data:
+                response['Data'] = data
+            self.__data[response['PhysicalResourceId']] = data
+        return response
+
+    def __is_noop(self, event):
+        if event['RequestType'] == 'Delete':
+            return event['PhysicalResourceId'].startswith(FAILED_CREATE_PREFIX)
+        if event['RequestType'] == 'Update':
+            # Without the Data of the resource its attributes would be lost
+            return event.get('ResourceProperties') == event.get('OldResourceProperties') and \
+                event['PhysicalResourceId'] in self.__data
+        return False
+
+    def __work(self, event, result):
+        try:
+            if event['RequestType'] == 'Create':
+                result['value'] = self.create(event)
+            elif event['RequestType'] == 'Update':
+                result['value'] = self.update(event)
+            else:
+                self.delete(event)
+                self.__data.pop(event.get('PhysicalResourceId'), None)
+        except Exception as exception:
+            logger.exception('%s %s failed' % (event['RequestType'], event['LogicalResourceId']))
+            result['error'] = str(exception)
+
+    def __remember(self, request_id, response):
+        self.__responses[request_id] = response
+        while len(self.__responses) > MAX_REMEMBERED_REQUESTS:
+            self.__responses.popitem(last=False)
+
+    def __send(self, response_url, response):
+        body = json.dumps(response)
+        # The signature of the URL has no content type
+        headers = {
+            'content-type': '',
+            'content-length': str(len(body)),
+        }
+        try:
+            http_response, _ = self.__http.request(response_url, 'PUT', body=body, headers=headers)
+            logger.info('response %s: %s' % (response['Status'], http_response.status))
+        except Exception:
+            logger.exception('sending response %s failed' % (response['Status']))
@@ -1,29 +1,104 @@
 import logging
-from cfnresponse import send, SUCCESS
+import os
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import InvalidRetryConfigurationError
+
+from custom_resource import CustomResource
+from ttl_cache import TTLCache
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Values resolved by this container, whatever the stack asking for them
+CACHE_MAX_SIZE = int(os.environ.get('SECRETS_CACHE_MAX_SIZE', '256'))
+CACHE_TTL = int(os.environ.get('SECRETS_CACHE_TTL', '300'))
+# Names per GetParameters call
+MAX_PARAMETER_NAMES = 10
+# Parallel stack creations throttle Secrets Manager: retries back off and
+# adapt their rate to the throttling.
+try:
+    CLIENT_CONFIG = Config(retries={'max_attempts': 10, 'mode': 'adaptive'})
+except InvalidRetryConfigurationError:
+    # botocore before 1.15, the one pinned in requirements.txt, only has the legacy retries
+    CLIENT_CONFIG = Config(retries={'max_attempts': 10})
+
+_cache = TTLCache(CACHE_MAX_SIZE, CACHE_TTL)
+
+
+class SecretsResource(CustomResource):
+    """Resolves secrets of Secrets Manager and parameters of SSM into the Data of the resource
+
+    Properties:
+        ServiceToken: arn:aws:lambda:eu-west-1:123456789012:function:secrets
+        # Data key: secret id or ARN
+        SecretIds:
+            MasterUserPassword: hive/dev/metastore
+        # Data key: parameter name, SecureString ones are decrypted
+        ParameterNames:
+            DatabasePassword: /hive/dev/metastore/password
+
+    Clients are created on first use, so they can be given, for example
+    ones of a local stand-in like moto.
+    """
+
+    no_echo = True
+
+    def __init__(self, secrets_client=None, ssm_client=None, cache=_cache):
+        super(SecretsResource, self).__init__()
+        self.__secrets_client = secrets_client
+        self.__ssm_client = ssm_client
+        self.__cache = cache
+
+    def create(self, event):
+        properties = event.get('ResourceProperties') or {}
+        data = {}
+        data.update(self.__secret_values(properties.get('SecretIds') or {}))
+        data.update(self.__parameter_values(properties.get('ParameterNames') or {}))
+        return self.physical_resource_id(event), data
+
+    def __secret_values(self, secret_ids):
+        values = {}
+        for key, secret_id in secret_ids.items():
+            value = self.__cache.get(('secretsmanager', secret_id))
+            if value is None:
+                if self.__secrets_client is None:
+                    self.__secrets_client = boto3.client('secretsmanager', config=CLIENT_CONFIG)
+                value = self.__secrets_client.get_secret_value(SecretId=secret_id)['SecretString']
+                self.__cache.put(('secretsmanager', secret_id), value)
+            values[key] = value
+        return values
+
+    def __parameter_values(self, parameter_names):
+        values = {}
+        missing = []
+        for key, name in parameter_names.items():
+            value = self.__cache.get(('ssm', name))
+            if value is None:
+                if name not in missing:
+                    missing.append(name)
+            else:
+                values[key] = value
 
-def handler(event, context):
-    logger.info('got event{}'.format(event))
+        fetched = {}
+        for start in range(0, len(missing), MAX_PARAMETER_NAMES):
+            if self.__ssm_client is None:
+                self.__ssm_client = boto3.client('ssm', config=CLIENT_CONFIG)
+            response = self.__ssm_client.get_parameters(Names=missing[start:start + MAX_PARAMETER_NAMES],
+                                                        WithDecryption=True)
+            if response['InvalidParameters']:
+                raise Exception('Unknown parameters: %s' % (', '.join(response['InvalidParameters'])))
+            for parameter in response['Parameters']:
+                fetched[parameter['Name']] = parameter['Value']
+                self.__cache.put(('ssm', parameter['Name']), parameter['Value'])
 
-    if event['RequestType'] == 'Delete':
-        send(event, context, SUCCESS)
-        return
+        for key, name in parameter_names.items():
+            if key not in values:
+                values[key] = fetched[name]
+        return values
 
-    response = {
-        'StackId': event['StackId'],
-        'RequestId': event['RequestId'],
-        'LogicalResourceId': event['LogicalResourceId'],
-        'RequestId': event['RequestId'],
-        'Status': 'SUCCESS',
-        'Data': {
-            'OutputName1': 'Value1',
-            'OutputName2': 'Value2',
-         }
 
-    }
-    send(response, context, SUCCESS)
-    return response
+# Module level: warm invocations reuse its connections and remember its requests
+handler = SecretsResource().handler
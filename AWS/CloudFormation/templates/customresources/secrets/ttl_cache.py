@@ -0,0 +1,43 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """Values that expire ttl seconds after they were put, the least recently used go first over max_size
+
+    Module level instances live as long as the warm container, they are
+    shared by the invocations of every stack using the function.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__clock = clock
+        self.__values = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """The value of key, None when it is missing or expired"""
+        with self.__lock:
+            entry = self.__values.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.__clock():
+                del self.__values[key]
+                return None
+            # Most recently used at the end
+            del self.__values[key]
+            self.__values[key] = entry
+            return value
+
+    def put(self, key, value):
+        with self.__lock:
+            self.__values.pop(key, None)
+            self.__values[key] = (self.__clock() + self.ttl, value)
+            while len(self.__values) > self.max_size:
+                self.__values.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__values)
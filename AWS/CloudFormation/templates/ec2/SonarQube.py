@@ -7,15 +7,26 @@
 # Debug: python -m pdb SonarQube.py
 #
 
-from troposphere import Parameter, Template, Ref, Tags, Select, GetAZs, Join, Output, GetAtt, Base64
+from troposphere import Parameter, Template, Ref, Tags, Select, GetAZs, Join, Output, GetAtt, Base64, Equals, If, \
+    Not, NoValue
 from troposphere.iam import InstanceProfile, Role
 from troposphere import cloudformation
-from troposphere.rds import DBInstance, DBParameterGroup
+from troposphere.rds import DBParameterGroup
 import troposphere.ec2 as ec2
+import troposphere.rds as rds
 
 SONARQUBE_PATH = '/opt/sonarqube/sonarqube.zip'
 
 
+# troposphere 2.4.9 misses gp3 throughput, the same as Sceptre/templates/storage
+class DBInstance(rds.DBInstance):
+    props = dict(rds.DBInstance.props, StorageThroughput=(int, False))
+
+
+class EBSBlockDevice(ec2.EBSBlockDevice):
+    props = dict(ec2.EBSBlockDevice.props, Throughput=(int, False))
+
+
 t = Template(Description='SonarQube instance')
 t.AWSTemplateFormatVersion = '2010-09-09'
 
@@ -108,12 +119,104 @@ db_storage_size = t.add_parameter(
                 Default='10',
                 Type='Number',
                 MinValue=10,
-                MaxValue=30,
-                ConstraintDescription=('Value between 10Gb and 30Gb'),
+                MaxValue=65536,
+                ConstraintDescription=('Value between 10Gb and 65536Gb'),
                 Description=('Database size in Gb')
             )
         )
 
+# gp2 burst credits run out under sustained load, gp3 has a 3000 IOPS and 125 MiB/s baseline from 20 GiB on
+db_storage_type = t.add_parameter(
+            Parameter(
+                'DBStorageType',
+                Default='gp2',
+                Type='String',
+                AllowedValues=['gp2', 'gp3'],
+                ConstraintDescription=('gp2 or gp3, gp3 requires a DBStorageSize of at least 20Gb'),
+                Description=('Database storage type')
+            )
+        )
+
+# Limits of RDS gp3, keep them in sync with RDS_LIMITS of Sceptre/templates/storage/storage_spec.py.
+# Below 400Gb gp3 has the fixed baseline, RDS rejects DBIops and DBStorageThroughput.
+db_iops = t.add_parameter(
+            Parameter(
+                'DBIops',
+                Default='0',
+                Type='String',
+                AllowedPattern='0|(1[2-9]|[2-5][0-9]|6[0-3])[0-9]{3}|64000',
+                ConstraintDescription=('0 or between 12000 and 64000, gp3 from 400Gb only'),
+                Description=('Provisioned IOPS of the gp3 database storage, 0 for the baseline')
+            )
+        )
+db_storage_throughput = t.add_parameter(
+            Parameter(
+                'DBStorageThroughput',
+                Default='0',
+                Type='String',
+                AllowedPattern='0|[5-9][0-9]{2}|[1-3][0-9]{3}|4000',
+                ConstraintDescription=('0 or between 500 and 4000 MiB/s, gp3 from 400Gb only'),
+                Description=('Throughput of the gp3 database storage in MiB/s, 0 for the baseline')
+            )
+        )
+
+# Limits of EBS gp3, keep them in sync with EBS_LIMITS of Sceptre/templates/storage/storage_spec.py
+instance_volume_size = t.add_parameter(
+            Parameter(
+                'InstanceVolumeSize',
+                Default='0',
+                Type='Number',
+                MinValue=0,
+                MaxValue=16384,
+                ConstraintDescription=('0 or up to 16384Gb, at least the size of the AMI root volume'),
+                Description=('Root volume size in Gb, 0 keeps the root volume of the AMI')
+            )
+        )
+instance_volume_type = t.add_parameter(
+            Parameter(
+                'InstanceVolumeType',
+                Default='gp2',
+                Type='String',
+                AllowedValues=['gp2', 'gp3'],
+                ConstraintDescription=('gp2 or gp3'),
+                Description=('Root volume type, with an InstanceVolumeSize')
+            )
+        )
+instance_volume_iops = t.add_parameter(
+            Parameter(
+                'InstanceVolumeIops',
+                Default='0',
+                Type='String',
+                AllowedPattern='0|[3-9][0-9]{3}|1[0-5][0-9]{3}|16000',
+                ConstraintDescription=('0 or between 3000 and 16000, gp3 only, up to 500 per Gb'),
+                Description=('Provisioned IOPS of the gp3 root volume, 0 for the 3000 IOPS baseline')
+            )
+        )
+instance_volume_throughput = t.add_parameter(
+            Parameter(
+                'InstanceVolumeThroughput',
+                Default='0',
+                Type='String',
+                AllowedPattern='0|12[5-9]|1[3-9][0-9]|[2-9][0-9]{2}|1000',
+                ConstraintDescription=('0 or between 125 and 1000 MiB/s, gp3 only, up to 0.25 MiB/s per IOPS'),
+                Description=('Throughput of the gp3 root volume in MiB/s, 0 for the 125 MiB/s baseline')
+            )
+        )
+# The device name of the root volume of the paravirtual AMI
+instance_root_device_name = t.add_parameter(
+            Parameter(
+                'InstanceRootDeviceName',
+                Default='/dev/sda1',
+                Type='String',
+                Description=('Root device name of the AMI, with an InstanceVolumeSize')
+            )
+        )
+
+t.add_condition('DBHasIops', Not(Equals(Ref(db_iops), '0')))
+t.add_condition('DBHasStorageThroughput', Not(Equals(Ref(db_storage_throughput), '0')))
+t.add_condition('InstanceHasVolume', Not(Equals(Ref(instance_volume_size), '0')))
+t.add_condition('InstanceVolumeHasIops', Not(Equals(Ref(instance_volume_iops), '0')))
+t.add_condition('InstanceVolumeHasThroughput', Not(Equals(Ref(instance_volume_throughput), '0')))
 
 
 # See: https://docs.aws.amazon.com/AmazonRDS/latest/UserGuide/Appendix.PostgreSQL.CommonDBATasks.html#Appendix.PostgreSQL.CommonDBATasks.Parameters
@@ -142,7 +245,9 @@ database = t.add_resource(
                 DBName=Ref(db_name),
                 Engine='postgres',
                 EngineVersion='9.6',
-                StorageType='gp2',
+                StorageType=Ref(db_storage_type),
+                Iops=If('DBHasIops', Ref(db_iops), NoValue),
+                StorageThroughput=If('DBHasStorageThroughput', Ref(db_storage_throughput), NoValue),
                 MasterUsername=Ref(db_user),
                 MasterUserPassword=Ref(db_password),
                 AllocatedStorage=Ref(db_storage_size),
@@ -293,6 +398,19 @@ instance.UserData = Base64(Join('', [
                         )
                     )
 
+instance.BlockDeviceMappings = If('InstanceHasVolume', [
+    ec2.BlockDeviceMapping(
+        DeviceName=Ref(instance_root_device_name),
+        Ebs=EBSBlockDevice(
+            DeleteOnTermination=True,
+            VolumeType=Ref(instance_volume_type),
+            VolumeSize=Ref(instance_volume_size),
+            Iops=If('InstanceVolumeHasIops', Ref(instance_volume_iops), NoValue),
+            Throughput=If('InstanceVolumeHasThroughput', Ref(instance_volume_throughput), NoValue)
+        )
+    )
+], NoValue)
+
 instance.IamInstanceProfile = Ref(sonarqube_instance_profile)
 instance.Metadata = metadata
 
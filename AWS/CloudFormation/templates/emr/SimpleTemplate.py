@@ -119,6 +119,95 @@ emr_log_uri = t.add_parameter(
             )
         )
 
+# Core and task instance groups scale with the same rules. These are the 'default' preset of
+# Sceptre/templates/autoscaling/scaling_policy.py, keep both in sync.
+scaling_rules = [
+    emr.ScalingRule(
+        Name='YARNMemory-scale-out',
+        Description='',
+        Action=emr.ScalingAction(
+            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
+                AdjustmentType='CHANGE_IN_CAPACITY',
+                ScalingAdjustment=1,
+                CoolDown=300
+            )
+        ),
+        Trigger=emr.ScalingTrigger(
+            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
+                ComparisonOperator="LESS_THAN",
+                EvaluationPeriods=1,
+                MetricName="YARNMemoryAvailablePercentage",
+                Namespace="AWS/ElasticMapReduce",
+                Period=300,
+                Statistic="AVERAGE",
+                Threshold=15,
+                Unit="PERCENT",
+                Dimensions=[
+                    emr.MetricDimension(
+                        "JobFlowId", "${emr.clusterId}"
+                    )
+                ]
+            )
+        )
+    ),
+    emr.ScalingRule(
+        Name='ContainerPeding-scale-out',
+        Description='',
+        Action=emr.ScalingAction(
+            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
+                AdjustmentType='CHANGE_IN_CAPACITY',
+                ScalingAdjustment=1,
+                CoolDown=300
+            )
+        ),
+        Trigger=emr.ScalingTrigger(
+            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
+                ComparisonOperator="GREATER_THAN",
+                EvaluationPeriods=1,
+                MetricName="ContainerPendingRatio",
+                Namespace="AWS/ElasticMapReduce",
+                Period=300,
+                Statistic="AVERAGE",
+                Threshold=0.75,
+                Unit="COUNT",
+                Dimensions=[
+                    emr.MetricDimension(
+                        "JobFlowId", "${emr.clusterId}"
+                    )
+                ]
+            )
+        )
+    ),
+    emr.ScalingRule(
+        Name='YARNMemory-scale-in',
+        Description='',
+        Action=emr.ScalingAction(
+            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
+                AdjustmentType='CHANGE_IN_CAPACITY',
+                ScalingAdjustment=-1,
+                CoolDown=300
+            )
+        ),
+        Trigger=emr.ScalingTrigger(
+            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
+                ComparisonOperator="GREATER_THAN",
+                EvaluationPeriods=1,
+                MetricName="YARNMemoryAvailablePercentage",
+                Namespace="AWS/ElasticMapReduce",
+                Period=300,
+                Statistic="AVERAGE",
+                Threshold=75.0,
+                Unit="PERCENT",
+                Dimensions=[
+                    emr.MetricDimension(
+                        "JobFlowId", "${emr.clusterId}"
+                    )
+                ]
+            )
+        )
+    )
+]
+
 cluster = emr.Cluster('GusInstanceGroupCloudFormation')
 cluster.Name = 'Gus InstanceGroup CloudFormation'
 cluster.LogUri = Ref(emr_log_uri)
@@ -191,92 +280,7 @@ cluster.Instances = emr.JobFlowInstancesConfig(
                 MinCapacity="1",
                 MaxCapacity="2"
             ),
-            Rules=[
-                emr.ScalingRule(
-                    Name='YARNMemory-scale-out',
-                    Description='',
-                    Action=emr.ScalingAction(
-                        SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                            AdjustmentType='CHANGE_IN_CAPACITY',
-                            ScalingAdjustment=1,
-                            CoolDown=300
-                        )
-                    ),
-                    Trigger=emr.ScalingTrigger(
-                        CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                            ComparisonOperator="LESS_THAN",
-                            EvaluationPeriods=1,
-                            MetricName="YARNMemoryAvailablePercentage",
-                            Namespace="AWS/ElasticMapReduce",
-                            Period=300,
-                            Statistic="AVERAGE",
-                            Threshold=15,
-                            Unit="PERCENT",
-                            Dimensions=[
-                                emr.MetricDimension(
-                                    "JobFlowId", "${emr.clusterId}"
-                                )
-                            ]
-                        )
-                    )
-                ),
-                emr.ScalingRule(
-                    Name='ContainerPeding-scale-out',
-                    Description='',
-                    Action=emr.ScalingAction(
-                        SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                            AdjustmentType='CHANGE_IN_CAPACITY',
-                            ScalingAdjustment=1,
-                            CoolDown=300
-                        )
-                    ),
-                    Trigger=emr.ScalingTrigger(
-                        CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                            ComparisonOperator="GREATER_THAN",
-                            EvaluationPeriods=1,
-                            MetricName="ContainerPendingRatio",
-                            Namespace="AWS/ElasticMapReduce",
-                            Period=300,
-                            Statistic="AVERAGE",
-                            Threshold=0.75,
-                            Unit="COUNT",
-                            Dimensions=[
-                                emr.MetricDimension(
-                                    "JobFlowId", "${emr.clusterId}"
-                                )
-                            ]
-                        )
-                    )
-                ),
-                emr.ScalingRule(
-                    Name='YARNMemory-scale-in',
-                    Description='',
-                    Action=emr.ScalingAction(
-                        SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                            AdjustmentType='CHANGE_IN_CAPACITY',
-                            ScalingAdjustment=-1,
-                            CoolDown=300
-                        )
-                    ),
-                    Trigger=emr.ScalingTrigger(
-                        CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                            ComparisonOperator="GREATER_THAN",
-                            EvaluationPeriods=1,
-                            MetricName="YARNMemoryAvailablePercentage",
-                            Namespace="AWS/ElasticMapReduce",
-                            Period=300,
-                            Statistic="AVERAGE",
-                            Threshold=75.0,
-                            Unit="PERCENT",
-                            Dimensions=[
-                                emr.MetricDimension(
-                                    "JobFlowId", "${emr.clusterId}"
-                                )
-                            ]
-                        )
-                    )
-                )
-            ]
+            Rules=scaling_rules
         )
     )
 )
@@ -295,92 +299,7 @@ instance_group_config = emr.InstanceGroupConfig(
                 MinCapacity="1",
                 MaxCapacity="2"
             ),
-            Rules=[
-                emr.ScalingRule(
-                    Name='YARNMemory-scale-out',
-                    Description='',
-                    Action=emr.ScalingAction(
-                        SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                            AdjustmentType='CHANGE_IN_CAPACITY',
-                            ScalingAdjustment=1,
-                            CoolDown=300
-                        )
-                    ),
-                    Trigger=emr.ScalingTrigger(
-                        CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                            ComparisonOperator="LESS_THAN",
-                            EvaluationPeriods=1,
-                            MetricName="YARNMemoryAvailablePercentage",
-                            Namespace="AWS/ElasticMapReduce",
-                            Period=300,
-                            Statistic="AVERAGE",
-                            Threshold=15,
-                            Unit="PERCENT",
-                            Dimensions=[
-                                emr.MetricDimension(
-                                    "JobFlowId", "${emr.clusterId}"
-                                )
-                            ]
-                        )
-                    )
-                ),
-                emr.ScalingRule(
-                    Name='ContainerPeding-scale-out',
-                    Description='',
-                    Action=emr.ScalingAction(
-                        SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                            AdjustmentType='CHANGE_IN_CAPACITY',
-                            ScalingAdjustment=1,
-                            CoolDown=300
-                        )
-                    ),
-                    Trigger=emr.ScalingTrigger(
-                        CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                            ComparisonOperator="GREATER_THAN",
-                            EvaluationPeriods=1,
-                            MetricName="ContainerPendingRatio",
-                            Namespace="AWS/ElasticMapReduce",
-                            Period=300,
-                            Statistic="AVERAGE",
-                            Threshold=0.75,
-                            Unit="COUNT",
-                            Dimensions=[
-                                emr.MetricDimension(
-                                    "JobFlowId", "${emr.clusterId}"
-                                )
-                            ]
-                        )
-                    )
-                ),
-                emr.ScalingRule(
-                    Name='YARNMemory-scale-in',
-                    Description='',
-                    Action=emr.ScalingAction(
-                        SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                            AdjustmentType='CHANGE_IN_CAPACITY',
-                            ScalingAdjustment=-1,
-                            CoolDown=300
-                        )
-                    ),
-                    Trigger=emr.ScalingTrigger(
-                        CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                            ComparisonOperator="GREATER_THAN",
-                            EvaluationPeriods=1,
-                            MetricName="YARNMemoryAvailablePercentage",
-                            Namespace="AWS/ElasticMapReduce",
-                            Period=300,
-                            Statistic="AVERAGE",
-                            Threshold=75.0,
-                            Unit="PERCENT",
-                            Dimensions=[
-                                emr.MetricDimension(
-                                    "JobFlowId", "${emr.clusterId}"
-                                )
-                            ]
-                        )
-                    )
-                )
-            ]
+            Rules=scaling_rules
         )
 )
 t.add_resource(instance_group_config)
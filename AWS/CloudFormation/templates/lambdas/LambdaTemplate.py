@@ -7,17 +7,37 @@
 # Debug: python -m pdb SimpleTemplate.py
 #
 
+import hashlib
+import json
+
 from troposphere import Parameter, Template, Ref, GetAtt
-from troposphere.awslambda import Function, Code, Environment, VPCConfig
-from troposphere.awslambda import DeadLetterConfig, Version, Alias
+from troposphere.awslambda import Code, Environment, VPCConfig
+from troposphere.awslambda import DeadLetterConfig, Version
 import troposphere.iam as iam
 import troposphere.sqs as sqs
+from templates.lambdas.performance_profile import Alias, Function, alias_properties, function_properties, \
+    performance_profile
+from templates.lambdas.sqs_event_source import EventSourceMapping, event_source_mapping_properties, \
+    visibility_timeout
 
 
 class LambdaTemplate(object):
 
-    def __init__(self, description='Simple template example with lambdas'):
+    def __init__(self, description='Simple template example with lambdas',
+                 s3_bucket='guslambda',
+                 s3_key='aws-example-lambda-1.0-SNAPSHOT-jar-with-dependencies.jar',
+                 profile=None, vpc=True, event_source=None):
         self.description = description
+        self.s3_bucket = s3_bucket
+        self.s3_key = s3_key
+        # Memory, architecture, runtime, SnapStart and provisioned concurrency.
+        # See PerformanceProfile
+        self.profile = profile or performance_profile()
+        # Without VPC the function reaches AWS services only through their
+        # public endpoints, but it does not wait for network interfaces.
+        self.vpc = vpc
+        # SQS queue consumed by the function, None without it. See EventSource
+        self.event_source = event_source
 
     def do_template(self):
 
@@ -35,6 +55,25 @@ class LambdaTemplate(object):
             )
         )
 
+        if self.vpc:
+            subnet_ids = t.add_parameter(
+                Parameter(
+                    'SubnetIds',
+                    Type='List<AWS::EC2::Subnet::Id>',
+                    ConstraintDescription='must be the ids of existing subnets.',
+                    Description=('Subnets of the function, one per availability '
+                                 'zone: Lambda spreads the function across them')
+                )
+            )
+            security_group_ids = t.add_parameter(
+                Parameter(
+                    'SecurityGroupIds',
+                    Type='List<AWS::EC2::SecurityGroup::Id>',
+                    ConstraintDescription='must be the ids of existing security groups.',
+                    Description='Security groups of the function'
+                )
+            )
+
         queue = t.add_resource(
                     sqs.Queue(
                         'DLQLambdaQueue',
@@ -45,8 +84,8 @@ class LambdaTemplate(object):
                         ReceiveMessageWaitTimeSeconds=20,
                         # 256KiB (bytes)
                         MaximumMessageSize=262144,
-                        # 30 seconds
-                        VisibilityTimeout=30,
+                        # Failed messages are processed again by the same function
+                        VisibilityTimeout=visibility_timeout(self.profile.timeout),
                         # 14 days (seconds)
                         MessageRetentionPeriod=1209600
                     )
@@ -108,68 +147,83 @@ class LambdaTemplate(object):
                 "GusLambdaFunction",
                 Description='aws-lambda-gus-example',
                 FunctionName='aws-lambda-gus-example',
-                # size 320MB
-                MemorySize='320',
                 Environment=Environment(
                     Variables={'ENVIRONMENT_GUS': 'GUSTAVO'}
                 ),
                 Code=Code(
-                    S3Bucket='guslambda',
-                    S3Key='aws-example-lambda-1.0-SNAPSHOT-jar-with-dependencies.jar'
+                    S3Bucket=self.s3_bucket,
+                    S3Key=self.s3_key
                 ),
-                # time out 15 seconds
-                Timeout=15,
                 Handler='de.aws.example.lambda.AWSLambdaExample',
                 Role=GetAtt(role, 'Arn'),
-                Runtime='java8',
                 DeadLetterConfig=DeadLetterConfig(
                     TargetArn=GetAtt(queue, "Arn")
                 ),
-                VpcConfig=VPCConfig(
-                    SecurityGroupIds=[
-                        'sg-XXXXXX'
-                    ],
-                    SubnetIds=[
-                        'subnet-XXXXXXXX',
-                        'subnet-YYYYYYYY'
-                    ]
-                )
+                **function_properties(self.profile)
             )
         )
-
-        # It will create the aws-lambda-gus-example version 1
-        # We can not choose the version numbers. They are automaticaly created
-        # by Amazon.
-        # Lambda version: 1 (the number is given by Amazon)
-        t.add_resource(
-            Version(
-                'LambdaVersion1',
-                Description='Lambda Version 1',
-                FunctionName=Ref(lambda_function)
+        if self.vpc:
+            lambda_function.VpcConfig = VPCConfig(
+                SecurityGroupIds=Ref(security_group_ids),
+                SubnetIds=Ref(subnet_ids)
             )
-        )
 
-        # First change set (adding new values to our cloudformation)
-        # New lambda version: 2
-        t.add_resource(
+        # Lambda publishes a version when CloudFormation creates the resource,
+        # never when the function changes. The logical id comes from the
+        # function properties (S3 key of the artifact, memory, runtime...), so
+        # a new artifact or configuration is a new resource and a new version.
+        latest_version = t.add_resource(
             Version(
-                'LambdaVersion2',
-                Description='Lambda Version 2',
+                'LambdaVersion' + self.__version_id(lambda_function),
+                Description='Lambda Version of %s' % (self.s3_key),
                 FunctionName=Ref(lambda_function)
             )
         )
-        # Modificate template in order to create alias for version 1.
-        t.add_resource(
+        # The alias follows the latest version, with SnapStart that is the
+        # one restored from a snapshot, with provisioned concurrency the one
+        # kept initialised.
+        alias = t.add_resource(
             Alias(
                 'LambdaAlias',
                 Name=Ref(lambda_function),
-                Description='Lambda Alias 1',
+                Description='Lambda Alias',
                 FunctionName=Ref(lambda_function),
-                # Amazon will give the version 1 to the first created
-                # LambdaVersion1.
-                # So, we know what number to choose here :)
-                FunctionVersion='1'
+                FunctionVersion=GetAtt(latest_version, 'Version'),
+                **alias_properties(self.profile)
             )
         )
 
+        if self.event_source is not None:
+            source_queue = t.add_resource(
+                sqs.Queue(
+                    'LambdaQueue',
+                    QueueName='LambdaQueue',
+                    ReceiveMessageWaitTimeSeconds=20,
+                    # Messages in flight stay invisible while the function
+                    # retries them, no duplicate processing
+                    VisibilityTimeout=visibility_timeout(
+                        self.profile.timeout,
+                        self.event_source.maximum_batching_window),
+                    RedrivePolicy=sqs.RedrivePolicy(
+                        deadLetterTargetArn=GetAtt(queue, 'Arn'),
+                        maxReceiveCount=self.event_source.max_receive_count
+                    )
+                )
+            )
+            # Invokes the alias: its version is the SnapStart or provisioned one
+            t.add_resource(
+                EventSourceMapping(
+                    'LambdaEventSourceMapping',
+                    EventSourceArn=GetAtt(source_queue, 'Arn'),
+                    FunctionName=Ref(alias),
+                    Enabled=True,
+                    **event_source_mapping_properties(self.event_source)
+                )
+            )
+
         return t
+
+    @staticmethod
+    def __version_id(lambda_function):
+        properties = json.dumps(lambda_function.to_dict(), sort_keys=True)
+        return hashlib.sha256(properties.encode('utf-8')).hexdigest()[:16]
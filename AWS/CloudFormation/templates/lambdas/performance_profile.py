@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from troposphere import AWSProperty
+from troposphere.awslambda import Alias as BaseAlias, Function as BaseFunction
+from troposphere.validators import integer
+
+PerformanceProfile = namedtuple('PerformanceProfile', ['memory_size', 'timeout', 'architecture', 'runtime',
+                                                       'snap_start', 'provisioned_concurrency'])
+
+# CPU grows with memory, 1769 MB is one full vCPU: class loading and JIT of a cold JVM need it.
+PROFILES = {
+    # The settings the function had so far
+    'default': PerformanceProfile(320, 15, 'x86_64', 'java8', False, 0),
+    # Versions are published from a snapshot of the initialised JVM, restored instead of booted
+    'snap-start': PerformanceProfile(1769, 15, 'arm64', 'java21', True, 0),
+    # Execution environments initialised ahead of the traffic, for steady loads
+    'provisioned': PerformanceProfile(1769, 15, 'arm64', 'java21', False, 2),
+}
+
+ARCHITECTURES = ('x86_64', 'arm64')
+JAVA_RUNTIMES = ('java8', 'java8.al2', 'java11', 'java17', 'java21')
+# java8 runs on Amazon Linux 1, x86_64 only
+X86_64_ONLY_RUNTIMES = ('java8',)
+SNAP_START_RUNTIMES = ('java11', 'java17', 'java21')
+MIN_MEMORY_SIZE = 128
+MAX_MEMORY_SIZE = 10240
+MAX_TIMEOUT = 900
+
+
+class SnapStart(AWSProperty):
+    props = {
+        'ApplyOn': (str, True),
+    }
+
+
+class ProvisionedConcurrencyConfiguration(AWSProperty):
+    props = {
+        'ProvisionedConcurrentExecutions': (integer, True),
+    }
+
+
+class Function(BaseFunction):
+    """troposphere 2.4 misses Architectures and SnapStart, and only allows up to 3008 MB"""
+    props = dict(BaseFunction.props, MemorySize=(integer, False), Architectures=([str], False),
+                 SnapStart=(SnapStart, False))
+
+
+class Alias(BaseAlias):
+    """troposphere 2.4 misses ProvisionedConcurrencyConfig"""
+    props = dict(BaseAlias.props, ProvisionedConcurrencyConfig=(ProvisionedConcurrencyConfiguration, False))
+
+
+def performance_profile(name='default', **overrides):
+    """PerformanceProfile by name, the keyword arguments override its fields
+
+    performance_profile('snap-start', memory_size=3008)
+    """
+    if name not in PROFILES:
+        raise Exception('Performance profile %s: must be one of %s' % (name, ', '.join(sorted(PROFILES))))
+    return validate(PROFILES[name]._replace(**overrides))
+
+
+def validate(profile):
+    if not MIN_MEMORY_SIZE <= profile.memory_size <= MAX_MEMORY_SIZE:
+        raise Exception('Performance profile: memory size must be between %d and %d MB'
+                        % (MIN_MEMORY_SIZE, MAX_MEMORY_SIZE))
+    if not 1 <= profile.timeout <= MAX_TIMEOUT:
+        raise Exception('Performance profile: timeout must be between 1 and %d seconds' % (MAX_TIMEOUT))
+    if profile.architecture not in ARCHITECTURES:
+        raise Exception('Performance profile: architecture %s must be one of %s'
+                        % (profile.architecture, ', '.join(ARCHITECTURES)))
+    if profile.runtime not in JAVA_RUNTIMES:
+        raise Exception('Performance profile: runtime %s must be one of %s'
+                        % (profile.runtime, ', '.join(JAVA_RUNTIMES)))
+    if profile.architecture != 'x86_64' and profile.runtime in X86_64_ONLY_RUNTIMES:
+        raise Exception('Performance profile: %s only runs on x86_64' % (profile.runtime))
+    if profile.snap_start:
+        if profile.runtime not in SNAP_START_RUNTIMES:
+            raise Exception('Performance profile: SnapStart requires one of %s' % (', '.join(SNAP_START_RUNTIMES)))
+        if profile.provisioned_concurrency:
+            raise Exception('Performance profile: SnapStart and provisioned concurrency cannot be used together')
+    if profile.provisioned_concurrency < 0:
+        raise Exception('Performance profile: provisioned concurrency cannot be negative')
+    return profile
+
+
+def function_properties(profile):
+    """Memory, timeout, runtime, architecture and SnapStart properties of a Function"""
+    properties = {
+        'MemorySize': profile.memory_size,
+        'Timeout': profile.timeout,
+        'Runtime': profile.runtime,
+    }
+    if profile.architecture != 'x86_64':
+        properties['Architectures'] = [profile.architecture]
+    if profile.snap_start:
+        properties['SnapStart'] = SnapStart(ApplyOn='PublishedVersions')
+    return properties
+
+
+def alias_properties(profile):
+    """Provisioned concurrency of the Alias, on the version it points to"""
+    if not profile.provisioned_concurrency:
+        return {}
+    return {
+        'ProvisionedConcurrencyConfig': ProvisionedConcurrencyConfiguration(
+            ProvisionedConcurrentExecutions=profile.provisioned_concurrency
+        )
+    }
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from troposphere import AWSProperty
+from troposphere.awslambda import EventSourceMapping as BaseEventSourceMapping
+from troposphere.validators import integer
+
+EventSource = namedtuple('EventSource', ['batch_size', 'maximum_batching_window', 'maximum_concurrency',
+                                         'max_receive_count', 'report_batch_item_failures'])
+
+# AWS advice for SQS event sources: while the function retries a throttled or failed batch the
+# messages must stay invisible, otherwise another invocation processes them again.
+VISIBILITY_TIMEOUT_FACTOR = 6
+MAX_VISIBILITY_TIMEOUT = 43200
+# Up to 10 messages per batch without a batching window, up to 10000 with one
+MAX_BATCH_SIZE = 10
+MAX_BATCH_SIZE_WITH_WINDOW = 10000
+MAX_BATCHING_WINDOW = 300
+MIN_MAXIMUM_CONCURRENCY = 2
+MAX_MAXIMUM_CONCURRENCY = 1000
+
+
+class ScalingConfig(AWSProperty):
+    props = {
+        'MaximumConcurrency': (integer, False),
+    }
+
+
+class EventSourceMapping(BaseEventSourceMapping):
+    """troposphere 2.4 misses MaximumBatchingWindowInSeconds, ScalingConfig and FunctionResponseTypes"""
+    props = dict(BaseEventSourceMapping.props, MaximumBatchingWindowInSeconds=(integer, False),
+                 ScalingConfig=(ScalingConfig, False), FunctionResponseTypes=([str], False))
+
+
+def event_source(batch_size=10, maximum_batching_window=0, maximum_concurrency=None, max_receive_count=5,
+                 report_batch_item_failures=False):
+    """EventSource of the SQS queue of a function
+
+    maximum_concurrency, None for as many concurrent invocations as the
+    function is allowed. max_receive_count, receives before a message goes
+    to the dead letter queue. report_batch_item_failures, only for handlers
+    returning batchItemFailures: with it a batch without that list is a
+    success and all its messages are deleted.
+    """
+    if not 0 <= maximum_batching_window <= MAX_BATCHING_WINDOW:
+        raise Exception('Event source: batching window must be between 0 and %d seconds' % (MAX_BATCHING_WINDOW))
+    max_batch_size = MAX_BATCH_SIZE_WITH_WINDOW if maximum_batching_window else MAX_BATCH_SIZE
+    if not 1 <= batch_size <= max_batch_size:
+        raise Exception('Event source: batch size must be between 1 and %d' % (max_batch_size))
+    if maximum_concurrency is not None and \
+            not MIN_MAXIMUM_CONCURRENCY <= maximum_concurrency <= MAX_MAXIMUM_CONCURRENCY:
+        raise Exception('Event source: maximum concurrency must be between %d and %d'
+                        % (MIN_MAXIMUM_CONCURRENCY, MAX_MAXIMUM_CONCURRENCY))
+    if max_receive_count < 1:
+        raise Exception('Event source: max receive count must be at least 1')
+    return EventSource(batch_size, maximum_batching_window, maximum_concurrency, max_receive_count,
+                       report_batch_item_failures)
+
+
+def visibility_timeout(function_timeout, maximum_batching_window=0):
+    """Visibility timeout of a queue consumed by a function, 6 times its timeout plus the batching window"""
+    timeout = VISIBILITY_TIMEOUT_FACTOR * function_timeout + maximum_batching_window
+    if timeout > MAX_VISIBILITY_TIMEOUT:
+        raise Exception('Event source: visibility timeout of %d seconds is over the SQS maximum of %d'
+                        % (timeout, MAX_VISIBILITY_TIMEOUT))
+    return timeout
+
+
+def event_source_mapping_properties(source):
+    """Batching and concurrency properties of the EventSourceMapping of an EventSource"""
+    properties = {
+        'BatchSize': source.batch_size,
+    }
+    if source.report_batch_item_failures:
+        # Only the failed messages of a batch are received again, not the whole batch
+        properties['FunctionResponseTypes'] = ['ReportBatchItemFailures']
+    if source.maximum_batching_window:
+        properties['MaximumBatchingWindowInSeconds'] = source.maximum_batching_window
+    if source.maximum_concurrency is not None:
+        properties['ScalingConfig'] = ScalingConfig(MaximumConcurrency=source.maximum_concurrency)
+    return properties
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from moto import mock_s3
+
+from deploy.artifact_pipeline import ArtifactPipeline
+from deploy.artifact_uploader import ArtifactUploader, MB
+
+BUCKET = 'guslambda'
+# S3 minimum part size, but the last one
+PART_SIZE = 5 * MB
+
+
+class PartFailure(Exception):
+    pass
+
+
+class ArtifactUploaderTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.update(AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+                          AWS_DEFAULT_REGION='eu-west-1')
+        self.mock = mock_s3()
+        self.mock.start()
+        self.s3_client = boto3.client('s3')
+        self.s3_client.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+        self.config = TransferConfig(multipart_threshold=PART_SIZE, multipart_chunksize=PART_SIZE,
+                                     max_concurrency=1)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        self.mock.stop()
+
+    def artifact_file(self, size):
+        filename = os.path.join(self.directory, 'artifact.jar')
+        with open(filename, 'wb') as artifact_file:
+            artifact_file.write(os.urandom(size))
+        return filename
+
+    def upload(self, filename, key='artifact.jar'):
+        with ArtifactPipeline(self.config).prepare(filename) as artifact:
+            uploader = ArtifactUploader(self.s3_client, self.config)
+            uploader.upload(artifact, BUCKET, key, {'Metadata': {'sha256': artifact.sha256}})
+            return artifact.sha256
+
+    def uploaded(self, key='artifact.jar'):
+        return self.s3_client.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+
+    def test_small_file(self):
+        filename = self.artifact_file(MB)
+        self.upload(filename)
+        with open(filename, 'rb') as artifact_file:
+            self.assertEqual(artifact_file.read(), self.uploaded())
+
+    def test_empty_file(self):
+        sha256 = self.upload(self.artifact_file(0))
+        self.assertEqual(hashlib.sha256(b'').hexdigest(), sha256)
+        self.assertEqual(b'', self.uploaded())
+
+    def test_sha256_match(self):
+        uploader = ArtifactUploader(self.s3_client, self.config)
+        sha256 = self.upload(self.artifact_file(MB))
+        self.assertTrue(uploader.is_uploaded(BUCKET, 'artifact.jar', sha256))
+        self.assertFalse(uploader.is_uploaded(BUCKET, 'artifact.jar', hashlib.sha256(b'other').hexdigest()))
+        self.assertFalse(uploader.is_uploaded(BUCKET, 'missing.jar', sha256))
+
+    def test_resume(self):
+        filename = self.artifact_file(3 * PART_SIZE + MB)
+        sent_parts = []
+        failing_parts = [2]
+
+        def upload_part(params, **kwargs):
+            sent_parts.append(params['PartNumber'])
+            if params['PartNumber'] in failing_parts:
+                failing_parts.remove(params['PartNumber'])
+                raise PartFailure('connection reset')
+
+        self.s3_client.meta.events.register('before-parameter-build.s3.UploadPart', upload_part)
+        with self.assertRaises(PartFailure):
+            self.upload(filename)
+        self.assertEqual([1, 2, 3, 4], sorted(sent_parts))
+        self.assertTrue(os.path.exists(filename + ArtifactUploader.MANIFEST_SUFFIX))
+
+        del sent_parts[:]
+        self.upload(filename)
+        # Only the failed part is sent again
+        self.assertEqual([2], sent_parts)
+        self.assertFalse(os.path.exists(filename + ArtifactUploader.MANIFEST_SUFFIX))
+        with open(filename, 'rb') as artifact_file:
+            self.assertEqual(artifact_file.read(), self.uploaded())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+from moto import mock_secretsmanager, mock_ssm
+
+# The function code is deployed flat, as the Lambda runtime imports it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'templates', 'customresources', 'secrets'))
+secrets_lambda = importlib.import_module('lambda')
+from custom_resource import FAILED, FAILED_CREATE_PREFIX, SUCCESS
+from ttl_cache import TTLCache
+
+STACK_ID = 'arn:aws:cloudformation:eu-west-1:123456789012:stack/hive-dev-hive-emr/1a2b3c'
+
+
+class ResponseHandler(BaseHTTPRequestHandler):
+    """The pre-signed S3 URL CloudFormation waits on"""
+
+    def do_PUT(self):
+        self.server.responses.append(json.loads(self.rfile.read(int(self.headers['content-length']))))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class Context(object):
+
+    log_stream_name = '2026/10/18/[$LATEST]abc'
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+class SecretsResourceTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.update(AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+                          AWS_DEFAULT_REGION='eu-west-1')
+        self.mocks = [mock_secretsmanager(), mock_ssm()]
+        for mock in self.mocks:
+            mock.start()
+        self.secrets_client = boto3.client('secretsmanager')
+        self.ssm_client = boto3.client('ssm')
+        self.secrets_client.create_secret(Name='hive/dev/metastore', SecretString='secret-password')
+        self.ssm_client.put_parameter(Name='/hive/dev/metastore/password', Value='ssm-password',
+                                      Type='SecureString')
+        self.secret_calls = []
+        self.secrets_client.meta.events.register('before-call.secrets-manager.GetSecretValue',
+                                                 lambda **kwargs: self.secret_calls.append(1))
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ResponseHandler)
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        # Nothing cached: every resolved value is a call
+        self.resource = secrets_lambda.SecretsResource(self.secrets_client, self.ssm_client, TTLCache(10, 0))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for mock in self.mocks:
+            mock.stop()
+
+    def event(self, request_type, request_id, properties, physical_resource_id=None):
+        event = {
+            'RequestType': request_type,
+            'RequestId': request_id,
+            'ResponseURL': 'http://127.0.0.1:%d/response' % (self.server.server_address[1]),
+            'StackId': STACK_ID,
+            'LogicalResourceId': 'Secrets',
+            'ResourceType': 'Custom::Secrets',
+            'ResourceProperties': dict(properties, ServiceToken='arn:aws:lambda:eu-west-1:123456789012:function:s'),
+        }
+        if physical_resource_id is not None:
+            event['PhysicalResourceId'] = physical_resource_id
+        return event
+
+    def test_create(self):
+        response = self.resource.handler(self.event('Create', 'request-1', {
+            'SecretIds': {'MasterUserPassword': 'hive/dev/metastore'},
+            'ParameterNames': {'DatabasePassword': '/hive/dev/metastore/password'},
+        }), Context())
+
+        self.assertEqual(SUCCESS, response['Status'])
+        self.assertEqual({'MasterUserPassword': 'secret-password', 'DatabasePassword': 'ssm-password'},
+                         response['Data'])
+        self.assertTrue(response['NoEcho'])
+        self.assertEqual('hive-dev-hive-emr-Secrets', response['PhysicalResourceId'])
+        self.assertEqual([response], self.server.responses)
+
+    def test_repeated_request(self):
+        event = self.event('Create', 'request-1', {'SecretIds': {'MasterUserPassword': 'hive/dev/metastore'}})
+        first = self.resource.handler(event, Context())
+        second = self.resource.handler(event, Context())
+
+        self.assertEqual(first, second)
+        # Answered again, without resolving the secret again
+        self.assertEqual(1, len(self.secret_calls))
+        self.assertEqual([first, first], self.server.responses)
+
+    def test_unchanged_update(self):
+        properties = {'SecretIds': {'MasterUserPassword': 'hive/dev/metastore'}}
+        created = self.resource.handler(self.event('Create', 'request-1', properties), Context())
+        event = self.event('Update', 'request-2', properties, created['PhysicalResourceId'])
+        event['OldResourceProperties'] = event['ResourceProperties']
+        updated = self.resource.handler(event, Context())
+
+        self.assertEqual(SUCCESS, updated['Status'])
+        self.assertEqual(created['Data'], updated['Data'])
+        self.assertEqual(1, len(self.secret_calls))
+
+    def test_delete(self):
+        created = self.resource.handler(self.event('Create', 'request-1', {}), Context())
+        response = self.resource.handler(self.event('Delete', 'request-2', {}, created['PhysicalResourceId']),
+                                         Context())
+
+        self.assertEqual(SUCCESS, response['Status'])
+        self.assertEqual(created['PhysicalResourceId'], response['PhysicalResourceId'])
+
+    def test_failed_create(self):
+        response = self.resource.handler(self.event('Create', 'request-1', {
+            'SecretIds': {'MasterUserPassword': 'hive/dev/missing'},
+        }), Context())
+
+        self.assertEqual(FAILED, response['Status'])
+        self.assertIn(Context.log_stream_name, response['Reason'])
+        self.assertEqual(FAILED_CREATE_PREFIX + 'request-1', response['PhysicalResourceId'])
+        self.assertNotIn('Data', response)
+
+        # The rollback deletes what was never created
+        deleted = self.resource.handler(self.event('Delete', 'request-2', {}, response['PhysicalResourceId']),
+                                        Context())
+        self.assertEqual(SUCCESS, deleted['Status'])
+
+    def test_unknown_parameter(self):
+        response = self.resource.handler(self.event('Create', 'request-1', {
+            'ParameterNames': {'DatabasePassword': '/hive/dev/missing'},
+        }), Context())
+
+        self.assertEqual(FAILED, response['Status'])
+        self.assertIn('/hive/dev/missing', response['Reason'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import contextlib
+import getopt
+import glob
+import importlib.util
+import io
+import logging
+import os
+import runpy
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from stacks.stack_config import StackConfig
+
+PROJECT_PATH = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_PATH = os.path.join(PROJECT_PATH, 'templates')
+CLOUDFORMATION_PATH = os.path.join(os.path.dirname(PROJECT_PATH), 'CloudFormation')
+
+sys.path.insert(0, TEMPLATES_PATH)
+# CloudFormation templates import their helpers as templates.lambdas.*, the same as runner.py
+sys.path.append(CLOUDFORMATION_PATH)
+from rendering.template_cache import TemplateCache
+
+# Lambda code, not templates
+CLOUDFORMATION_EXCLUDED = ('customresources',)
+
+
+def _is_cloudformation_template(path):
+    """Templates are named after their class, LambdaTemplate.py. The snake_case
+    modules next to them (performance_profile.py, __init__.py) are helpers"""
+    return os.path.basename(path)[0].isupper()
+
+
+_sceptre_templates = {}
+
+
+def _init_worker():
+    """Pays the troposphere import once per worker instead of once per stack"""
+    import troposphere
+    import troposphere.emr
+    import troposphere.rds
+
+
+def _load_sceptre_template(path):
+    if path not in _sceptre_templates:
+        name = os.path.splitext(os.path.relpath(path, TEMPLATES_PATH))[0].replace('-', '_').replace(os.path.sep, '.')
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _sceptre_templates[path] = module
+    return _sceptre_templates[path]
+
+
+def _render_stack(path, sceptre_user_data):
+    """JSON of a Sceptre stack, the same as sceptre generate dev/hive-emr.yaml"""
+    return _load_sceptre_template(path).sceptre_handler(sceptre_user_data)
+
+
+def _render_cloudformation_template(path):
+    """JSON of a CloudFormation/templates script
+
+    Scripts build a module level Template called t and print it, classes like
+    LambdaTemplate build it in do_template.
+    """
+    return TemplateCache().render(path, None, lambda: _run_cloudformation_template(path))
+
+
+def _run_cloudformation_template(path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        namespace = runpy.run_path(path, run_name='__render__')
+
+    if 't' in namespace and hasattr(namespace['t'], 'to_json'):
+        return namespace['t'].to_json()
+    for value in namespace.values():
+        if isinstance(value, type) and value.__module__ == '__render__' and hasattr(value, 'do_template'):
+            return value().do_template().to_json()
+    raise Exception('%s does not build any template' % (path))
+
+
+def _write(output_file, body):
+    output_dir = os.path.dirname(output_file)
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    with open(output_file, 'w') as output:
+        output.write(body)
+
+
+def _render(job):
+    source, path, sceptre_user_data, output_file = job
+    try:
+        if path.startswith(TEMPLATES_PATH):
+            body = _render_stack(path, sceptre_user_data)
+        else:
+            body = _render_cloudformation_template(path)
+        _write(output_file, body)
+        return source, output_file, None
+    except Exception:
+        return source, output_file, traceback.format_exc()
+
+
+class BatchRenderer(object):
+    """Renders every template of the repository in one go
+
+    Sceptre templates are rendered once per stack config under config/*/, with the
+    sceptre_user_data of the config, into <output_dir>/sceptre/<env>/<stack>.json.
+    CloudFormation templates go to <output_dir>/cloudformation/<dir>/<name>.json.
+    Templates found in the TemplateCache are written straight away, without
+    importing troposphere or any template. The rest are spread across a pool of
+    warm worker processes.
+    """
+
+    def __init__(self, output_dir, max_workers=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.output_dir = os.path.abspath(output_dir)
+        self.max_workers = max_workers or os.cpu_count()
+
+        self.logger.info("output_dir: %s" % (self.output_dir))
+        self.logger.info("max_workers: %d" % (self.max_workers))
+
+    def _jobs(self):
+        jobs = []
+        for config_name in sorted(glob.glob(os.path.join(PROJECT_PATH, 'config', '*', '*.yaml'))):
+            if os.path.basename(config_name) == 'config.yaml':
+                continue
+            stack_path = os.path.relpath(config_name, os.path.join(PROJECT_PATH, 'config'))
+            stack = StackConfig(PROJECT_PATH, stack_path)
+            output_file = os.path.join(self.output_dir, 'sceptre', os.path.splitext(stack_path)[0] + '.json')
+            jobs.append((stack_path, os.path.join(TEMPLATES_PATH, stack.template_path),
+                         stack.sceptre_user_data, output_file))
+
+        templates_path = os.path.join(CLOUDFORMATION_PATH, 'templates')
+        for path in sorted(glob.glob(os.path.join(templates_path, '*', '*.py'))):
+            relative_path = os.path.relpath(path, templates_path)
+            if relative_path.split(os.path.sep)[0] in CLOUDFORMATION_EXCLUDED or not _is_cloudformation_template(path):
+                continue
+            output_file = os.path.join(self.output_dir, 'cloudformation', os.path.splitext(relative_path)[0] + '.json')
+            jobs.append((path, path, None, output_file))
+        return jobs
+
+    def run(self):
+        cache = TemplateCache()
+        pending = []
+        for job in self._jobs():
+            source, path, sceptre_user_data, output_file = job
+            body = cache.get(path, sceptre_user_data)
+            if body is None:
+                pending.append(job)
+            else:
+                _write(output_file, body)
+                print("%s: %s (cached)" % (source, output_file))
+
+        self.logger.info("cache misses: %d" % (len(pending)))
+        if not pending:
+            return 0
+
+        failed = 0
+        max_workers = min(self.max_workers, len(pending))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+            for source, output_file, error in executor.map(_render, pending):
+                if error:
+                    failed += 1
+                    print("%s: FAILED\n%s" % (source, error))
+                else:
+                    print("%s: %s" % (source, output_file))
+        return 1 if failed else 0
+
+
+def usage():
+    usage_string = """
+    SYNOPSIS
+        render.py -o output_dir [-j workers]
+
+        Where:
+            output_dir - Directory for the rendered templates
+            workers - Number of worker processes. Number of CPUs by default.
+
+    """
+    print(usage_string)
+    sys.exit(1)
+
+
+def main():
+    # Logging information
+    logging.basicConfig(filename='output.log', level=logging.DEBUG)
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'o:j:h')
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(1)
+
+    output_dir = ''
+    max_workers = None
+    for o, a in opts:
+        if o in ('-o', '--output-dir'):
+            output_dir = a
+        elif o in ('-j', '--workers'):
+            max_workers = int(a)
+        elif o in ('-h', '--help'):
+            usage()
+        else:
+            assert False, "unhandled option %s" % (o)
+
+    # Options are required
+    if not output_dir:
+        usage()
+
+    sys.exit(BatchRenderer(output_dir, max_workers).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import getopt
+import heapq
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from stacks.stack_config import load_environment
+from stacks.stack_graph import StackGraph
+
+PROJECT_PATH = os.path.dirname(os.path.abspath(__file__))
+DURATIONS_FILE = os.path.join(PROJECT_PATH, '.stack-durations.json')
+# Seconds the stack outputs of a run are kept for its other stacks, see stacks/cached_stack_output.py
+STACK_OUTPUT_CACHE_TTL = 24 * 60 * 60
+
+
+class Scheduler(object):
+    """Launches the stacks of an environment concurrently
+
+    A stack is launched as soon as every stack it depends on is up. When there
+    are more ready stacks than workers, the ones on the longest critical path go
+    first. Launch durations are recorded in DURATIONS_FILE and drive the critical
+    path of the next run.
+
+    The sceptre processes of a run share one !cached_stack_output file: a stack
+    is only launched after the stacks it reads outputs from, and those are not
+    launched again in the same run, so the outputs stay valid for the run.
+    """
+
+    def __init__(self, environment, max_workers, sceptre_vars, dry_run=False):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.environment = environment
+        self.max_workers = max_workers
+        self.sceptre_vars = sceptre_vars
+        self.dry_run = dry_run
+        self.durations = self.__load_durations()
+        self.stack_output_cache_file = None
+        self.graph = StackGraph(load_environment(PROJECT_PATH, environment), self.durations)
+
+        self.logger.info("environment: %s" % (self.environment))
+        self.logger.info("max_workers: %d" % (self.max_workers))
+        self.logger.info("stacks: %s" % (', '.join(sorted(self.graph.stacks))))
+
+    def _launch(self, stack_path):
+        """Launches one stack
+
+        It is the same as running this command from console:
+        sceptre --var "profile=aws-account" --ignore-dependencies launch -y dev/hive-emr.yaml
+
+        Without --ignore-dependencies Sceptre launches every stack the given one
+        depends on again, concurrently with the workers launching them. The
+        scheduler already launches those first.
+        """
+        command = ['sceptre']
+        for sceptre_var in self.sceptre_vars:
+            command.extend(['--var', sceptre_var])
+        command.extend(['--ignore-dependencies', 'launch', '-y', stack_path])
+
+        self.logger.info("launching %s: %s" % (stack_path, ' '.join(command)))
+        if self.dry_run:
+            print(' '.join(command))
+            return True
+
+        env = dict(os.environ)
+        env['SCEPTRE_STACK_OUTPUT_CACHE_FILE'] = self.stack_output_cache_file
+        env['SCEPTRE_STACK_OUTPUT_CACHE_TTL'] = str(STACK_OUTPUT_CACHE_TTL)
+
+        start = time.time()
+        process = subprocess.Popen(command, cwd=PROJECT_PATH, env=env, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, universal_newlines=True)
+        for line in process.stdout:
+            print("[%s] %s" % (stack_path, line.rstrip()))
+        process.wait()
+
+        if process.returncode == 0:
+            self.durations[stack_path] = time.time() - start
+        return process.returncode == 0
+
+    def run(self):
+        dependencies = dict((stack_path, set(stack_dependencies))
+                            for stack_path, stack_dependencies in self.graph.dependencies.items())
+        ready = []
+        for stack_path in dependencies:
+            self.__push_if_ready(ready, dependencies, stack_path)
+
+        handle, self.stack_output_cache_file = tempfile.mkstemp(prefix='stack-outputs-', suffix='.json')
+        os.close(handle)
+        try:
+            failed = set()
+            running = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while ready or running:
+                    while ready and len(running) < self.max_workers:
+                        _, stack_path = heapq.heappop(ready)
+                        running[executor.submit(self._launch, stack_path)] = stack_path
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stack_path = running.pop(future)
+                        if future.result():
+                            print("%s: launched" % (stack_path))
+                            for dependent in self.graph.dependents[stack_path]:
+                                dependencies[dependent].discard(stack_path)
+                                self.__push_if_ready(ready, dependencies, dependent)
+                        else:
+                            print("%s: failed" % (stack_path))
+                            failed.add(stack_path)
+        finally:
+            os.remove(self.stack_output_cache_file)
+
+        self.__save_durations()
+
+        skipped = sorted(stack_path for stack_path, pending in dependencies.items() if pending)
+        for stack_path in skipped:
+            print("%s: skipped, depends on a failed stack" % (stack_path))
+
+        return 1 if failed or skipped else 0
+
+    def __push_if_ready(self, ready, dependencies, stack_path):
+        if not dependencies[stack_path]:
+            # heapq is a min-heap: longest critical path first
+            heapq.heappush(ready, (-self.graph.critical_path(stack_path), stack_path))
+
+    @staticmethod
+    def __load_durations():
+        if not os.path.exists(DURATIONS_FILE):
+            return {}
+        with open(DURATIONS_FILE) as durations_file:
+            return json.load(durations_file)
+
+    def __save_durations(self):
+        if self.dry_run:
+            return
+        with open(DURATIONS_FILE, 'w') as durations_file:
+            json.dump(self.durations, durations_file, indent=4, sort_keys=True)
+
+
+def usage():
+    usage_string = """
+    SYNOPSIS
+        scheduler.py -e environment [-j workers] [-v var]... [-n]
+
+        Where:
+            environment - Sceptre environment, directory under config. Example: dev
+            workers - Number of stacks launched at the same time. 4 by default.
+            var - Sceptre variable, passed as --var. Example: profile=aws-account
+            -n - Dry run, only print the launch order.
+
+    """
+    print(usage_string)
+    sys.exit(1)
+
+
+def main():
+    # Logging information
+    logging.basicConfig(filename='output.log', level=logging.DEBUG)
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'e:j:v:nh')
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(1)
+
+    environment = ''
+    max_workers = 4
+    sceptre_vars = []
+    dry_run = False
+    for o, a in opts:
+        if o in ('-e', '--environment'):
+            environment = a
+        elif o in ('-j', '--workers'):
+            max_workers = int(a)
+        elif o in ('-v', '--var'):
+            sceptre_vars.append(a)
+        elif o in ('-n', '--dry-run'):
+            dry_run = True
+        elif o in ('-h', '--help'):
+            usage()
+        else:
+            assert False, "unhandled option %s" % (o)
+
+    # Options are required
+    if not environment:
+        usage()
+
+    sys.exit(Scheduler(environment, max_workers, sceptre_vars, dry_run).run())
+
+
+if __name__ == '__main__':
+    main()
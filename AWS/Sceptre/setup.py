@@ -0,0 +1,18 @@
+#!/usr/bin/python
+# coding: utf-8
+
+from setuptools import setup
+
+# Sceptre finds resolvers through their entry points, requirements.txt installs them with -e .
+setup(
+    name='cloudinfra-sceptre',
+    version='0.1.0',
+    description='Stack helpers and resolvers of the Sceptre project',
+    packages=['stacks'],
+    install_requires=['sceptre>=2.1,<3'],
+    entry_points={
+        'sceptre.resolvers': [
+            'cached_stack_output = stacks.cached_stack_output:CachedStackOutput',
+        ],
+    },
+)
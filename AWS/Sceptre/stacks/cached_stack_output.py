@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+
+from sceptre.exceptions import StackDoesNotExistError
+from sceptre.resolvers.stack_output import StackOutput
+
+from stacks.stack_descriptions import StackDescriptions
+
+CACHE_FILE = os.environ.get('SCEPTRE_STACK_OUTPUT_CACHE_FILE',
+                            os.path.join(os.path.expanduser('~'), '.cache', 'sceptre-stack-outputs.json'))
+# Seconds the outputs of a stack are kept in CACHE_FILE for the next runs, 0 (the default) disables it
+CACHE_TTL = int(os.environ.get('SCEPTRE_STACK_OUTPUT_CACHE_TTL', '0'))
+
+# StackDescriptions by profile and region, shared by every resolver of a Sceptre run
+_stack_descriptions = {}
+_lock = threading.Lock()
+
+
+class _ConnectionManagerClient(object):
+    """describe_stacks through the connection manager of Sceptre, with its credentials and retries"""
+
+    def __init__(self, connection_manager, profile, region):
+        self.connection_manager = connection_manager
+        self.profile = profile
+        self.region = region
+
+    def describe_stacks(self, StackName):
+        return self.connection_manager.call(service='cloudformation', command='describe_stacks',
+                                            kwargs={'StackName': StackName}, profile=self.profile,
+                                            region=self.region, stack_name=StackName)
+
+
+class StackOutputFile(object):
+    """Outputs of stacks kept in a JSON file for ttl seconds, shared by processes
+
+    The file is read once per process. Writes merge with what other processes
+    wrote in the meantime, a lost write is only a cache miss.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE, ttl=CACHE_TTL, clock=time.time):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.__clock = clock
+        self.__entries = None
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        if not self.ttl:
+            return None
+        with self.__lock:
+            if self.__entries is None:
+                self.__entries = self.__read()
+            entry = self.__entries.get(key)
+        if entry is None or entry['expires_at'] <= self.__clock():
+            return None
+        return entry['outputs']
+
+    def put(self, key, outputs):
+        if not self.ttl:
+            return
+        with self.__lock:
+            now = self.__clock()
+            entries = dict((cached_key, entry) for cached_key, entry in self.__read().items()
+                           if entry['expires_at'] > now)
+            entries[key] = {'expires_at': now + self.ttl, 'outputs': outputs}
+            self.__entries = entries
+            try:
+                cache_dir = os.path.dirname(self.cache_file)
+                if not os.path.isdir(cache_dir):
+                    os.makedirs(cache_dir)
+                tmp_file = '%s.%d.tmp' % (self.cache_file, os.getpid())
+                with open(tmp_file, 'w') as cache_file:
+                    json.dump(entries, cache_file, indent=4, sort_keys=True)
+                os.replace(tmp_file, self.cache_file)
+            except (IOError, OSError):
+                # A read only or full disk must not break the launch
+                pass
+
+    def __read(self):
+        try:
+            with open(self.cache_file) as cache_file:
+                return json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+
+_stack_output_file = StackOutputFile()
+
+
+def stack_descriptions(connection_manager, profile=None, region=None):
+    """StackDescriptions of the process, a stack is described at most once"""
+    with _lock:
+        if (profile, region) not in _stack_descriptions:
+            _stack_descriptions[(profile, region)] = StackDescriptions(
+                _ConnectionManagerClient(connection_manager, profile, region), ttl=None)
+        return _stack_descriptions[(profile, region)]
+
+
+class CachedStackOutput(StackOutput):
+    """!stack_output with one DescribeStacks call per stack and process, see StackDescriptions
+
+    parameters:
+        SecurityGroupId: !cached_stack_output dev/simple-security-group.yaml::SimpleSecurityGroup
+
+    Every output of a stack comes from the same call, so four references to
+    one stack cost one call instead of four. Sceptre launches stacks in
+    threads, those resolving outputs of the same stack wait for one call.
+
+    With SCEPTRE_STACK_OUTPUT_CACHE_TTL the outputs are kept in
+    SCEPTRE_STACK_OUTPUT_CACHE_FILE for the next runs: only for outputs
+    that do not change in that time. scheduler.py sets both for the
+    sceptre launch processes of one run.
+    """
+
+    def _get_stack_outputs(self, stack_name, profile=None, region=None):
+        key = '|'.join([profile or '', region or '', stack_name])
+        outputs = _stack_output_file.get(key)
+        if outputs is not None:
+            return outputs
+
+        descriptions = stack_descriptions(self.stack.template.connection_manager, profile, region)
+        if descriptions.get(stack_name) is None:
+            raise StackDoesNotExistError('Stack with id %s does not exist' % (stack_name))
+        outputs = descriptions.outputs(stack_name)
+        _stack_output_file.put(key, outputs)
+        return outputs
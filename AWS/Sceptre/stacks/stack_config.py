@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import re
+from collections import namedtuple
+
+import yaml
+
+# !stack_output dev/simple-security-group.yaml::SimpleSecurityGroup, !cached_stack_output the same
+StackOutput = namedtuple('StackOutput', ['stack_path', 'output_name'])
+# Any other Sceptre resolver, kept as is: !environment_variable, !file_contents...
+Resolver = namedtuple('Resolver', ['tag', 'argument'])
+
+
+class StackConfigLoader(yaml.SafeLoader):
+    """YAML loader that understands Sceptre resolver tags"""
+
+
+def _construct_stack_output(loader, node):
+    stack_path, output_name = loader.construct_scalar(node).split('::', 1)
+    return StackOutput(stack_path, output_name)
+
+
+def _construct_resolver(loader, tag_suffix, node):
+    return Resolver('!' + tag_suffix, loader.construct_scalar(node))
+
+
+StackConfigLoader.add_constructor('!stack_output', _construct_stack_output)
+StackConfigLoader.add_constructor('!cached_stack_output', _construct_stack_output)
+StackConfigLoader.add_multi_constructor('!', _construct_resolver)
+
+
+class StackConfig(object):
+    """Stack config file of a Sceptre project: config/dev/hive-emr.yaml"""
+
+    def __init__(self, project_path, stack_path):
+        self.project_path = project_path
+        # dev/hive-emr.yaml
+        self.stack_path = stack_path
+
+        with open(os.path.join(project_path, 'config', stack_path)) as config_file:
+            config = yaml.load(config_file, Loader=StackConfigLoader) or {}
+
+        self.template_path = config.get('template_path')
+        self.parameters = config.get('parameters') or {}
+        self.sceptre_user_data = config.get('sceptre_user_data') or {}
+        self.explicit_dependencies = config.get('dependencies') or []
+
+    @property
+    def environment(self):
+        return os.path.dirname(self.stack_path)
+
+    def stack_name(self, project_code):
+        """CloudFormation stack name given by Sceptre: hive-dev-hive-emr"""
+        return '-'.join([project_code, os.path.splitext(self.stack_path)[0].replace('/', '-')])
+
+    @property
+    def stack_outputs(self):
+        """Every !stack_output reference of the parameters"""
+        outputs = []
+        for value in self.parameters.values():
+            values = value if isinstance(value, list) else [value]
+            outputs.extend(item for item in values if isinstance(item, StackOutput))
+        return outputs
+
+    @property
+    def dependencies(self):
+        dependencies = list(self.explicit_dependencies)
+        for stack_output in self.stack_outputs:
+            if stack_output.stack_path not in dependencies:
+                dependencies.append(stack_output.stack_path)
+        return dependencies
+
+
+def load_environment(project_path, environment):
+    """Stack configs of config/<environment>/*.yaml, by stack path
+
+    config.yaml files are environment settings, not stacks.
+    """
+    stacks = {}
+    pattern = os.path.join(project_path, 'config', environment, '*.yaml')
+    for config_name in sorted(glob.glob(pattern)):
+        if os.path.basename(config_name) == 'config.yaml':
+            continue
+        stack_path = os.path.relpath(config_name, os.path.join(project_path, 'config'))
+        stacks[stack_path] = StackConfig(project_path, stack_path)
+    return stacks
+
+
+def load_environment_config(project_path, environment, sceptre_vars=()):
+    """Settings of config/config.yaml overridden by config/<environment>/config.yaml
+
+    {{ var.name }} is replaced by the value of a name=value Sceptre variable.
+    """
+    variables = dict(sceptre_var.split('=', 1) for sceptre_var in sceptre_vars)
+
+    def replace_variable(match):
+        if match.group(1) not in variables:
+            raise Exception('Sceptre variable %s is required' % (match.group(1)))
+        return variables[match.group(1)]
+
+    config = {}
+    for config_name in (os.path.join(project_path, 'config', 'config.yaml'),
+                        os.path.join(project_path, 'config', environment, 'config.yaml')):
+        if os.path.exists(config_name):
+            with open(config_name) as config_file:
+                text = re.sub(r'{{\s*var\.(\w+)\s*}}', replace_variable, config_file.read())
+            config.update(yaml.safe_load(text) or {})
+    return config
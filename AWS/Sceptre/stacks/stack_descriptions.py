@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+# Seconds a DescribeStacks result is reused: long enough for every status check and
+# !stack_output of one run, short enough to see a stack that has just changed.
+DEFAULT_TTL = 10
+# DescribeStacks is throttled hard when many stacks are checked at the same time
+CLIENT_RETRIES = 10
+
+
+def cloudformation_client(profile=None, region=None, max_workers=10):
+    """CloudFormation client shared by the threads, boto3 clients are thread safe but sessions are not"""
+    import boto3
+    from botocore.config import Config
+
+    session = boto3.session.Session(profile_name=profile, region_name=region)
+    return session.client('cloudformation', config=Config(retries={'max_attempts': CLIENT_RETRIES},
+                                                         max_pool_connections=max_workers))
+
+
+class StackDescriptions(object):
+    """DescribeStacks of one stack at a time, cached for ttl seconds or, with None, for good
+
+    Threads asking for the same stack at the same time share one call.
+    A stack that does not exist is described as None.
+    """
+
+    def __init__(self, cloudformation_client, ttl=DEFAULT_TTL, clock=time.time):
+        self.cloudformation_client = cloudformation_client
+        self.ttl = ttl
+        self.__clock = clock
+        self.__descriptions = {}
+        self.__locks = {}
+        self.__lock = threading.Lock()
+
+    def get(self, stack_name):
+        with self.__lock:
+            stack_lock = self.__locks.setdefault(stack_name, threading.Lock())
+
+        with stack_lock:
+            cached = self.__descriptions.get(stack_name)
+            if cached is not None and (cached[0] is None or cached[0] > self.__clock()):
+                return cached[1]
+
+            description = self.__describe(stack_name)
+            expires_at = None if self.ttl is None else self.__clock() + self.ttl
+            self.__descriptions[stack_name] = (expires_at, description)
+            return description
+
+    def outputs(self, stack_name):
+        """Outputs of the stack by name, empty when it does not exist"""
+        description = self.get(stack_name)
+        if description is None:
+            return {}
+        return dict((output['OutputKey'], output['OutputValue']) for output in description.get('Outputs', []))
+
+    def __describe(self, stack_name):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.cloudformation_client.describe_stacks(StackName=stack_name)['Stacks'][0]
+        except ClientError as error:
+            if 'does not exist' in error.response['Error']['Message']:
+                return None
+            raise
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+
+class StackGraph(object):
+    """Dependency graph of the stacks of an environment
+
+    A stack depends on every stack it takes a !stack_output from and on its
+    explicit Sceptre dependencies.
+    """
+
+    def __init__(self, stacks, durations=None):
+        self.stacks = stacks
+        self.durations = durations or {}
+        self.dependencies = {}
+        self.dependents = dict((stack_path, []) for stack_path in stacks)
+
+        for stack_path, stack in stacks.items():
+            self.dependencies[stack_path] = stack.dependencies
+            for dependency in stack.dependencies:
+                if dependency not in stacks:
+                    raise Exception('%s depends on unknown stack %s' % (stack_path, dependency))
+                self.dependents[dependency].append(stack_path)
+
+        self.__check_acyclic()
+        self.__critical_paths = {}
+
+    def duration(self, stack_path):
+        """Expected launch duration. Unknown stacks weigh the same as the slowest known one"""
+        return self.durations.get(stack_path, max(list(self.durations.values()) + [1]))
+
+    def critical_path(self, stack_path):
+        """Expected time from launching this stack until every stack depending on it is done"""
+        if stack_path not in self.__critical_paths:
+            self.__critical_paths[stack_path] = self.duration(stack_path) + max(
+                [self.critical_path(dependent) for dependent in self.dependents[stack_path]] + [0]
+            )
+        return self.__critical_paths[stack_path]
+
+    def __check_acyclic(self):
+        pending = dict((stack_path, len(dependencies)) for stack_path, dependencies in self.dependencies.items())
+        ready = [stack_path for stack_path, count in pending.items() if count == 0]
+        visited = 0
+        while ready:
+            stack_path = ready.pop()
+            visited += 1
+            for dependent in self.dependents[stack_path]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+
+        if visited != len(self.stacks):
+            cycle = sorted(stack_path for stack_path, count in pending.items() if count > 0)
+            raise Exception('Circular dependency between stacks: %s' % (', '.join(cycle)))
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import getopt
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_PATH = os.path.dirname(os.path.abspath(__file__))
+CLOUDFORMATION_PATH = os.path.join(os.path.dirname(PROJECT_PATH), 'CloudFormation')
+
+
+class StartupCase(object):
+    """A command whose startup is measured with python -X importtime
+
+    budget_ms is the budget for the cumulative import time, forbidden are modules
+    that must not be imported at all (they are the expensive ones).
+    """
+
+    def __init__(self, name, args, cwd, budget_ms, forbidden, setup=None):
+        self.name = name
+        self.args = args
+        self.cwd = cwd
+        self.budget_ms = budget_ms
+        self.forbidden = forbidden
+        self.setup = setup
+
+    def measure(self):
+        """:return: (import time in ms, top level modules imported)"""
+        if self.setup:
+            subprocess.call([sys.executable] + self.setup, cwd=self.cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        process = subprocess.run([sys.executable, '-X', 'importtime'] + self.args, cwd=self.cwd,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+        total_us = 0
+        modules = set()
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, module = line[len('import time:'):].split('|')
+            total_us += int(self_us)
+            modules.add(module.strip().split('.')[0])
+        return total_us / 1000.0, modules
+
+
+def cases(output_dir):
+    render = ['render.py', '-o', output_dir]
+    return [
+        StartupCase('runner.py usage', ['runner.py'], CLOUDFORMATION_PATH,
+                    budget_ms=60, forbidden=('boto3', 'botocore', 'troposphere')),
+        # The first run fills the template cache, the measured one is the pre-commit case
+        StartupCase('render.py, cached templates', render, PROJECT_PATH,
+                    budget_ms=150, forbidden=('troposphere', 'awacs', 'boto3'), setup=render),
+    ]
+
+
+def usage():
+    usage_string = """
+    SYNOPSIS
+        startup_budget.py [-f factor]
+
+        Measures the import time of the entry points with python -X importtime and
+        fails when one goes over its budget or imports a forbidden module.
+
+        Where:
+            factor - Multiplies every budget, for slow machines. 1 by default.
+
+    """
+    print(usage_string)
+    sys.exit(1)
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'f:h')
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(1)
+
+    factor = 1.0
+    for o, a in opts:
+        if o in ('-f', '--factor'):
+            factor = float(a)
+        elif o in ('-h', '--help'):
+            usage()
+        else:
+            assert False, "unhandled option %s" % (o)
+
+    failed = False
+    output_dir = tempfile.mkdtemp()
+    for case in cases(output_dir):
+        import_ms, modules = case.measure()
+        budget_ms = case.budget_ms * factor
+        imported = sorted(set(case.forbidden) & modules)
+        ok = import_ms <= budget_ms and not imported
+        failed = failed or not ok
+        print("%-32s %8.1f ms / %6.1f ms %s%s" % (case.name, import_ms, budget_ms, 'OK' if ok else 'FAILED',
+                                                 ' imports ' + ', '.join(imported) if imported else ''))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import getopt
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from stacks.stack_config import load_environment, load_environment_config
+from stacks.stack_descriptions import DEFAULT_TTL, StackDescriptions, cloudformation_client
+
+PROJECT_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+class Status(object):
+    """Status and outputs of every stack of an environment
+
+    Stacks are described concurrently, one DescribeStacks call per stack. It
+    is the same as running these commands from console, without their
+    serial calls:
+    sceptre --var "profile=aws-account" status dev
+    sceptre --var "profile=aws-account" list outputs dev/hive-emr.yaml
+    """
+
+    def __init__(self, environment, max_workers, sceptre_vars, outputs=False, stack_descriptions=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.environment = environment
+        self.max_workers = max_workers
+        self.outputs = outputs
+        self.stacks = load_environment(PROJECT_PATH, environment)
+        config = load_environment_config(PROJECT_PATH, environment, sceptre_vars)
+        self.project_code = config['project_code']
+        self.stack_descriptions = stack_descriptions or StackDescriptions(
+            cloudformation_client(config.get('profile'), config.get('region'), max_workers), DEFAULT_TTL)
+
+        self.logger.info("environment: %s" % (self.environment))
+        self.logger.info("max_workers: %d" % (self.max_workers))
+        self.logger.info("stacks: %s" % (', '.join(sorted(self.stacks))))
+
+    def _describe(self, stack_path):
+        return self.stack_descriptions.get(self.stacks[stack_path].stack_name(self.project_code))
+
+    def run(self):
+        stack_paths = sorted(self.stacks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            descriptions = list(executor.map(self._describe, stack_paths))
+
+        for stack_path, description in zip(stack_paths, descriptions):
+            # Sceptre names the stacks that were never launched PENDING
+            print("%s: %s" % (stack_path, description['StackStatus'] if description else 'PENDING'))
+            if self.outputs and description:
+                # From the cached description above, see DEFAULT_TTL
+                outputs = self.stack_descriptions.outputs(self.stacks[stack_path].stack_name(self.project_code))
+                for output_key, output_value in sorted(outputs.items()):
+                    print("    %s: %s" % (output_key, output_value))
+        return 0
+
+
+def usage():
+    usage_string = """
+    SYNOPSIS
+        status.py -e environment [-j workers] [-v var]... [-o]
+
+        Where:
+            environment - Sceptre environment, directory under config. Example: dev
+            workers - Number of stacks described at the same time. 10 by default.
+            var - Sceptre variable. Example: profile=aws-account
+            -o - Print the outputs of the stacks too.
+
+    """
+    print(usage_string)
+    sys.exit(1)
+
+
+def main():
+    # Logging information
+    logging.basicConfig(filename='output.log', level=logging.DEBUG)
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'e:j:v:oh')
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(1)
+
+    environment = ''
+    max_workers = 10
+    sceptre_vars = []
+    outputs = False
+    for o, a in opts:
+        if o in ('-e', '--environment'):
+            environment = a
+        elif o in ('-j', '--workers'):
+            max_workers = int(a)
+        elif o in ('-v', '--var'):
+            sceptre_vars.append(a)
+        elif o in ('-o', '--outputs'):
+            outputs = True
+        elif o in ('-h', '--help'):
+            usage()
+        else:
+            assert False, "unhandled option %s" % (o)
+
+    # Options are required
+    if not environment:
+        usage()
+
+    sys.exit(Status(environment, max_workers, sceptre_vars, outputs).run())
+
+
+if __name__ == '__main__':
+    main()
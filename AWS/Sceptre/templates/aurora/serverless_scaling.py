@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from troposphere import GetAtt, Ref
+import troposphere.awslambda as awslambda
+import troposphere.events as events
+import troposphere.iam as iam
+import troposphere.rds as rds
+
+ScalingProfile = namedtuple('ScalingProfile', ['min_capacity', 'max_capacity', 'auto_pause',
+                                               'seconds_until_auto_pause', 'timeout_action',
+                                               'seconds_before_timeout'])
+
+# Seconds Aurora looks for a scaling point before the TimeoutAction, 300 when not set
+SECONDS_BEFORE_TIMEOUT_RANGE = (60, 600)
+
+PROFILES = {
+    # The settings the cluster had so far
+    'default': ScalingProfile(2, 2, True, 300, None, None),
+    # Never paused, so no 30 seconds resume. Scaling waits a minute at most for a quiet moment.
+    'latency-sensitive': ScalingProfile(4, 16, False, None, 'ForceApplyCapacityChange', 60),
+    # Smallest capacity, paused as soon as possible, scaling never drops connections and
+    # keeps looking for a quiet moment for as long as it can
+    'cost-saver': ScalingProfile(2, 4, True, 300, 'RollbackCapacityChange', 600),
+    # Room for peaks, paused only after an idle hour, a peak does not wait long for capacity
+    'burst': ScalingProfile(2, 64, True, 3600, 'ForceApplyCapacityChange', 120),
+}
+
+# Every 4 minutes in business hours (UTC): the cluster is never idle for the 5 minutes
+# of the shortest auto pause.
+DEFAULT_KEEP_WARM_SCHEDULE = 'cron(0/4 7-19 ? * MON-FRI *)'
+
+# Opening a connection is enough to resume a paused cluster, no credentials needed
+KEEP_WARM_CODE = """import os
+import socket
+
+
+def handler(event, context):
+    connection = socket.create_connection((os.environ['DATABASE_ADDRESS'], int(os.environ['DATABASE_PORT'])),
+                                          timeout=50)
+    connection.close()
+"""
+
+
+class ScalingConfiguration(rds.ScalingConfiguration):
+    """troposphere 2.4.9 misses TimeoutAction and SecondsBeforeTimeout"""
+    props = dict(rds.ScalingConfiguration.props, TimeoutAction=(str, False), SecondsBeforeTimeout=(int, False))
+
+
+def scaling_profile_from_user_data(sceptre_user_data):
+    """ScalingProfile described in sceptre_user_data, the default profile without a Scaling key
+
+    Scaling:
+        Profile: latency-sensitive
+        # Optional, override the profile
+        MinCapacity: 8
+        MaxCapacity: 32
+        SecondsUntilAutoPause: 900
+        TimeoutAction: RollbackCapacityChange
+        SecondsBeforeTimeout: 300
+    """
+    scaling = (sceptre_user_data or {}).get('Scaling') or {}
+    profile_name = scaling.get('Profile', 'default')
+    if profile_name not in PROFILES:
+        raise Exception('Scaling profile %s: must be one of %s' % (profile_name, ', '.join(sorted(PROFILES))))
+
+    profile = PROFILES[profile_name]
+    return profile._replace(
+        min_capacity=scaling.get('MinCapacity', profile.min_capacity),
+        max_capacity=scaling.get('MaxCapacity', profile.max_capacity),
+        seconds_until_auto_pause=scaling.get('SecondsUntilAutoPause', profile.seconds_until_auto_pause),
+        timeout_action=scaling.get('TimeoutAction', profile.timeout_action),
+        seconds_before_timeout=scaling.get('SecondsBeforeTimeout', profile.seconds_before_timeout)
+    )
+
+
+def scaling_configuration(profile):
+    if profile.min_capacity > profile.max_capacity:
+        raise Exception('Scaling: MinCapacity %d is over MaxCapacity %d' % (profile.min_capacity, profile.max_capacity))
+
+    configuration = ScalingConfiguration(
+        AutoPause=profile.auto_pause,
+        MaxCapacity=profile.max_capacity,
+        MinCapacity=profile.min_capacity
+    )
+    if profile.auto_pause:
+        configuration.SecondsUntilAutoPause = profile.seconds_until_auto_pause
+    if profile.timeout_action:
+        configuration.TimeoutAction = profile.timeout_action
+    if profile.seconds_before_timeout is not None:
+        if not SECONDS_BEFORE_TIMEOUT_RANGE[0] <= profile.seconds_before_timeout <= SECONDS_BEFORE_TIMEOUT_RANGE[1]:
+            raise Exception('Scaling: SecondsBeforeTimeout must be between %d and %d' % SECONDS_BEFORE_TIMEOUT_RANGE)
+        configuration.SecondsBeforeTimeout = profile.seconds_before_timeout
+    return configuration
+
+
+def keep_warm_resources(db_cluster, subnet_ids, security_group_id, schedule):
+    """Scheduled Lambda that connects to the cluster so it is not paused in business hours
+
+    It runs in the subnets of the data base, so the security group must allow
+    the data base port from itself.
+    """
+    role = iam.Role(
+        'KeepWarmRole',
+        AssumeRolePolicyDocument={
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Effect": "Allow",
+                    "Principal": {
+                        "Service": "lambda.amazonaws.com"
+                    },
+                    "Action": "sts:AssumeRole"
+                }
+            ]
+        },
+        ManagedPolicyArns=[
+            'arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole'
+        ]
+    )
+
+    function = awslambda.Function(
+        'KeepWarmFunction',
+        Description='Keeps the Aurora serverless cluster warm',
+        Code=awslambda.Code(
+            ZipFile=KEEP_WARM_CODE
+        ),
+        Handler='index.handler',
+        Runtime='python3.12',
+        MemorySize=128,
+        # A paused cluster takes around 30 seconds to resume
+        Timeout=60,
+        Role=GetAtt(role, 'Arn'),
+        VpcConfig=awslambda.VPCConfig(
+            SecurityGroupIds=[security_group_id],
+            SubnetIds=subnet_ids
+        ),
+        Environment=awslambda.Environment(
+            Variables={
+                'DATABASE_ADDRESS': GetAtt(db_cluster, 'Endpoint.Address'),
+                'DATABASE_PORT': GetAtt(db_cluster, 'Endpoint.Port')
+            }
+        )
+    )
+
+    rule = events.Rule(
+        'KeepWarmSchedule',
+        Description='Business hours of the dashboards',
+        ScheduleExpression=schedule,
+        State='ENABLED',
+        Targets=[
+            events.Target(
+                Arn=GetAtt(function, 'Arn'),
+                Id='KeepWarmFunction'
+            )
+        ]
+    )
+
+    permission = awslambda.Permission(
+        'KeepWarmPermission',
+        Action='lambda:InvokeFunction',
+        FunctionName=Ref(function),
+        Principal='events.amazonaws.com',
+        SourceArn=GetAtt(rule, 'Arn')
+    )
+
+    return [role, function, rule, permission]
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+from functools import lru_cache
+
+import troposphere.emr as emr
+
+# Compact spec of an EMR autoscaling rule. Hashable, so rules are built once per spec.
+ScalingRuleSpec = namedtuple('ScalingRuleSpec', ['name', 'metric', 'comparison', 'threshold', 'unit',
+                                                 'adjustment', 'cooldown', 'period', 'evaluation_periods'])
+ScalingRuleSpec.__new__.__defaults__ = (300, 300, 1)
+
+
+def scale_out_on_low_yarn_memory(threshold, adjustment=1, cooldown=300, period=300):
+    return ScalingRuleSpec('YARNMemory-scale-out', 'YARNMemoryAvailablePercentage', 'LESS_THAN',
+                           threshold, 'PERCENT', adjustment, cooldown, period)
+
+
+def scale_out_on_pending_containers(threshold, adjustment=1, cooldown=300, period=300):
+    return ScalingRuleSpec('ContainerPending-scale-out', 'ContainerPendingRatio', 'GREATER_THAN',
+                           threshold, 'COUNT', adjustment, cooldown, period)
+
+
+def scale_in_on_high_yarn_memory(threshold, adjustment=-1, cooldown=300, period=300):
+    return ScalingRuleSpec('YARNMemory-scale-in', 'YARNMemoryAvailablePercentage', 'GREATER_THAN',
+                           threshold, 'PERCENT', adjustment, cooldown, period)
+
+
+# Serialised ScalingRule by spec, shared by every policy and template rendered by the process
+_serialised_rules = {}
+
+
+class ScalingRule(emr.ScalingRule):
+    """emr.ScalingRule of a spec, validated and serialised once per spec"""
+
+    def __init__(self, spec, **kwargs):
+        # Set before troposphere initialises the object, it only accepts properties after
+        self.spec = spec
+        super(ScalingRule, self).__init__(**kwargs)
+
+    def to_dict(self):
+        if self.spec not in _serialised_rules:
+            _serialised_rules[self.spec] = super(ScalingRule, self).to_dict()
+        # troposphere copies it while encoding the template
+        return _serialised_rules[self.spec]
+
+
+# EMR instance group policies are rule based, there is no target tracking: the presets
+# keep a target band of free YARN memory instead.
+PRESETS = {
+    # The rules every cluster used so far
+    'default': (
+        scale_out_on_low_yarn_memory(15),
+        scale_out_on_pending_containers(0.75),
+        scale_in_on_high_yarn_memory(75.0),
+    ),
+    # Region servers are slow to rebalance: scale out early, scale in late and slowly.
+    'hbase': (
+        scale_out_on_low_yarn_memory(25, cooldown=600),
+        scale_in_on_high_yarn_memory(85.0, cooldown=1800, period=900),
+    ),
+    # Bursty queries: react to queued containers and scale out by two nodes.
+    'hive': (
+        scale_out_on_low_yarn_memory(20, adjustment=2),
+        scale_out_on_pending_containers(0.5, adjustment=2),
+        scale_in_on_high_yarn_memory(75.0, cooldown=600),
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def scaling_rule(spec):
+    """ScalingRule of a spec. The same object is shared by every policy using it, do not modify it."""
+    return ScalingRule(
+        spec,
+        Name=spec.name,
+        Description='',
+        Action=emr.ScalingAction(
+            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
+                AdjustmentType='CHANGE_IN_CAPACITY',
+                ScalingAdjustment=spec.adjustment,
+                CoolDown=spec.cooldown
+            )
+        ),
+        Trigger=emr.ScalingTrigger(
+            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
+                ComparisonOperator=spec.comparison,
+                EvaluationPeriods=spec.evaluation_periods,
+                MetricName=spec.metric,
+                Namespace="AWS/ElasticMapReduce",
+                Period=spec.period,
+                Statistic="AVERAGE",
+                Threshold=spec.threshold,
+                Unit=spec.unit,
+                Dimensions=[
+                    emr.MetricDimension(
+                        "JobFlowId", "${emr.clusterId}"
+                    )
+                ]
+            )
+        )
+    )
+
+
+def auto_scaling_policy(min_capacity, max_capacity, specs):
+    return emr.AutoScalingPolicy(
+        Constraints=emr.ScalingConstraints(
+            MinCapacity=str(min_capacity),
+            MaxCapacity=str(max_capacity)
+        ),
+        Rules=[scaling_rule(spec) for spec in specs]
+    )
+
+
+def auto_scaling_policy_from_user_data(sceptre_user_data, default_preset='default'):
+    """Autoscaling policy described in sceptre_user_data
+
+    AutoScaling:
+        Preset: hbase
+        MinCapacity: 1
+        MaxCapacity: 4
+        # Optional, replaces the rules of the preset with the same name
+        Rules:
+            - Name: YARNMemory-scale-out
+              Metric: YARNMemoryAvailablePercentage
+              Comparison: LESS_THAN
+              Threshold: 30
+              Unit: PERCENT
+              Adjustment: 2
+              Cooldown: 300
+    """
+    auto_scaling = (sceptre_user_data or {}).get('AutoScaling') or {}
+    preset = auto_scaling.get('Preset', default_preset)
+    if preset not in PRESETS:
+        raise Exception('AutoScaling: unknown Preset %s, must be one of %s' % (preset, ', '.join(sorted(PRESETS))))
+    specs = list(PRESETS[preset])
+    for rule in auto_scaling.get('Rules') or []:
+        spec = ScalingRuleSpec(rule['Name'], rule['Metric'], rule['Comparison'], rule['Threshold'],
+                               rule['Unit'], rule['Adjustment'], rule.get('Cooldown', 300),
+                               rule.get('Period', 300), rule.get('EvaluationPeriods', 1))
+        specs = [existing for existing in specs if existing.name != spec.name] + [spec]
+
+    return auto_scaling_policy(auto_scaling.get('MinCapacity', 1), auto_scaling.get('MaxCapacity', 2), specs)
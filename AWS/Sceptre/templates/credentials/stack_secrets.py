@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from troposphere import GetAtt, Ref
+from troposphere.cloudformation import CustomResource
+
+
+class Secrets(CustomResource):
+    """Custom resource of AWS/CloudFormation/templates/customresources/secrets"""
+    resource_type = 'Custom::Secrets'
+    props = dict(CustomResource.props, SecretIds=(dict, False), ParameterNames=(dict, False))
+
+
+class StackSecrets(object):
+    """Values of a stack resolved from Secrets Manager and SSM instead of plaintext parameters
+
+    Secrets:
+        # The secrets custom resource function
+        ServiceToken: arn:aws:lambda:eu-west-1:123456789012:function:secrets
+        # Name of the value: secret id or ARN
+        SecretIds:
+            MasterUserPassword: hive/dev/metastore
+        # Name of the value: parameter name
+        ParameterNames:
+            DatabasePassword: /hive/dev/metastore/password
+
+    Values without a secret keep their stack parameter.
+    """
+
+    def __init__(self, sceptre_user_data):
+        self.secrets = (sceptre_user_data or {}).get('Secrets') or {}
+        if self.secrets and not self.secrets.get('ServiceToken'):
+            raise Exception('Secrets: ServiceToken is required')
+        self.__resource = None
+
+    def resolves(self, name):
+        return name in (self.secrets.get('SecretIds') or {}) or name in (self.secrets.get('ParameterNames') or {})
+
+    def resource(self):
+        """The Secrets resource of the stack, None without secrets"""
+        if not self.secrets:
+            return None
+        if self.__resource is None:
+            self.__resource = Secrets('Secrets', ServiceToken=self.secrets['ServiceToken'])
+            if self.secrets.get('SecretIds'):
+                self.__resource.SecretIds = self.secrets['SecretIds']
+            if self.secrets.get('ParameterNames'):
+                self.__resource.ParameterNames = self.secrets['ParameterNames']
+        return self.__resource
+
+    def value(self, name, parameter):
+        """The resolved value of name, the parameter without a secret for it"""
+        if self.resolves(name):
+            return GetAtt(self.resource(), name)
+        return Ref(parameter)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+from troposphere import AWSProperty
+import troposphere.emr as emr
+
+# Size of an instance type in units of a .large instance, the default weighted capacity
+SIZE_UNITS = {
+    'large': 1,
+    'xlarge': 2,
+    '2xlarge': 4,
+    '4xlarge': 8,
+    '8xlarge': 16,
+    '12xlarge': 24,
+    '16xlarge': 32,
+    '24xlarge': 48,
+}
+# Instance types of a core or task fleet. Up to 30 with an allocation strategy (spot
+# fleets get one), 5 without. EMR only allows one for the master fleet.
+MAX_INSTANCE_TYPES = 30
+MAX_INSTANCE_TYPES_WITHOUT_ALLOCATION_STRATEGY = 5
+
+
+class SpotProvisioningSpecification(emr.SpotProvisioningSpecification):
+    """troposphere 2.4.9 misses AllocationStrategy"""
+    props = dict(emr.SpotProvisioningSpecification.props, AllocationStrategy=(str, False))
+
+
+class OnDemandProvisioningSpecification(AWSProperty):
+    props = {
+        'AllocationStrategy': (str, True),
+    }
+
+
+class InstanceFleetProvisioningSpecifications(emr.InstanceFleetProvisioningSpecifications):
+    """troposphere 2.4.9 misses OnDemandSpecification and requires SpotSpecification"""
+    props = {
+        'OnDemandSpecification': (OnDemandProvisioningSpecification, False),
+        'SpotSpecification': (emr.SpotProvisioningSpecification, False),
+    }
+
+
+def weighted_capacity(instance_type):
+    """m5.2xlarge weights 4: capacity is counted in .large instances"""
+    size = instance_type.split('.')[-1]
+    if size not in SIZE_UNITS:
+        raise Exception('Instance type %s: unknown size, WeightedCapacity is required' % (instance_type))
+    return SIZE_UNITS[size]
+
+
+def instance_type_config(instance_type, weighted=True, ebs_configuration=None):
+    """InstanceTypeConfig of a type name or of a dict with InstanceType and its settings"""
+    if not isinstance(instance_type, dict):
+        instance_type = {'InstanceType': instance_type}
+
+    config = emr.InstanceTypeConfig(InstanceType=instance_type['InstanceType'])
+    if weighted:
+        config.WeightedCapacity = instance_type.get('WeightedCapacity',
+                                                    weighted_capacity(instance_type['InstanceType']))
+    else:
+        # The master fleet always has one instance
+        config.WeightedCapacity = 1
+    if 'BidPriceAsPercentageOfOnDemandPrice' in instance_type:
+        config.BidPriceAsPercentageOfOnDemandPrice = str(instance_type['BidPriceAsPercentageOfOnDemandPrice'])
+    if 'BidPrice' in instance_type:
+        config.BidPrice = str(instance_type['BidPrice'])
+    if ebs_configuration is not None:
+        config.EbsConfiguration = ebs_configuration
+    return config
+
+
+def launch_specifications(fleet):
+    """Spot timeout and allocation strategies of a fleet, None when it has no spot capacity"""
+    if not fleet.get('TargetSpotCapacity'):
+        return None
+
+    specifications = InstanceFleetProvisioningSpecifications(
+        SpotSpecification=SpotProvisioningSpecification(
+            AllocationStrategy=fleet.get('AllocationStrategy', 'capacity-optimized'),
+            TimeoutAction=fleet.get('TimeoutAction', 'SWITCH_TO_ON_DEMAND'),
+            TimeoutDurationMinutes=fleet.get('TimeoutDurationMinutes', 10)
+        )
+    )
+    if fleet.get('TargetOnDemandCapacity'):
+        specifications.OnDemandSpecification = OnDemandProvisioningSpecification(
+            AllocationStrategy=fleet.get('OnDemandAllocationStrategy', 'lowest-price')
+        )
+    return specifications
+
+
+def instance_fleet_properties(name, fleet, max_instance_types=None, weighted=True, ebs_configuration=None):
+    instance_types = fleet.get('InstanceTypes') or []
+    if max_instance_types is None:
+        max_instance_types = (MAX_INSTANCE_TYPES if fleet.get('TargetSpotCapacity')
+                              else MAX_INSTANCE_TYPES_WITHOUT_ALLOCATION_STRATEGY)
+    if not instance_types or len(instance_types) > max_instance_types:
+        raise Exception('%s: between 1 and %d instance types are required' % (name, max_instance_types))
+    if not fleet.get('TargetOnDemandCapacity') and not fleet.get('TargetSpotCapacity'):
+        raise Exception('%s: TargetOnDemandCapacity or TargetSpotCapacity is required' % (name))
+
+    properties = {
+        'Name': name,
+        'InstanceTypeConfigs': [instance_type_config(instance_type, weighted, ebs_configuration)
+                                for instance_type in instance_types],
+        'TargetOnDemandCapacity': fleet.get('TargetOnDemandCapacity', 0),
+        'TargetSpotCapacity': fleet.get('TargetSpotCapacity', 0),
+    }
+    specifications = launch_specifications(fleet)
+    if specifications is not None:
+        properties['LaunchSpecifications'] = specifications
+    return properties
+
+
+class InstanceFleets(object):
+    """Instance fleets described in sceptre_user_data
+
+    InstanceFleets:
+        Master:
+            TargetOnDemandCapacity: 1
+            InstanceTypes: [m5.xlarge]
+        Core:
+            TargetOnDemandCapacity: 2
+            TargetSpotCapacity: 8
+            # Optional, these are the defaults
+            AllocationStrategy: capacity-optimized
+            TimeoutAction: SWITCH_TO_ON_DEMAND
+            TimeoutDurationMinutes: 10
+            InstanceTypes:
+                - m5.xlarge
+                - m5a.xlarge
+                - InstanceType: r5.2xlarge
+                  WeightedCapacity: 4
+                  BidPriceAsPercentageOfOnDemandPrice: 100
+        # Optional, the same settings as Core
+        Task:
+            TargetSpotCapacity: 4
+            InstanceTypes: [m5.xlarge, m5a.xlarge, m4.xlarge]
+
+    Capacities are counted in WeightedCapacity units, by default the size of the
+    instance type in .large instances. Clusters with fleets cannot use instance
+    groups nor their AutoScalingPolicy. ebs_configuration, the data volumes, goes to
+    every instance type of the Core and Task fleets.
+    """
+
+    def __init__(self, sceptre_user_data, ebs_configuration=None):
+        self.fleets = (sceptre_user_data or {}).get('InstanceFleets') or {}
+        self.ebs_configuration = ebs_configuration
+
+        for role in self.fleets:
+            if role not in ('Master', 'Core', 'Task'):
+                raise Exception('InstanceFleets: unknown fleet %s' % (role))
+        if self.fleets:
+            if 'Master' not in self.fleets:
+                raise Exception('InstanceFleets: Master is required')
+            master = self.fleets['Master']
+            if master.get('TargetOnDemandCapacity', 0) + master.get('TargetSpotCapacity', 0) != 1:
+                raise Exception('InstanceFleets: Master target capacity must be 1')
+
+    @property
+    def enabled(self):
+        return bool(self.fleets)
+
+    def master(self):
+        return emr.InstanceFleetConfigProperty(
+            **instance_fleet_properties('Master Instance Fleet', self.fleets['Master'], max_instance_types=1,
+                                        weighted=False))
+
+    def core(self):
+        if 'Core' not in self.fleets:
+            return None
+        return emr.InstanceFleetConfigProperty(**instance_fleet_properties('Core Instance Fleet', self.fleets['Core'],
+                                                                           ebs_configuration=self.ebs_configuration))
+
+    def task(self, title, cluster_id):
+        if 'Task' not in self.fleets:
+            return None
+        return emr.InstanceFleetConfig(
+            title,
+            ClusterId=cluster_id,
+            InstanceFleetType='TASK',
+            **instance_fleet_properties('Task Instance Fleet', self.fleets['Task'],
+                                        ebs_configuration=self.ebs_configuration)
+        )
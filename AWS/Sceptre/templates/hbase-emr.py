@@ -4,6 +4,11 @@
 
 from troposphere import Parameter, Template, Output, GetAtt, StackName, Export, Ref, Join
 import troposphere.emr as emr
+from autoscaling.scaling_policy import auto_scaling_policy_from_user_data
+from fleets.instance_fleet import InstanceFleets
+from storage.storage_spec import ebs_configuration
+from tuning.hbase_tuning import hbase_tuning_from_user_data
+from rendering.template_cache import TemplateCache
 
 
 class HBaseInstanceGroup(object):
@@ -12,6 +17,9 @@ class HBaseInstanceGroup(object):
         self._template = Template(Description='HBase EMR Instance Group')
         self._template.AWSTemplateFormatVersion = '2010-09-09'
         self.sceptre_user_data = sceptre_user_data
+        self.hbase_tuning = hbase_tuning_from_user_data(sceptre_user_data)
+        # gp3 or io1 data volumes instead of the gp2 ones of the instance types, see ebs_configuration
+        self.ebs_configuration = ebs_configuration((sceptre_user_data or {}).get('DataVolumes'), 'DataVolumes')
         self.__add_arguments()
         self.__add_emr()
 
@@ -127,6 +135,9 @@ class HBaseInstanceGroup(object):
                 Description='EC2 instance type: https://aws.amazon.com/ec2/instance-types/ '
             )
         )
+        if self.hbase_tuning is not None and not InstanceFleets(self.sceptre_user_data).enabled:
+            # HBase settings are sized for this instance type
+            self.__ec2_instance_type.AllowedValues = [self.hbase_tuning.region_server.name]
 
     def __add_outputs(self):
         self._template.add_output(
@@ -139,6 +150,8 @@ class HBaseInstanceGroup(object):
         )
 
     def __add_emr(self):
+        instance_fleets = InstanceFleets(self.sceptre_user_data, self.ebs_configuration)
+
         cluster = emr.Cluster('HBaseEMR')
         cluster.Name = 'HBaseEMR'
         cluster.LogUri = Ref(self.__emr_log_uri)
@@ -154,12 +167,16 @@ class HBaseInstanceGroup(object):
                 Name='HBase'
             )
         ]
+        hbase_site = {
+            "hbase.rootdir": "s3://gumartinm-hbase/"
+        }
+        if self.hbase_tuning is not None:
+            hbase_site.update(self.hbase_tuning.hbase_site())
+
         cluster.Configurations = [
             emr.Configuration(
                 Classification="hbase-site",
-                ConfigurationProperties={
-                    "hbase.rootdir": "s3://gumartinm-hbase/"
-                }
+                ConfigurationProperties=hbase_site
             ),
             emr.Configuration(
                 Classification="hbase",
@@ -180,9 +197,11 @@ class HBaseInstanceGroup(object):
                 }
             )
         ]
+        if self.hbase_tuning is not None:
+            cluster.Configurations.extend(self.hbase_tuning.configurations())
         cluster.AutoScalingRole = Ref(self.__emr_autoscaling_role)
         cluster.ScaleDownBehavior = "TERMINATE_AT_TASK_COMPLETION"
-        cluster.EbsRootVolumeSize = 10
+        cluster.EbsRootVolumeSize = (self.sceptre_user_data or {}).get('EbsRootVolumeSize', 10)
         cluster.Instances = emr.JobFlowInstancesConfig(
             AdditionalMasterSecurityGroups=[
                 Ref(self.__additional_master_security_group)
@@ -195,116 +214,46 @@ class HBaseInstanceGroup(object):
             EmrManagedMasterSecurityGroup=Ref(self.__master_security_group),
             EmrManagedSlaveSecurityGroup=Ref(self.__slave_security_group),
             KeepJobFlowAliveWhenNoSteps=True,
-            TerminationProtected=False,
-            MasterInstanceGroup=emr.InstanceGroupConfigProperty(
-                "MasterInstanceGroup",
-                Name="Master Instance Group",
-                InstanceCount="3",
-                InstanceType=Ref(self.__ec2_instance_type),
-                Market="ON_DEMAND"
-            ),
-            CoreInstanceGroup=emr.InstanceGroupConfigProperty(
-                "CoreInstanceGroup",
-                Name="Core Instance Group",
-                Market="SPOT",
-                InstanceType=Ref(self.__ec2_instance_type),
-                InstanceCount=2,
-                AutoScalingPolicy=emr.AutoScalingPolicy(
-                    Constraints=emr.ScalingConstraints(
-                        MinCapacity="1",
-                        MaxCapacity="2"
-                    ),
-                    Rules=[
-                        emr.ScalingRule(
-                            Name='YARNMemory-scale-out',
-                            Description='',
-                            Action=emr.ScalingAction(
-                                SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                                    AdjustmentType='CHANGE_IN_CAPACITY',
-                                    ScalingAdjustment=1,
-                                    CoolDown=300
-                                )
-                            ),
-                            Trigger=emr.ScalingTrigger(
-                                CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                                    ComparisonOperator="LESS_THAN",
-                                    EvaluationPeriods=1,
-                                    MetricName="YARNMemoryAvailablePercentage",
-                                    Namespace="AWS/ElasticMapReduce",
-                                    Period=300,
-                                    Statistic="AVERAGE",
-                                    Threshold=15,
-                                    Unit="PERCENT",
-                                    Dimensions=[
-                                        emr.MetricDimension(
-                                            "JobFlowId", "${emr.clusterId}"
-                                        )
-                                    ]
-                                )
-                            )
-                        ),
-                        emr.ScalingRule(
-                            Name='ContainerPending-scale-out',
-                            Description='',
-                            Action=emr.ScalingAction(
-                                SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                                    AdjustmentType='CHANGE_IN_CAPACITY',
-                                    ScalingAdjustment=1,
-                                    CoolDown=300
-                                )
-                            ),
-                            Trigger=emr.ScalingTrigger(
-                                CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                                    ComparisonOperator="GREATER_THAN",
-                                    EvaluationPeriods=1,
-                                    MetricName="ContainerPendingRatio",
-                                    Namespace="AWS/ElasticMapReduce",
-                                    Period=300,
-                                    Statistic="AVERAGE",
-                                    Threshold=0.75,
-                                    Unit="COUNT",
-                                    Dimensions=[
-                                        emr.MetricDimension(
-                                            "JobFlowId", "${emr.clusterId}"
-                                        )
-                                    ]
-                                )
-                            )
-                        ),
-                        emr.ScalingRule(
-                            Name='YARNMemory-scale-in',
-                            Description='',
-                            Action=emr.ScalingAction(
-                                SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                                    AdjustmentType='CHANGE_IN_CAPACITY',
-                                    ScalingAdjustment=-1,
-                                    CoolDown=300
-                                )
-                            ),
-                            Trigger=emr.ScalingTrigger(
-                                CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                                    ComparisonOperator="GREATER_THAN",
-                                    EvaluationPeriods=1,
-                                    MetricName="YARNMemoryAvailablePercentage",
-                                    Namespace="AWS/ElasticMapReduce",
-                                    Period=300,
-                                    Statistic="AVERAGE",
-                                    Threshold=75.0,
-                                    Unit="PERCENT",
-                                    Dimensions=[
-                                        emr.MetricDimension(
-                                            "JobFlowId", "${emr.clusterId}"
-                                        )
-                                    ]
-                                )
-                            )
-                        )
-                    ]
-                )
-            )
+            TerminationProtected=False
         )
         self._template.add_resource(cluster)
 
+        if instance_fleets.enabled:
+            self.__add_instance_fleets(cluster, instance_fleets)
+        else:
+            self.__add_instance_groups(cluster)
+
+    def __add_instance_fleets(self, cluster, instance_fleets):
+        """Spot capacity spread across several instance types, see InstanceFleets"""
+        cluster.Instances.MasterInstanceFleet = instance_fleets.master()
+        core_instance_fleet = instance_fleets.core()
+        if core_instance_fleet is None:
+            raise Exception('InstanceFleets: HBase requires a Core fleet for its region servers')
+        cluster.Instances.CoreInstanceFleet = core_instance_fleet
+
+        task_instance_fleet = instance_fleets.task('TaskInstanceFleet', Ref(cluster))
+        if task_instance_fleet is not None:
+            self._template.add_resource(task_instance_fleet)
+
+    def __add_instance_groups(self, cluster):
+        auto_scaling_policy = auto_scaling_policy_from_user_data(self.sceptre_user_data)
+
+        cluster.Instances.MasterInstanceGroup = emr.InstanceGroupConfigProperty(
+            "MasterInstanceGroup",
+            Name="Master Instance Group",
+            InstanceCount="3",
+            InstanceType=Ref(self.__ec2_instance_type),
+            Market="ON_DEMAND"
+        )
+        cluster.Instances.CoreInstanceGroup = emr.InstanceGroupConfigProperty(
+            "CoreInstanceGroup",
+            Name="Core Instance Group",
+            Market="SPOT",
+            InstanceType=Ref(self.__ec2_instance_type),
+            InstanceCount=2,
+            AutoScalingPolicy=auto_scaling_policy
+        )
+
         instance_group_config = emr.InstanceGroupConfig(
             'TaskInstanceGroup',
             Name="Task Instance Group",
@@ -313,106 +262,23 @@ class HBaseInstanceGroup(object):
             InstanceType=Ref(self.__ec2_instance_type),
             InstanceRole='TASK',
             Market='SPOT',
-            AutoScalingPolicy=emr.AutoScalingPolicy(
-                Constraints=emr.ScalingConstraints(
-                    MinCapacity="1",
-                    MaxCapacity="2"
-                ),
-                Rules=[
-                    emr.ScalingRule(
-                        Name='YARNMemory-scale-out',
-                        Description='',
-                        Action=emr.ScalingAction(
-                            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                                AdjustmentType='CHANGE_IN_CAPACITY',
-                                ScalingAdjustment=1,
-                                CoolDown=300
-                            )
-                        ),
-                        Trigger=emr.ScalingTrigger(
-                            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                                ComparisonOperator="LESS_THAN",
-                                EvaluationPeriods=1,
-                                MetricName="YARNMemoryAvailablePercentage",
-                                Namespace="AWS/ElasticMapReduce",
-                                Period=300,
-                                Statistic="AVERAGE",
-                                Threshold=15,
-                                Unit="PERCENT",
-                                Dimensions=[
-                                    emr.MetricDimension(
-                                        "JobFlowId", "${emr.clusterId}"
-                                    )
-                                ]
-                            )
-                        )
-                    ),
-                    emr.ScalingRule(
-                        Name='ContainerPeding-scale-out',
-                        Description='',
-                        Action=emr.ScalingAction(
-                            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                                AdjustmentType='CHANGE_IN_CAPACITY',
-                                ScalingAdjustment=1,
-                                CoolDown=300
-                            )
-                        ),
-                        Trigger=emr.ScalingTrigger(
-                            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                                ComparisonOperator="GREATER_THAN",
-                                EvaluationPeriods=1,
-                                MetricName="ContainerPendingRatio",
-                                Namespace="AWS/ElasticMapReduce",
-                                Period=300,
-                                Statistic="AVERAGE",
-                                Threshold=0.75,
-                                Unit="COUNT",
-                                Dimensions=[
-                                    emr.MetricDimension(
-                                        "JobFlowId", "${emr.clusterId}"
-                                    )
-                                ]
-                            )
-                        )
-                    ),
-                    emr.ScalingRule(
-                        Name='YARNMemory-scale-in',
-                        Description='',
-                        Action=emr.ScalingAction(
-                            SimpleScalingPolicyConfiguration=emr.SimpleScalingPolicyConfiguration(
-                                AdjustmentType='CHANGE_IN_CAPACITY',
-                                ScalingAdjustment=-1,
-                                CoolDown=300
-                            )
-                        ),
-                        Trigger=emr.ScalingTrigger(
-                            CloudWatchAlarmDefinition=emr.CloudWatchAlarmDefinition(
-                                ComparisonOperator="GREATER_THAN",
-                                EvaluationPeriods=1,
-                                MetricName="YARNMemoryAvailablePercentage",
-                                Namespace="AWS/ElasticMapReduce",
-                                Period=300,
-                                Statistic="AVERAGE",
-                                Threshold=75.0,
-                                Unit="PERCENT",
-                                Dimensions=[
-                                    emr.MetricDimension(
-                                        "JobFlowId", "${emr.clusterId}"
-                                    )
-                                ]
-                            )
-                        )
-                    )
-                ]
-            )
+            AutoScalingPolicy=auto_scaling_policy
         )
+        if self.ebs_configuration is not None:
+            # Region servers and node managers run on the core and task instances
+            cluster.Instances.CoreInstanceGroup.EbsConfiguration = self.ebs_configuration
+            instance_group_config.EbsConfiguration = self.ebs_configuration
         self._template.add_resource(instance_group_config)
 
 
-def sceptre_handler(sceptre_user_data):
+def render(sceptre_user_data):
     emr_instance_group = HBaseInstanceGroup(sceptre_user_data)
     return emr_instance_group._template.to_json()
 
 
+def sceptre_handler(sceptre_user_data):
+    return TemplateCache().render(__file__, sceptre_user_data, lambda: render(sceptre_user_data))
+
+
 if __name__ == '__main__':
     print(sceptre_handler(""))
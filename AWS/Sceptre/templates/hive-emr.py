@@ -3,8 +3,13 @@
 #
 
 from troposphere import Parameter, Template, Ref, Join, Output, GetAtt, Export, StackName
-from troposphere.constants import M5_2XLARGE
 import troposphere.emr as emr
+from fleets.instance_fleet import InstanceFleets
+from metastore.metastore_pool import JDBC_URL_OPTIONS, hive_site, metastore_pool_from_user_data
+from storage.storage_spec import ebs_configuration
+from tuning.hive_tuning import hive_tuning_from_user_data
+from credentials.stack_secrets import StackSecrets
+from rendering.template_cache import TemplateCache
 
 
 class HiveEMRInstanceGroup(object):
@@ -13,6 +18,13 @@ class HiveEMRInstanceGroup(object):
         self._template = Template(Description='Hive EMR Instance Group')
         self._template.AWSTemplateFormatVersion = '2010-09-09'
         self.sceptre_user_data = sceptre_user_data
+        self.hive_tuning = hive_tuning_from_user_data(sceptre_user_data)
+        # Passwords from Secrets Manager or SSM instead of plaintext parameters, see StackSecrets
+        self.__secrets = StackSecrets(sceptre_user_data)
+        if self.__secrets.resource() is not None:
+            self._template.add_resource(self.__secrets.resource())
+        # gp3 or io1 data volumes instead of the gp2 ones of the instance types, see ebs_configuration
+        self.ebs_configuration = ebs_configuration((sceptre_user_data or {}).get('DataVolumes'), 'DataVolumes')
         self.__add_arguments()
         self.__add_emr()
         self.__add_outputs()
@@ -137,15 +149,17 @@ class HiveEMRInstanceGroup(object):
                 Description='TCP port for database '
             )
         )
-        self.__database_password = self._template.add_parameter(
-            Parameter(
-                'DatabasePassword',
-                Type='String',
-                ConstraintDescription='password for data base.',
-                Description='Password for data base ',
-                NoEcho=True
+        self.__database_password = None
+        if not self.__secrets.resolves('DatabasePassword'):
+            self.__database_password = self._template.add_parameter(
+                Parameter(
+                    'DatabasePassword',
+                    Type='String',
+                    ConstraintDescription='password for data base.',
+                    Description='Password for data base ',
+                    NoEcho=True
+                )
             )
-        )
         self.__database_user_name = self._template.add_parameter(
             Parameter(
                 'DatabaseUserName',
@@ -156,28 +170,22 @@ class HiveEMRInstanceGroup(object):
         )
 
     def __add_emr(self):
+        instance_fleets = InstanceFleets(self.sceptre_user_data, self.ebs_configuration)
+
         hive_external_metastore_conf = emr.Configuration()
         hive_external_metastore_conf.Classification = "hive-site"
         hive_external_metastore_conf.ConfigurationProperties = {
             "javax.jdo.option.ConnectionURL": Join("", ["jdbc:mysql://",
                                                         Ref(self.__database_address), ":",
                                                         Ref(self.__database_port),
-                                                        "/hive?createDatabaseIfNotExist=true"]),
+                                                        "/hive?", JDBC_URL_OPTIONS]),
             "javax.jdo.option.ConnectionDriverName": "org.mariadb.jdbc.Driver",
             "javax.jdo.option.ConnectionUserName": Ref(self.__database_user_name),
-            "javax.jdo.option.ConnectionPassword": Ref(self.__database_password)
+            "javax.jdo.option.ConnectionPassword": self.__secrets.value('DatabasePassword', self.__database_password)
         }
-
-        hive_env_configuration = emr.Configuration()
-        hive_env_configuration.Classification = "hive-env"
-        hive_env_configuration.Configurations = [
-            emr.Configuration(
-                Classification="export",
-                ConfigurationProperties={
-                    "HADOOP_HEAPSIZE": "10240"
-                }
-            )
-        ]
+        hive_external_metastore_conf.ConfigurationProperties.update(
+            hive_site(metastore_pool_from_user_data(self.sceptre_user_data)))
+        hive_external_metastore_conf.ConfigurationProperties.update(self.hive_tuning.hive_site())
 
         cluster = emr.Cluster('HiveEMR')
         cluster.Name = 'HiveEMR'
@@ -192,15 +200,17 @@ class HiveEMRInstanceGroup(object):
             ),
             emr.Application(
                 Name='Hive'
+            ),
+            emr.Application(
+                Name='Tez'
             )
         ]
         cluster.Configurations = [
-            hive_external_metastore_conf,
-            hive_env_configuration
-        ]
+            hive_external_metastore_conf
+        ] + self.hive_tuning.configurations()
         cluster.AutoScalingRole = Ref(self.__emr_autoscaling_role)
         cluster.ScaleDownBehavior = "TERMINATE_AT_TASK_COMPLETION"
-        cluster.EbsRootVolumeSize = 10
+        cluster.EbsRootVolumeSize = (self.sceptre_user_data or {}).get('EbsRootVolumeSize', 10)
         cluster.Instances = emr.JobFlowInstancesConfig(
             AdditionalMasterSecurityGroups=[
                 Ref(self.__additional_master_security_group)
@@ -213,17 +223,38 @@ class HiveEMRInstanceGroup(object):
             EmrManagedMasterSecurityGroup=Ref(self.__master_security_group),
             EmrManagedSlaveSecurityGroup=Ref(self.__slave_security_group),
             KeepJobFlowAliveWhenNoSteps=True,
-            TerminationProtected=False,
-            MasterInstanceGroup=emr.InstanceGroupConfigProperty(
-                "MasterInstanceGroup",
-                Name="Master Instance Group",
-                InstanceCount="1",
-                InstanceType=M5_2XLARGE,
-                Market="ON_DEMAND"
-            )
+            TerminationProtected=False
         )
         self._template.add_resource(cluster)
 
+        if instance_fleets.enabled:
+            self.__add_instance_fleets(cluster, instance_fleets)
+        else:
+            self.__add_instance_groups(cluster)
+
+    def __add_instance_fleets(self, cluster, instance_fleets):
+        """Spot capacity spread across several instance types, see InstanceFleets"""
+        cluster.Instances.MasterInstanceFleet = instance_fleets.master()
+        core_instance_fleet = instance_fleets.core()
+        if core_instance_fleet is not None:
+            cluster.Instances.CoreInstanceFleet = core_instance_fleet
+
+        task_instance_fleet = instance_fleets.task('TaskInstanceFleet', Ref(cluster))
+        if task_instance_fleet is not None:
+            self._template.add_resource(task_instance_fleet)
+
+    def __add_instance_groups(self, cluster):
+        cluster.Instances.MasterInstanceGroup = emr.InstanceGroupConfigProperty(
+            "MasterInstanceGroup",
+            Name="Master Instance Group",
+            InstanceCount="1",
+            InstanceType=self.hive_tuning.master.name,
+            Market="ON_DEMAND"
+        )
+        if self.ebs_configuration is not None:
+            # Without fleets the master is the only node, it runs the containers too
+            cluster.Instances.MasterInstanceGroup.EbsConfiguration = self.ebs_configuration
+
     def __add_outputs(self):
         self._template.add_output(
             Output(
@@ -234,10 +265,14 @@ class HiveEMRInstanceGroup(object):
             )
         )
 
-def sceptre_handler(sceptre_user_data):
+def render(sceptre_user_data):
     emr_instance_group = HiveEMRInstanceGroup(sceptre_user_data)
     return emr_instance_group._template.to_json()
 
 
+def sceptre_handler(sceptre_user_data):
+    return TemplateCache().render(__file__, sceptre_user_data, lambda: render(sceptre_user_data))
+
+
 if __name__ == '__main__':
     print(sceptre_handler(""))
@@ -9,6 +9,7 @@ import troposphere.iam as iam
 import awacs.aws as aws
 import awacs.awslambda as awslambda
 import awacs.sts as sts
+from rendering.template_cache import TemplateCache
 
 
 class IAMRoleAssumeRoleForLambda(object):
@@ -95,10 +96,14 @@ class IAMRoleAssumeRoleForLambda(object):
             )
         )
 
-def sceptre_handler(sceptre_user_data):
+def render(sceptre_user_data):
     assume_role_for_lambda = IAMRoleAssumeRoleForLambda(sceptre_user_data)
     return assume_role_for_lambda._template.to_json()
 
 
+def sceptre_handler(sceptre_user_data):
+    return TemplateCache().render(__file__, sceptre_user_data, lambda: render(sceptre_user_data))
+
+
 if __name__ == '__main__':
     print(sceptre_handler(""))
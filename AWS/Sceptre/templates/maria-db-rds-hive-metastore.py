@@ -4,6 +4,13 @@
 
 from troposphere import Parameter, Template, Ref, Output, Export, Join, StackName, GetAtt
 import troposphere.rds as rds
+from metastore.metastore_pool import database_connections, mariadb_parameters, metastore_pool_from_user_data
+from storage.rds_storage import DBInstance
+from storage.storage_spec import rds_storage_properties, volume_spec_from_user_data
+from tuning.parameter_group import parameter_group_builder_from_user_data, parameter_group_output, \
+    shared_parameter_group
+from credentials.stack_secrets import StackSecrets
+from rendering.template_cache import TemplateCache
 
 
 class MariaDBRDSHiveMetastore(object):
@@ -13,6 +20,11 @@ class MariaDBRDSHiveMetastore(object):
         self._template = Template(Description='MariaDB RDS Hive Metastore')
         self._template.AWSTemplateFormatVersion = '2010-09-09'
         self.sceptre_user_data = sceptre_user_data
+        self.__parameter_group_builder = parameter_group_builder_from_user_data(sceptre_user_data, 'mariadb10.3')
+        # Passwords from Secrets Manager or SSM instead of plaintext parameters, see StackSecrets
+        self.__secrets = StackSecrets(sceptre_user_data)
+        if self.__secrets.resource() is not None:
+            self._template.add_resource(self.__secrets.resource())
         self.__add_arguments()
         self.__add_rds()
         self.__add_outputs()
@@ -28,15 +40,17 @@ class MariaDBRDSHiveMetastore(object):
             AllowedPattern="[\\x20-\\x7E]*",
             ConstraintDescription="can contain only ASCII characters.",
         ))
-        self.__master_user_password = self._template.add_parameter(
-            Parameter(
-                'MasterUserPassword',
-                Type='String',
-                ConstraintDescription='master user password for data base.',
-                Description='Master user password for data base ',
-                NoEcho=True
+        self.__master_user_password = None
+        if not self.__secrets.resolves('MasterUserPassword'):
+            self.__master_user_password = self._template.add_parameter(
+                Parameter(
+                    'MasterUserPassword',
+                    Type='String',
+                    ConstraintDescription='master user password for data base.',
+                    Description='Master user password for data base ',
+                    NoEcho=True
+                )
             )
-        )
         self.__master_user_name = self._template.add_parameter(
             Parameter(
                 'MasterUserName',
@@ -70,6 +84,9 @@ class MariaDBRDSHiveMetastore(object):
                 Description='https://docs.aws.amazon.com/AmazonRDS/latest/UserGuide/Concepts.DBInstanceClass.html '
             )
         )
+        if self.__parameter_group_builder.instance_class is not None:
+            # The parameter group is sized for this instance class
+            self.__db_instance_class.AllowedValues = [self.__parameter_group_builder.instance_class.name]
         self.__db_instance_identifier = self._template.add_parameter(
             Parameter(
                 'DB2InstanceIdentifier',
@@ -106,47 +123,106 @@ class MariaDBRDSHiveMetastore(object):
             SubnetIds=Ref(self.__subnet_ids)
         )
 
-    # Should I share this parameter group with more data bases? Should it be located in its own cloudformation?
-    # This stuff can only be reused by other data bases :(
+    # Other data bases share this parameter group through its export, see shared_parameter_group
     def __add_parameter_group(self):
-        return rds.DBParameterGroup(
-            'MariaDBRDSParameterGroup',
-            Description="MariaDB RDS parameters group",
-            Family="mariadb10.3",
-            Parameters={
-                'slow_query_log': '1',
-                'long_query_time': '5',
-                'log_output': 'FILE'}
-        )
+        # Sized for the metastore pools on top of the tuning for the engine and the instance class
+        metastore_pool = metastore_pool_from_user_data(self.sceptre_user_data)
+        return self.__parameter_group_builder.with_min_connections(
+            database_connections(metastore_pool)
+        ).with_parameters(
+            mariadb_parameters(metastore_pool)
+        ).build('MariaDBRDSParameterGroup', "MariaDB RDS parameters group")
 
     def __add_rds(self):
-        database_parameter_group = self.__add_parameter_group()
-        self._template.add_resource(database_parameter_group)
+        database_parameter_group_name = shared_parameter_group(self.sceptre_user_data)
+        if database_parameter_group_name is None:
+            database_parameter_group = self.__add_parameter_group()
+            self._template.add_resource(database_parameter_group)
+            self._template.add_output(parameter_group_output(database_parameter_group))
+            database_parameter_group_name = Ref(database_parameter_group)
 
         database_subnet_group = self.__add_database_subnet_group()
         self._template.add_resource(database_subnet_group)
 
         database_name = self.sceptre_user_data.get('DatabaseName')
 
-        db_instance = rds.DBInstance(self.__db_instance_name)
-        db_instance.AllocatedStorage = Ref(self.__allocated_storage)
+        db_instance = DBInstance(self.__db_instance_name)
         db_instance.AllowMajorVersionUpgrade = False
         db_instance.AutoMinorVersionUpgrade = True
         db_instance.DBName = database_name
-        db_instance.DBParameterGroupName = Ref(database_parameter_group)
+        db_instance.DBParameterGroupName = database_parameter_group_name
         db_instance.DBSubnetGroupName = Ref(database_subnet_group)
         db_instance.DBInstanceClass = Ref(self.__db_instance_class)
         db_instance.DBInstanceIdentifier = Ref(self.__db_instance_identifier)
         db_instance.Engine = "mariadb"
         db_instance.EngineVersion = "10.3.13"
         db_instance.MasterUsername = Ref(self.__master_user_name)
-        db_instance.MasterUserPassword = Ref(self.__master_user_password)
-        db_instance.MultiAZ = False
+        db_instance.MasterUserPassword = self.__secrets.value('MasterUserPassword', self.__master_user_password)
+        db_instance.MultiAZ = self.sceptre_user_data.get('MultiAZ', False)
         db_instance.PubliclyAccessible = False
-        db_instance.StorageType = "gp2"
+        for name, value in self.__storage_properties().items():
+            setattr(db_instance, name, value)
         db_instance.VPCSecurityGroups = [Ref(self.__security_group_id)]
         self._template.add_resource(db_instance)
 
+        self.__add_read_replicas(db_instance, database_parameter_group_name)
+
+    def __storage_properties(self):
+        """Storage of the primary and the replicas, gp2 by default, see volume_spec_from_user_data
+
+        Storage:
+            Type: gp3
+            # The AllocatedStorage parameter of the stack by default
+            Size: 400
+            # io1 and io2, the IOPS parameter of the stack by default. gp3 from 400 GiB only,
+            # smaller storage gets 3000 IOPS and 125 MiB/s.
+            Iops: 12000
+            # gp3 from 400 GiB only, MiB/s
+            Throughput: 500
+        """
+        spec = volume_spec_from_user_data(self.sceptre_user_data.get('Storage'),
+                                          default_size=Ref(self.__allocated_storage), default_iops=Ref(self.__iops))
+        return rds_storage_properties(spec, 'Storage')
+
+    def __add_read_replicas(self, db_instance, database_parameter_group_name):
+        """Read replicas of the metastore data base, for the clients that read it directly (reports, audits)
+
+        The Hive metastore itself always goes to the primary: DataNucleus never
+        asks for read-only connections, so a replication JDBC URL would not send
+        anything to the replicas.
+
+        ReadReplicas:
+            # The instance class of the primary by default
+            - InstanceClass: db.r5.large
+            - {}
+        """
+        replicas = []
+        for number, replica in enumerate(self.sceptre_user_data.get('ReadReplicas') or [], 1):
+            read_replica = DBInstance('%sReplica%d' % (self.__db_instance_name, number))
+            read_replica.SourceDBInstanceIdentifier = Ref(db_instance)
+            read_replica.AllowMajorVersionUpgrade = False
+            read_replica.AutoMinorVersionUpgrade = True
+            read_replica.DBParameterGroupName = database_parameter_group_name
+            read_replica.DBInstanceClass = (replica or {}).get('InstanceClass', Ref(self.__db_instance_class))
+            read_replica.DBInstanceIdentifier = Join("-", [Ref(self.__db_instance_identifier), "replica", str(number)])
+            read_replica.Engine = "mariadb"
+            read_replica.PubliclyAccessible = False
+            for name, value in self.__storage_properties().items():
+                setattr(read_replica, name, value)
+            read_replica.VPCSecurityGroups = [Ref(self.__security_group_id)]
+            replicas.append(self._template.add_resource(read_replica))
+
+        if replicas:
+            # host:port,host:port, the format of the JDBC URLs
+            self._template.add_output(
+                Output(
+                    "DatabaseReaderEndpoints",
+                    Value=Join(",", [Join(":", [GetAtt(replica, "Endpoint.Address"), GetAtt(replica, "Endpoint.Port")])
+                                     for replica in replicas]),
+                    Export=Export(Join("-", [StackName, "reader-endpoints"]))
+                )
+            )
+
     def __add_outputs(self):
         self._template.add_output(
             Output(
@@ -165,10 +241,14 @@ class MariaDBRDSHiveMetastore(object):
             )
         )
 
-def sceptre_handler(sceptre_user_data):
+def render(sceptre_user_data):
     simple_rds = MariaDBRDSHiveMetastore(sceptre_user_data)
     return simple_rds._template.to_json()
 
 
+def sceptre_handler(sceptre_user_data):
+    return TemplateCache().render(__file__, sceptre_user_data, lambda: render(sceptre_user_data))
+
+
 if __name__ == '__main__':
     print(sceptre_handler(""))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+# Connection pool of the Hive metastores and what the MariaDB behind them needs for it.
+# Both stacks read the same MetastorePool key of sceptre_user_data, so they stay in step.
+MetastorePool = namedtuple('MetastorePool', ['pooling_type', 'max_pool_size', 'metastores', 'server_max_threads',
+                                             'aggregate_stats_cache_size'])
+
+# Every metastore opens two pools: transactional and non transactional
+POOLS_PER_METASTORE = 2
+# Connections for the admin user, replication and the RDS agents
+RESERVED_CONNECTIONS = 20
+# MariaDB Connector/J statement cache, metastores run the same few queries all the time
+JDBC_URL_OPTIONS = 'createDatabaseIfNotExist=true&cachePrepStmts=true&prepStmtCacheSize=250' \
+                   '&prepStmtCacheSqlLimit=2048&useServerPrepStmts=true'
+
+
+def metastore_pool_from_user_data(sceptre_user_data):
+    """MetastorePool described in sceptre_user_data, every key is optional
+
+    MetastorePool:
+        # BoneCP works from Hive 2 (EMR 5) on, HikariCP is better from Hive 3 (EMR 6)
+        PoolingType: BoneCP
+        MaxPoolSize: 10
+        Metastores: 1
+        ServerMaxThreads: 1000
+        AggregateStatsCacheSize: 10000
+    """
+    pool = (sceptre_user_data or {}).get('MetastorePool') or {}
+    return MetastorePool(pool.get('PoolingType', 'BoneCP'), pool.get('MaxPoolSize', 10), pool.get('Metastores', 1),
+                         pool.get('ServerMaxThreads', 1000), pool.get('AggregateStatsCacheSize', 10000))
+
+
+def hive_site(pool):
+    """Pooling, direct SQL and caching properties of hive-site"""
+    return {
+        "datanucleus.connectionPoolingType": pool.pooling_type,
+        "datanucleus.connectionPool.maxPoolSize": str(pool.max_pool_size),
+        # Plain SQL instead of JDO for partitions and statistics
+        "hive.metastore.try.direct.sql": "true",
+        "hive.metastore.try.direct.sql.ddl": "true",
+        "hive.metastore.server.max.threads": str(pool.server_max_threads),
+        "hive.metastore.aggregate.stats.cache.enabled": "true",
+        "hive.metastore.aggregate.stats.cache.size": str(pool.aggregate_stats_cache_size),
+    }
+
+
+def database_connections(pool):
+    """Connections every metastore may open at the same time, see ParameterGroupBuilder.with_min_connections"""
+    return pool.metastores * POOLS_PER_METASTORE * pool.max_pool_size + RESERVED_CONNECTIONS
+
+
+def mariadb_parameters(pool):
+    """MariaDB parameters for the metastore clients, on top of the ParameterGroupBuilder ones
+
+    max_connections is the builder's, sized by instance class, with database_connections as its minimum.
+    """
+    return {
+        # A pool of threads, sized by MariaDB to the vCPUs, instead of one thread per connection
+        'thread_handling': 'pool-of-threads',
+        'thread_pool_max_threads': str(database_connections(pool)),
+    }
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import ast
+import glob
+import hashlib
+import json
+import os
+
+CACHE_DIR = os.environ.get('SCEPTRE_TEMPLATE_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'sceptre-templates'))
+CACHE_SIZE = int(os.environ.get('SCEPTRE_TEMPLATE_CACHE_SIZE', 64 * 1024 * 1024))
+CACHE_ENABLED = os.environ.get('SCEPTRE_TEMPLATE_CACHE', '1') != '0'
+
+# Imported files by source file, render.py computes the keys of templates sharing helpers
+_imports = {}
+
+
+def troposphere_version():
+    """Version from the package metadata, so troposphere itself is not imported"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            return version('troposphere')
+        except PackageNotFoundError:
+            pass
+    except ImportError:
+        pass
+    import troposphere
+    return troposphere.__version__
+
+
+def _package_root(directory):
+    """The sys.path entry imports of a package resolve against: the first directory above it without __init__.py"""
+    while os.path.isfile(os.path.join(directory, '__init__.py')):
+        directory = os.path.dirname(directory)
+    return directory
+
+
+def _module_files(root_dirs, module_name):
+    """Files run by importing module_name from the first of root_dirs that has it: its __init__.py and itself"""
+    parts = module_name.split('.')
+    for root_dir in root_dirs:
+        files = []
+        directory = root_dir
+        for part in parts[:-1]:
+            directory = os.path.join(directory, part)
+            if os.path.isfile(os.path.join(directory, '__init__.py')):
+                files.append(os.path.join(directory, '__init__.py'))
+        path = os.path.join(directory, parts[-1])
+        for module_file in (path + '.py', os.path.join(path, '__init__.py')):
+            if os.path.isfile(module_file):
+                return files + [module_file]
+    return []
+
+
+def _imported_files(source_file, source, root_dirs):
+    """Files of the modules imported by a source, those not found in root_dirs (troposphere...) are left out"""
+    cached = _imports.get((source_file, tuple(root_dirs)))
+    if cached is not None and cached[0] == source:
+        return cached[1]
+
+    files = []
+    for node in ast.walk(ast.parse(source, source_file)):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                files.extend(_module_files(root_dirs, alias.name))
+        elif isinstance(node, ast.ImportFrom):
+            module_roots = root_dirs
+            if node.level:
+                # Relative to the package of the source
+                module_roots = [os.path.dirname(source_file)]
+                for _ in range(node.level - 1):
+                    module_roots = [os.path.dirname(module_roots[0])]
+            if node.module:
+                files.extend(_module_files(module_roots, node.module))
+            # from package import module
+            for alias in node.names:
+                name = node.module + '.' + alias.name if node.module else alias.name
+                files.extend(_module_files(module_roots, name))
+    _imports[(source_file, tuple(root_dirs))] = (source, files)
+    return files
+
+
+class TemplateCache(object):
+    """Disk cache of rendered templates, with LRU eviction
+
+    Rendering is deterministic, so the JSON only depends on the key: the source
+    of the template module, the source of the helper modules it imports
+    (ipam/*, storage/*...) directly or through other helpers, the troposphere
+    version and the sceptre_user_data. Editing a helper only invalidates the
+    templates importing it. The modification time of a cached file is its last
+    use.
+
+    SCEPTRE_TEMPLATE_CACHE=0 disables it.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_size=CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def render(self, template_file, sceptre_user_data, render):
+        """Returns the cached JSON of template_file or calls render() and caches it"""
+        body = self.get(template_file, sceptre_user_data)
+        if body is None:
+            body = render()
+            self.put(template_file, sceptre_user_data, body)
+        return body
+
+    def get(self, template_file, sceptre_user_data):
+        """Cached JSON of template_file, or None. Needs neither the template nor troposphere"""
+        if not CACHE_ENABLED:
+            return None
+
+        cache_file = self.__cache_file(template_file, sceptre_user_data)
+        try:
+            with open(cache_file) as cached:
+                body = cached.read()
+            os.utime(cache_file, None)
+            return body
+        except (IOError, OSError):
+            return None
+
+    def put(self, template_file, sceptre_user_data, body):
+        if CACHE_ENABLED:
+            self.__store(self.__cache_file(template_file, sceptre_user_data), body)
+
+    def __cache_file(self, template_file, sceptre_user_data):
+        return os.path.join(self.cache_dir, self.key(template_file, sceptre_user_data) + '.json')
+
+    @staticmethod
+    def key(template_file, sceptre_user_data):
+        """Hash of the template, its helpers, troposphere and sceptre_user_data
+
+        Imports are parsed, not run: the helpers are looked up in the directory
+        of the template and in the sys.path entry of its package
+        (AWS/CloudFormation for templates.lambdas.LambdaTemplate).
+        """
+        digest = hashlib.sha256()
+        template_file = os.path.abspath(template_file)
+        template_dir = os.path.dirname(template_file)
+        root_dirs = [template_dir]
+        if _package_root(template_dir) != template_dir:
+            root_dirs.append(_package_root(template_dir))
+
+        sources = {}
+        pending = [template_file]
+        while pending:
+            source_file = pending.pop()
+            with open(source_file, 'rb') as source:
+                sources[source_file] = source.read()
+            for imported_file in _imported_files(source_file, sources[source_file], root_dirs):
+                if imported_file not in sources and imported_file not in pending:
+                    pending.append(imported_file)
+
+        for source_file in [template_file] + sorted(source_file for source_file in sources
+                                                    if source_file != template_file):
+            digest.update(source_file.encode('utf-8'))
+            digest.update(sources[source_file])
+        digest.update(troposphere_version().encode('utf-8'))
+        digest.update(json.dumps(sceptre_user_data, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def __store(self, cache_file, body):
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+            with open(tmp_file, 'w') as cached:
+                cached.write(body)
+            os.replace(tmp_file, cache_file)
+            self.__evict()
+        except (IOError, OSError):
+            # A read only or full disk must not break rendering
+            pass
+
+    def __evict(self):
+        entries = []
+        for cache_file in glob.glob(os.path.join(self.cache_dir, '*.json')):
+            stat = os.stat(cache_file)
+            entries.append((stat.st_mtime, stat.st_size, cache_file))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, cache_file in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(cache_file)
+            total -= size
@@ -4,6 +4,11 @@
 
 from troposphere import Parameter, Template, Ref, Output, Export, Join, StackName, GetAtt
 import troposphere.rds as rds
+from aurora.serverless_scaling import DEFAULT_KEEP_WARM_SCHEDULE, keep_warm_resources, scaling_configuration, \
+    scaling_profile_from_user_data
+from tuning.parameter_group import parameter_group_builder_from_user_data
+from credentials.stack_secrets import StackSecrets
+from rendering.template_cache import TemplateCache
 
 
 class AuroraServerless(object):
@@ -13,6 +18,11 @@ class AuroraServerless(object):
         self._template = Template(Description='Aurora RDS Serverless')
         self._template.AWSTemplateFormatVersion = '2010-09-09'
         self.sceptre_user_data = sceptre_user_data
+        self.__scaling_profile = scaling_profile_from_user_data(sceptre_user_data)
+        # Passwords from Secrets Manager or SSM instead of plaintext parameters, see StackSecrets
+        self.__secrets = StackSecrets(sceptre_user_data)
+        if self.__secrets.resource() is not None:
+            self._template.add_resource(self.__secrets.resource())
         self.__add_arguments()
         self.__add_rds()
         self.__add_outputs()
@@ -28,15 +38,17 @@ class AuroraServerless(object):
             AllowedPattern="[\\x20-\\x7E]*",
             ConstraintDescription="can contain only ASCII characters.",
         ))
-        self.__master_user_password = self._template.add_parameter(
-            Parameter(
-                'MasterUserPassword',
-                Type='String',
-                ConstraintDescription='master user password for data base.',
-                Description='Master user password for data base ',
-                NoEcho=True
+        self.__master_user_password = None
+        if not self.__secrets.resolves('MasterUserPassword'):
+            self.__master_user_password = self._template.add_parameter(
+                Parameter(
+                    'MasterUserPassword',
+                    Type='String',
+                    ConstraintDescription='master user password for data base.',
+                    Description='Master user password for data base ',
+                    NoEcho=True
+                )
             )
-        )
         self.__master_user_name = self._template.add_parameter(
             Parameter(
                 'MasterUserName',
@@ -89,32 +101,35 @@ class AuroraServerless(object):
             SubnetIds=Ref(self.__subnet_ids)
         )
 
-    # Should I share this parameter group with more data bases? Should it be located in its own cloudformation?
-    # This stuff can only be reused by other data bases :(
-    @staticmethod
-    def __add_parameter_group():
-        return rds.DBParameterGroup(
-            'AuroraServerlessParameterGroup',
-            Description="Aurora serverless parameters group",
-            Family="aurora5.6",
-            Parameters={
-                'slow_query_log': '1',
-                'long_query_time': '5',
-                'log_output': 'FILE'}
-        )
-
-    @staticmethod
-    def __scaling_configuration():
-        return rds.ScalingConfiguration(
-            AutoPause=True,
-            MaxCapacity=2,
-            MinCapacity=2,
-            SecondsUntilAutoPause=300
-        )
+    # Aurora Serverless only takes cluster parameter groups
+    def __add_parameter_group(self):
+        return parameter_group_builder_from_user_data(self.sceptre_user_data, 'aurora5.6').build_cluster(
+            'AuroraServerlessParameterGroup', "Aurora serverless parameters group")
+
+    def __add_keep_warm(self, db_cluster):
+        """Keep-warm Lambda when sceptre_user_data asks for it
+
+        KeepWarm: true
+        # or, with another schedule than every 4 minutes in business hours (UTC)
+        KeepWarm:
+            Schedule: cron(0/4 7-19 ? * MON-FRI *)
+        """
+        keep_warm = self.sceptre_user_data.get('KeepWarm')
+        if not keep_warm:
+            return
+        if not self.__scaling_profile.auto_pause:
+            raise Exception('KeepWarm: the scaling profile never pauses the cluster')
+
+        schedule = DEFAULT_KEEP_WARM_SCHEDULE
+        if isinstance(keep_warm, dict):
+            schedule = keep_warm.get('Schedule', DEFAULT_KEEP_WARM_SCHEDULE)
+        for resource in keep_warm_resources(db_cluster, Ref(self.__subnet_ids), Ref(self.__security_group_id),
+                                            schedule):
+            self._template.add_resource(resource)
 
     def __add_rds(self):
-        # database_parameter_group = self.__add_parameter_group()
-        # self._template.add_resource(database_parameter_group)
+        database_parameter_group = self.__add_parameter_group()
+        self._template.add_resource(database_parameter_group)
 
         database_subnet_group = self.__add_database_subnet_group()
         self._template.add_resource(database_subnet_group)
@@ -125,19 +140,21 @@ class AuroraServerless(object):
         db_cluster.BackupRetentionPeriod = 1
         db_cluster.DatabaseName = database_name
         db_cluster.DBClusterIdentifier = Ref(self.__db_cluster_identifier)
-        # db_cluster.DBClusterParameterGroupName = Ref(database_parameter_group)
+        db_cluster.DBClusterParameterGroupName = Ref(database_parameter_group)
         db_cluster.DBSubnetGroupName = Ref(database_subnet_group)
         db_cluster.DeletionProtection = False
         db_cluster.Engine = "aurora"
         db_cluster.EngineMode = "serverless"
         db_cluster.EngineVersion = "5.6.10a"
         db_cluster.MasterUsername = Ref(self.__master_user_name)
-        db_cluster.MasterUserPassword = Ref(self.__master_user_password)
+        db_cluster.MasterUserPassword = self.__secrets.value('MasterUserPassword', self.__master_user_password)
         db_cluster.Port = 3306
-        db_cluster.ScalingConfiguration = self.__scaling_configuration()
+        db_cluster.ScalingConfiguration = scaling_configuration(self.__scaling_profile)
         db_cluster.VpcSecurityGroupIds = [Ref(self.__security_group_id)]
         self._template.add_resource(db_cluster)
 
+        self.__add_keep_warm(db_cluster)
+
     def __add_outputs(self):
         self._template.add_output(
             Output(
@@ -156,10 +173,14 @@ class AuroraServerless(object):
             )
         )
 
-def sceptre_handler(sceptre_user_data):
+def render(sceptre_user_data):
     aurora_serverless = AuroraServerless(sceptre_user_data)
     return aurora_serverless._template.to_json()
 
 
+def sceptre_handler(sceptre_user_data):
+    return TemplateCache().render(__file__, sceptre_user_data, lambda: render(sceptre_user_data))
+
+
 if __name__ == '__main__':
     print(sceptre_handler(""))
@@ -4,6 +4,7 @@
 from ipam.home_office import HomeOffice
 from ipam.security_group_resource_builder import SecurityGroupResourceBuilder
 from troposphere import Template, Output, Export, Join, Ref, StackName
+from rendering.template_cache import TemplateCache
 
 
 class SimpleSecurityGroup(object):
@@ -43,6 +44,10 @@ class SimpleSecurityGroup(object):
         )
 
 
-def sceptre_handler(sceptre_user_data):
+def render(sceptre_user_data):
     simple_security_group = SimpleSecurityGroup(sceptre_user_data)
     return simple_security_group._template.to_json()
+
+
+def sceptre_handler(sceptre_user_data):
+    return TemplateCache().render(__file__, sceptre_user_data, lambda: render(sceptre_user_data))
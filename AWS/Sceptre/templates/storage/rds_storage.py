@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+import troposphere.rds as rds
+
+
+class DBInstance(rds.DBInstance):
+    """troposphere 2.4.9 misses StorageThroughput, for gp3"""
+    props = dict(rds.DBInstance.props, StorageThroughput=(int, False))
+
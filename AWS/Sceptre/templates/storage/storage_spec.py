@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+import troposphere.emr as emr
+
+# Volume of EBS or storage of RDS. Sizes in GiB, throughput in MiB/s, None for the defaults of the type.
+VolumeSpec = namedtuple('VolumeSpec', ['volume_type', 'size', 'iops', 'throughput'])
+
+# None when the type does not accept the setting: gp2, st1 and sc1 IOPS and throughput
+# grow with the volume size, and burst on credits below 1 TiB (gp2).
+VolumeLimits = namedtuple('VolumeLimits', ['min_size', 'max_size', 'min_iops', 'max_iops', 'max_iops_per_gib',
+                                           'min_throughput', 'max_throughput', 'max_throughput_per_iops'])
+
+EBS_LIMITS = {
+    'standard': VolumeLimits(1, 1024, None, None, None, None, None, None),
+    'gp2': VolumeLimits(1, 16384, None, None, None, None, None, None),
+    'gp3': VolumeLimits(1, 16384, 3000, 16000, 500, 125, 1000, 0.25),
+    'io1': VolumeLimits(4, 16384, 100, 64000, 50, None, None, None),
+    'io2': VolumeLimits(4, 16384, 100, 64000, 500, None, None, None),
+    'st1': VolumeLimits(125, 16384, None, None, None, None, None, None),
+    'sc1': VolumeLimits(125, 16384, None, None, None, None, None, None),
+}
+# EMR does not attach io2 volumes
+EMR_VOLUME_TYPES = ('standard', 'gp2', 'gp3', 'io1', 'st1', 'sc1')
+
+# MySQL, MariaDB and PostgreSQL
+RDS_LIMITS = {
+    'gp2': VolumeLimits(20, 65536, None, None, None, None, None, None),
+    'gp3': VolumeLimits(20, 65536, 12000, 64000, 500, 500, 4000, None),
+    'io1': VolumeLimits(100, 65536, 1000, 256000, 50, None, None, None),
+    'io2': VolumeLimits(100, 65536, 1000, 256000, 1000, None, None, None),
+}
+# Smaller gp3 RDS storage gets a fixed baseline of 3000 IOPS and 125 MiB/s
+RDS_GP3_MIN_PROVISIONED_SIZE = 400
+
+
+class VolumeSpecification(emr.VolumeSpecification):
+    """troposphere 2.4.9 misses Throughput and only validates standard, io1 and gp2"""
+    props = dict(emr.VolumeSpecification.props, VolumeType=(str, True), Throughput=(int, False))
+
+
+def volume_spec_from_user_data(volume, default_type='gp2', default_size=None, default_iops=None):
+    """VolumeSpec of an entry of sceptre_user_data
+
+    Type: gp3
+    # GiB. Optional when the stack has a size parameter.
+    Size: 500
+    # Optional for gp3 (3000 IOPS and 125 MiB/s by default), required for io1 and io2
+    Iops: 6000
+    # gp3 only, MiB/s
+    Throughput: 250
+
+    default_iops is for io1 and io2 only, the IOPS parameter of a stack.
+    """
+    volume = volume or {}
+    volume_type = volume.get('Type', default_type)
+    iops = volume.get('Iops')
+    if iops is None and volume_type in ('io1', 'io2'):
+        iops = default_iops
+    return VolumeSpec(volume_type, volume.get('Size', default_size), iops, volume.get('Throughput'))
+
+
+def validate(spec, limits, name):
+    """Checks a VolumeSpec against the limits of its type. Refs and other values unknown at render time are not
+    checked."""
+    if spec.volume_type not in limits:
+        raise Exception('%s: volume type %s must be one of %s' % (name, spec.volume_type, ', '.join(sorted(limits))))
+    limit = limits[spec.volume_type]
+
+    size = spec.size if isinstance(spec.size, int) else None
+    if size is not None and not limit.min_size <= size <= limit.max_size:
+        raise Exception('%s: %s size must be between %d and %d GiB' % (name, spec.volume_type, limit.min_size,
+                                                                       limit.max_size))
+
+    if spec.iops is not None:
+        if limit.max_iops is None:
+            raise Exception('%s: %s has no Iops, they grow with the volume size' % (name, spec.volume_type))
+        if isinstance(spec.iops, int):
+            if not limit.min_iops <= spec.iops <= limit.max_iops:
+                raise Exception('%s: %s Iops must be between %d and %d' % (name, spec.volume_type, limit.min_iops,
+                                                                           limit.max_iops))
+            if size is not None and spec.iops > size * limit.max_iops_per_gib:
+                raise Exception('%s: %s allows up to %d Iops per GiB' % (name, spec.volume_type,
+                                                                         limit.max_iops_per_gib))
+    elif spec.volume_type in ('io1', 'io2'):
+        raise Exception('%s: %s requires Iops' % (name, spec.volume_type))
+
+    if spec.throughput is not None:
+        if limit.max_throughput is None:
+            raise Exception('%s: %s has no Throughput' % (name, spec.volume_type))
+        if isinstance(spec.throughput, int):
+            if not limit.min_throughput <= spec.throughput <= limit.max_throughput:
+                raise Exception('%s: %s Throughput must be between %d and %d MiB/s'
+                                % (name, spec.volume_type, limit.min_throughput, limit.max_throughput))
+            iops = spec.iops if isinstance(spec.iops, int) else limit.min_iops
+            if limit.max_throughput_per_iops is not None and spec.throughput > iops * limit.max_throughput_per_iops:
+                raise Exception('%s: %s Throughput of %d MiB/s needs at least %d Iops'
+                                % (name, spec.volume_type, spec.throughput,
+                                   spec.throughput / limit.max_throughput_per_iops))
+    return spec
+
+
+def ebs_configuration(volumes, name):
+    """EbsConfiguration of EMR instance groups and fleets for the DataVolumes of sceptre_user_data, None without them
+
+    DataVolumes:
+        - Type: gp3
+          Size: 500
+          Iops: 6000
+          Throughput: 500
+          # 1 by default
+          VolumesPerInstance: 2
+    """
+    if not volumes:
+        return None
+
+    configs = []
+    for volume in volumes:
+        spec = validate(volume_spec_from_user_data(volume), EBS_LIMITS, name)
+        if spec.volume_type not in EMR_VOLUME_TYPES:
+            raise Exception('%s: EMR volume type %s must be one of %s' % (name, spec.volume_type,
+                                                                          ', '.join(EMR_VOLUME_TYPES)))
+        if spec.size is None:
+            raise Exception('%s: Size is required' % (name))
+        specification = VolumeSpecification(VolumeType=spec.volume_type, SizeInGB=spec.size)
+        if spec.iops is not None:
+            specification.Iops = spec.iops
+        if spec.throughput is not None:
+            specification.Throughput = spec.throughput
+        configs.append(emr.EbsBlockDeviceConfigs(
+            VolumeSpecification=specification,
+            VolumesPerInstance=volume.get('VolumesPerInstance', 1)
+        ))
+    return emr.EbsConfiguration(EbsBlockDeviceConfigs=configs, EbsOptimized=True)
+
+
+def rds_storage_properties(spec, name):
+    """DBInstance storage properties of a VolumeSpec, the size goes in AllocatedStorage"""
+    validate(spec, RDS_LIMITS, name)
+    if spec.volume_type == 'gp3' and (spec.iops is not None or spec.throughput is not None) \
+            and isinstance(spec.size, int) and spec.size < RDS_GP3_MIN_PROVISIONED_SIZE:
+        raise Exception('%s: gp3 Iops and Throughput from %d GiB only' % (name, RDS_GP3_MIN_PROVISIONED_SIZE))
+
+    properties = {'StorageType': spec.volume_type}
+    if spec.size is not None:
+        properties['AllocatedStorage'] = spec.size
+    if spec.iops is not None:
+        properties['Iops'] = spec.iops
+    if spec.throughput is not None:
+        properties['StorageThroughput'] = spec.throughput
+    return properties
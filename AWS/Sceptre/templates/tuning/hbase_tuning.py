@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+import troposphere.emr as emr
+
+from tuning.instance_types import available_memory_mib, fleet_instance_types, instance_type, smallest_instance_type
+
+# block_cache and memstore are fractions of the region server heap, they must not add up
+# to more than 0.8. heap_share is the part of the HBase memory used as heap, the rest is
+# the off-heap bucket cache.
+WorkloadProfile = namedtuple('WorkloadProfile', ['block_cache', 'memstore', 'heap_share', 'flush_size_mib',
+                                                 'block_multiplier', 'handlers_per_vcpu', 'compaction_threshold',
+                                                 'blocking_store_files'])
+
+PROFILES = {
+    # Gets and scans: most memory goes to the block cache and the off-heap bucket cache
+    'read-heavy': WorkloadProfile(block_cache=0.55, memstore=0.25, heap_share=0.5, flush_size_mib=128,
+                                  block_multiplier=4, handlers_per_vcpu=8, compaction_threshold=3,
+                                  blocking_store_files=16),
+    # Puts: big memstores, fewer and bigger flushes, compactions allowed to lag behind
+    'write-heavy': WorkloadProfile(block_cache=0.25, memstore=0.55, heap_share=1.0, flush_size_mib=256,
+                                   block_multiplier=8, handlers_per_vcpu=4, compaction_threshold=5,
+                                   blocking_store_files=32),
+    'mixed': WorkloadProfile(block_cache=0.4, memstore=0.4, heap_share=0.75, flush_size_mib=128,
+                             block_multiplier=4, handlers_per_vcpu=6, compaction_threshold=3,
+                             blocking_store_files=20),
+}
+
+# Part of the available memory for HBase, YARN gets the remainder
+HBASE_MEMORY_FRACTION = 0.6
+# Bigger heaps lose compressed oops and suffer longer GC pauses
+MAX_HEAP_MIB = 31 * 1024
+MAX_MASTER_HEAP_MIB = 8 * 1024
+MIN_HANDLERS = 30
+
+
+class HBaseTuning(object):
+    """hbase-site, hbase-env and yarn-site settings for a workload profile and an instance type
+
+    Sizes are in MiB, computed from the memory and vCPUs of the region server
+    instance type. YARN gets the memory HBase does not use, so they do not fight
+    for it.
+    """
+
+    def __init__(self, profile, region_server_instance_type, master_instance_type=None):
+        if profile not in PROFILES:
+            raise Exception('HBase workload profile %s: must be one of %s' % (profile, ', '.join(sorted(PROFILES))))
+        self.profile = PROFILES[profile]
+        self.region_server = region_server_instance_type
+        self.master = master_instance_type or region_server_instance_type
+
+        available_mib = available_memory_mib(self.region_server)
+        self.hbase_memory_mib = int(available_mib * HBASE_MEMORY_FRACTION)
+        self.yarn_memory_mib = available_mib - self.hbase_memory_mib
+        self.heap_mib = min(int(self.hbase_memory_mib * self.profile.heap_share), MAX_HEAP_MIB)
+        self.bucket_cache_mib = self.hbase_memory_mib - self.heap_mib
+        self.master_heap_mib = min(available_memory_mib(self.master) // 4, MAX_MASTER_HEAP_MIB)
+
+    def hbase_site(self):
+        """Properties to merge into the hbase-site classification"""
+        properties = {
+            "hfile.block.cache.size": str(self.profile.block_cache),
+            "hbase.regionserver.global.memstore.size": str(self.profile.memstore),
+            "hbase.hregion.memstore.flush.size": str(self.profile.flush_size_mib * 1024 * 1024),
+            "hbase.hregion.memstore.block.multiplier": str(self.profile.block_multiplier),
+            "hbase.regionserver.handler.count": str(max(MIN_HANDLERS,
+                                                        self.region_server.vcpus * self.profile.handlers_per_vcpu)),
+            "hbase.hstore.compactionThreshold": str(self.profile.compaction_threshold),
+            "hbase.hstore.blockingStoreFiles": str(self.profile.blocking_store_files),
+            "hbase.regionserver.thread.compaction.small": str(max(1, self.region_server.vcpus // 4)),
+        }
+        if self.bucket_cache_mib:
+            properties.update({
+                "hbase.bucketcache.ioengine": "offheap",
+                "hbase.bucketcache.size": str(self.bucket_cache_mib),
+            })
+        return properties
+
+    def configurations(self):
+        """hbase-env and yarn-site classifications"""
+        region_server_opts = "-Xms%dm -Xmx%dm" % (self.heap_mib, self.heap_mib)
+        if self.bucket_cache_mib:
+            # The bucket cache plus some room for the off-heap buffers of the RPC layer
+            region_server_opts += " -XX:MaxDirectMemorySize=%dm" % (self.bucket_cache_mib + 1024)
+
+        return [
+            emr.Configuration(
+                Classification="hbase-env",
+                Configurations=[
+                    emr.Configuration(
+                        Classification="export",
+                        ConfigurationProperties={
+                            "HBASE_REGIONSERVER_OPTS": region_server_opts,
+                            "HBASE_MASTER_OPTS": "-Xmx%dm" % (self.master_heap_mib)
+                        }
+                    )
+                ]
+            ),
+            emr.Configuration(
+                Classification="yarn-site",
+                ConfigurationProperties={
+                    "yarn.nodemanager.resource.memory-mb": str(self.yarn_memory_mib)
+                }
+            )
+        ]
+
+
+def hbase_tuning_from_user_data(sceptre_user_data):
+    """HBaseTuning described in sceptre_user_data, None without an HBase key
+
+    HBase:
+        WorkloadProfile: read-heavy
+        # Required with instance groups, it must be the EC2InstanceType parameter.
+        # With InstanceFleets, the Core and Master types with the least memory by default.
+        InstanceType: m5.2xlarge
+        MasterInstanceType: m5.xlarge
+    """
+    sceptre_user_data = sceptre_user_data or {}
+    hbase = sceptre_user_data.get('HBase')
+    if not hbase:
+        return None
+
+    fleets = sceptre_user_data.get('InstanceFleets') or {}
+    if 'InstanceType' in hbase:
+        region_server = instance_type(hbase['InstanceType'])
+    elif 'Core' in fleets:
+        region_server = smallest_instance_type(fleet_instance_types(fleets['Core']))
+    else:
+        raise Exception('HBase: InstanceType is required without a Core instance fleet')
+
+    master = None
+    if 'MasterInstanceType' in hbase:
+        master = instance_type(hbase['MasterInstanceType'])
+    elif 'Master' in fleets:
+        master = smallest_instance_type(fleet_instance_types(fleets['Master']))
+
+    return HBaseTuning(hbase.get('WorkloadProfile', 'mixed'), region_server, master)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import troposphere.emr as emr
+
+from tuning.instance_types import available_memory_mib, fleet_instance_types, instance_type, smallest_instance_type
+
+# The master of the clusters so far
+DEFAULT_MASTER_INSTANCE_TYPE = 'm5.2xlarge'
+# Part of the master memory for HiveServer2 and the metastore (HADOOP_HEAPSIZE)
+HIVE_HEAP_FRACTION = 0.35
+MAX_HIVE_HEAP_MIB = 31 * 1024
+# Smallest container for the memory of a node, bigger nodes get bigger containers
+MIN_CONTAINER_MIB = (
+    (8 * 1024, 512),
+    (24 * 1024, 1024),
+    (None, 2048),
+)
+# YARN allocates memory in multiples of the minimum allocation
+CONTAINER_ROUNDING_MIB = 512
+# Java heap of a container, the rest is JVM overhead
+HEAP_FRACTION = 0.8
+# tez.runtime.io.sort.mb is an int buffer, it must stay under 2 GiB
+MAX_IO_SORT_MIB = 2047
+
+
+def _java_opts(container_mib):
+    return "-Xmx%dm" % (int(container_mib * HEAP_FRACTION))
+
+
+def _min_container_mib(instance):
+    for memory_mib, container_mib in MIN_CONTAINER_MIB:
+        if memory_mib is None or instance.memory_mib <= memory_mib:
+            return container_mib
+
+
+class HiveTuning(object):
+    """yarn-site, mapred-site, tez-site, hive-site and hive-env settings sized for the nodes
+
+    Containers are sized from the memory and vCPUs of the worker instance type
+    (the master for clusters without core nodes): two containers per vCPU as
+    long as they get the MIN_CONTAINER_MIB of the node. Sizes are in MiB and validate() checks
+    that no container asks for more memory than YARN has on a node.
+    """
+
+    def __init__(self, master_instance_type, worker_instance_type=None, container_mib=None, vectorization=True,
+                 cost_based_optimizer=True, parallel_execution=True, parallel_threads=8):
+        self.master = master_instance_type
+        self.worker = worker_instance_type or master_instance_type
+        self.vectorization = vectorization
+        self.cost_based_optimizer = cost_based_optimizer
+        self.parallel_execution = parallel_execution
+        self.parallel_threads = parallel_threads
+
+        self.hive_heap_mib = min(int(available_memory_mib(self.master) * HIVE_HEAP_FRACTION), MAX_HIVE_HEAP_MIB)
+        self.yarn_memory_mib = available_memory_mib(self.worker)
+        if worker_instance_type is None:
+            # HiveServer2 and the NodeManager share the only node
+            self.yarn_memory_mib -= self.hive_heap_mib
+
+        min_container_mib = _min_container_mib(self.worker)
+        if container_mib is None:
+            containers = max(1, min(2 * self.worker.vcpus, self.yarn_memory_mib // min_container_mib))
+            container_mib = self.yarn_memory_mib // containers
+            container_mib -= container_mib % CONTAINER_ROUNDING_MIB
+        self.container_mib = max(min_container_mib, container_mib)
+        containers = self.yarn_memory_mib // self.container_mib
+        # No memory is lost to rounding: the node fits a whole number of containers
+        self.node_memory_mib = containers * self.container_mib
+        self.am_mib = min(2 * self.container_mib, self.node_memory_mib)
+
+        self.validate()
+
+    def validate(self):
+        if self.yarn_memory_mib < _min_container_mib(self.worker):
+            raise Exception('Hive: %s has no memory left for YARN containers' % (self.worker.name))
+        if self.container_mib > self.node_memory_mib:
+            raise Exception('Hive: %d MiB containers do not fit the %d MiB YARN has on %s'
+                            % (self.container_mib, self.yarn_memory_mib, self.worker.name))
+        if self.node_memory_mib > available_memory_mib(self.worker):
+            raise Exception('Hive: YARN memory exceeds the memory of %s' % (self.worker.name))
+
+    def hive_site(self):
+        """Properties to merge into the hive-site classification"""
+        heap_mib = int(self.container_mib * HEAP_FRACTION)
+        return {
+            "hive.execution.engine": "tez",
+            "hive.tez.container.size": str(self.container_mib),
+            "hive.tez.java.opts": _java_opts(self.container_mib),
+            # Map joins are held in the heap of a container
+            "hive.auto.convert.join.noconditionaltask.size": str(heap_mib // 3 * 1024 * 1024),
+            "hive.vectorized.execution.enabled": str(self.vectorization).lower(),
+            "hive.vectorized.execution.reduce.enabled": str(self.vectorization).lower(),
+            "hive.cbo.enable": str(self.cost_based_optimizer).lower(),
+            "hive.compute.query.using.stats": str(self.cost_based_optimizer).lower(),
+            "hive.stats.fetch.column.stats": str(self.cost_based_optimizer).lower(),
+            "hive.exec.parallel": str(self.parallel_execution).lower(),
+            "hive.exec.parallel.thread.number": str(self.parallel_threads),
+        }
+
+    def configurations(self):
+        """hive-env, yarn-site, mapred-site and tez-site classifications"""
+        return [
+            emr.Configuration(
+                Classification="hive-env",
+                Configurations=[
+                    emr.Configuration(
+                        Classification="export",
+                        ConfigurationProperties={
+                            "HADOOP_HEAPSIZE": str(self.hive_heap_mib)
+                        }
+                    )
+                ]
+            ),
+            emr.Configuration(
+                Classification="yarn-site",
+                ConfigurationProperties={
+                    "yarn.nodemanager.resource.memory-mb": str(self.node_memory_mib),
+                    "yarn.nodemanager.resource.cpu-vcores": str(self.worker.vcpus),
+                    "yarn.scheduler.minimum-allocation-mb": str(self.container_mib),
+                    "yarn.scheduler.maximum-allocation-mb": str(self.node_memory_mib)
+                }
+            ),
+            emr.Configuration(
+                Classification="mapred-site",
+                ConfigurationProperties={
+                    "mapreduce.map.memory.mb": str(self.container_mib),
+                    "mapreduce.map.java.opts": _java_opts(self.container_mib),
+                    "mapreduce.reduce.memory.mb": str(self.am_mib),
+                    "mapreduce.reduce.java.opts": _java_opts(self.am_mib),
+                    "yarn.app.mapreduce.am.resource.mb": str(self.am_mib),
+                    "yarn.app.mapreduce.am.command-opts": _java_opts(self.am_mib)
+                }
+            ),
+            emr.Configuration(
+                Classification="tez-site",
+                ConfigurationProperties={
+                    "tez.am.resource.memory.mb": str(self.am_mib),
+                    "tez.am.launch.cmd-opts": _java_opts(self.am_mib),
+                    "tez.task.resource.memory.mb": str(self.container_mib),
+                    "tez.runtime.io.sort.mb": str(min(int(self.container_mib * HEAP_FRACTION * 0.4),
+                                                      MAX_IO_SORT_MIB))
+                }
+            )
+        ]
+
+
+def hive_tuning_from_user_data(sceptre_user_data):
+    """HiveTuning described in sceptre_user_data, every key is optional
+
+    Hive:
+        # Instance groups, the only node of the cluster
+        MasterInstanceType: m5.2xlarge
+        # InstanceFleets, the Core type with the least memory by default
+        InstanceType: m5.2xlarge
+        ContainerSizeMib: 4096
+        Vectorization: true
+        CostBasedOptimizer: true
+        ParallelExecution: true
+        ParallelThreads: 8
+    """
+    sceptre_user_data = sceptre_user_data or {}
+    hive = sceptre_user_data.get('Hive') or {}
+    fleets = sceptre_user_data.get('InstanceFleets') or {}
+
+    if 'Master' in fleets:
+        master = smallest_instance_type(fleet_instance_types(fleets['Master']))
+    else:
+        master = instance_type(hive.get('MasterInstanceType', DEFAULT_MASTER_INSTANCE_TYPE))
+
+    worker = None
+    if 'InstanceType' in hive and 'Core' in fleets:
+        worker = instance_type(hive['InstanceType'])
+    elif 'Core' in fleets:
+        worker = smallest_instance_type(fleet_instance_types(fleets['Core']))
+
+    return HiveTuning(master, worker, container_mib=hive.get('ContainerSizeMib'),
+                      vectorization=hive.get('Vectorization', True),
+                      cost_based_optimizer=hive.get('CostBasedOptimizer', True),
+                      parallel_execution=hive.get('ParallelExecution', True),
+                      parallel_threads=hive.get('ParallelThreads', 8))
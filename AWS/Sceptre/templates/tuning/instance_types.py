@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+InstanceType = namedtuple('InstanceType', ['name', 'vcpus', 'memory_mib'])
+
+GIB = 1024
+# Memory left to the OS, the HDFS daemons and the EMR agents of a node
+MIN_RESERVED_MIB = 2048
+RESERVED_FRACTION = 0.1
+
+
+def _family(family, sizes):
+    return dict(('%s.%s' % (family, size), InstanceType('%s.%s' % (family, size), vcpus, int(memory_gib * GIB)))
+                for size, vcpus, memory_gib in sizes)
+
+
+_M5_SIZES = (
+    ('large', 2, 8),
+    ('xlarge', 4, 16),
+    ('2xlarge', 8, 32),
+    ('4xlarge', 16, 64),
+    ('8xlarge', 32, 128),
+    ('12xlarge', 48, 192),
+    ('16xlarge', 64, 256),
+    ('24xlarge', 96, 384),
+)
+_R5_SIZES = (
+    ('large', 2, 16),
+    ('xlarge', 4, 32),
+    ('2xlarge', 8, 64),
+    ('4xlarge', 16, 128),
+    ('8xlarge', 32, 256),
+    ('12xlarge', 48, 384),
+    ('16xlarge', 64, 512),
+    ('24xlarge', 96, 768),
+)
+_R4_SIZES = (
+    ('large', 2, 15.25),
+    ('xlarge', 4, 30.5),
+    ('2xlarge', 8, 61),
+    ('4xlarge', 16, 122),
+    ('8xlarge', 32, 244),
+    ('16xlarge', 64, 488),
+)
+
+# Instance types supported by EMR that the clusters use, vCPUs and memory from
+# https://aws.amazon.com/ec2/instance-types/
+INSTANCE_TYPES = {}
+INSTANCE_TYPES.update(_family('m5', _M5_SIZES))
+INSTANCE_TYPES.update(_family('m5a', _M5_SIZES))
+INSTANCE_TYPES.update(_family('m5d', _M5_SIZES))
+INSTANCE_TYPES.update(_family('m4', (
+    ('large', 2, 8),
+    ('xlarge', 4, 16),
+    ('2xlarge', 8, 32),
+    ('4xlarge', 16, 64),
+    ('10xlarge', 40, 160),
+    ('16xlarge', 64, 256),
+)))
+INSTANCE_TYPES.update(_family('r5', _R5_SIZES))
+INSTANCE_TYPES.update(_family('r5a', _R5_SIZES))
+INSTANCE_TYPES.update(_family('r5d', _R5_SIZES))
+INSTANCE_TYPES.update(_family('r4', _R4_SIZES))
+INSTANCE_TYPES.update(_family('i3', _R4_SIZES))
+INSTANCE_TYPES.update(_family('c5', (
+    ('xlarge', 4, 8),
+    ('2xlarge', 8, 16),
+    ('4xlarge', 16, 32),
+    ('9xlarge', 36, 72),
+    ('18xlarge', 72, 144),
+)))
+
+# RDS instance classes of the data bases, vCPUs and memory from
+# https://docs.aws.amazon.com/AmazonRDS/latest/UserGuide/Concepts.DBInstanceClass.html
+DB_INSTANCE_CLASSES = {}
+DB_INSTANCE_CLASSES.update(_family('db.t2', (
+    ('micro', 1, 1),
+    ('small', 1, 2),
+    ('medium', 2, 4),
+    ('large', 2, 8),
+    ('xlarge', 4, 16),
+    ('2xlarge', 8, 32),
+)))
+DB_INSTANCE_CLASSES.update(_family('db.t3', (
+    ('micro', 2, 1),
+    ('small', 2, 2),
+    ('medium', 2, 4),
+    ('large', 2, 8),
+    ('xlarge', 4, 16),
+    ('2xlarge', 8, 32),
+)))
+DB_INSTANCE_CLASSES.update(_family('db.m5', _M5_SIZES))
+DB_INSTANCE_CLASSES.update(_family('db.r5', _R5_SIZES))
+DB_INSTANCE_CLASSES.update(_family('db.r4', _R4_SIZES))
+
+
+def instance_type(name):
+    if name not in INSTANCE_TYPES:
+        raise Exception('Instance type %s: unknown, add it to INSTANCE_TYPES' % (name))
+    return INSTANCE_TYPES[name]
+
+
+def smallest_instance_type(names):
+    """The instance type with the least memory: settings sized for it fit every node of a fleet"""
+    return min((instance_type(name) for name in names), key=lambda candidate: candidate.memory_mib)
+
+
+def available_memory_mib(instance):
+    """Memory of a node that the applications can use"""
+    return instance.memory_mib - max(MIN_RESERVED_MIB, int(instance.memory_mib * RESERVED_FRACTION))
+
+
+def fleet_instance_types(fleet):
+    """Instance type names of an InstanceFleets entry of sceptre_user_data"""
+    return [instance['InstanceType'] if isinstance(instance, dict) else instance
+            for instance in fleet.get('InstanceTypes') or []]
+
+
+def db_instance_class(name):
+    if name not in DB_INSTANCE_CLASSES:
+        raise Exception('DB instance class %s: unknown, add it to DB_INSTANCE_CLASSES' % (name))
+    return DB_INSTANCE_CLASSES[name]
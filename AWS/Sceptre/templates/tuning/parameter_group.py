@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from troposphere import ImportValue, Join, Ref, StackName, Export, Output
+import troposphere.rds as rds
+
+from tuning.instance_types import db_instance_class
+
+MIB = 1024 * 1024
+GIB = 1024 * MIB
+
+# Engine families the builder knows, by parameter group family
+MYSQL_FAMILIES = ('mariadb10.2', 'mariadb10.3', 'mariadb10.4', 'mysql5.6', 'mysql5.7', 'mysql8.0')
+AURORA_FAMILIES = ('aurora5.6', 'aurora-mysql5.7')
+# The query cache is a global lock on MySQL and MariaDB, Aurora has its own scalable one.
+# MySQL 8.0 dropped it.
+NO_QUERY_CACHE_FAMILIES = ('mysql8.0',)
+
+SLOW_QUERY_LOG = {
+    'slow_query_log': '1',
+    'long_query_time': '5',
+    'log_output': 'FILE',
+}
+# Default of RDS, one connection per 12 MiB of instance memory
+MAX_CONNECTIONS_DIVISOR = 12582880
+MAX_CONNECTIONS = 16000
+# InnoDB redo log files, there are two of them
+MAX_LOG_FILE_SIZE = 2 * GIB
+# gp2 baseline of the smallest volumes, the burst is 3000 IOPS
+DEFAULT_STORAGE_IOPS = 200
+
+
+class ParameterGroupBuilder(object):
+    """Tuned parameters for an engine family and an instance class
+
+    When the instance class is known at render time sizes come from
+    DB_INSTANCE_CLASSES, otherwise from RDS formulas on DBInstanceClassMemory,
+    so they follow whatever DB instance class the stack is launched with.
+    Aurora manages its storage: redo log and IO capacity are left to it.
+    """
+
+    def __init__(self, family, instance_class=None, storage_iops=None):
+        if family not in MYSQL_FAMILIES + AURORA_FAMILIES:
+            raise Exception('Parameter group family %s: must be one of %s'
+                            % (family, ', '.join(MYSQL_FAMILIES + AURORA_FAMILIES)))
+        self.family = family
+        self.instance_class = db_instance_class(instance_class) if instance_class else None
+        self.storage_iops = storage_iops or DEFAULT_STORAGE_IOPS
+        self.min_connections = None
+        self.__parameters = dict(SLOW_QUERY_LOG)
+
+    @property
+    def is_aurora(self):
+        return self.family in AURORA_FAMILIES
+
+    def with_parameters(self, parameters):
+        """Parameters of the stack, on top of the tuned ones"""
+        self.__parameters.update(parameters)
+
+        return self
+
+    def with_min_connections(self, min_connections):
+        """Connections the clients open at the same time, max_connections is never below them"""
+        self.min_connections = min_connections
+
+        return self
+
+    def parameters(self):
+        parameters = {}
+        parameters.update(self.__memory())
+        parameters.update(self.__connections())
+        parameters.update(self.__caches())
+        if not self.is_aurora:
+            parameters.update(self.__storage())
+        parameters.update(self.__parameters)
+        return parameters
+
+    def build(self, title, description):
+        return rds.DBParameterGroup(
+            title,
+            Description=description,
+            Family=self.family,
+            Parameters=self.parameters()
+        )
+
+    def build_cluster(self, title, description):
+        """Aurora cluster parameter group
+
+        Tuned parameters are per instance, clusters (and Aurora Serverless, which
+        only accepts cluster groups) get the logging and stack parameters.
+        """
+        if not self.is_aurora:
+            raise Exception('Parameter group family %s: cluster parameter groups are for Aurora' % (self.family))
+        return rds.DBClusterParameterGroup(
+            title,
+            Description=description,
+            Family=self.family,
+            Parameters=dict(self.__parameters)
+        )
+
+    def __memory(self):
+        if self.is_aurora:
+            # Aurora already gives 3/4 of the memory to the buffer pool and has no redo log
+            return {}
+        if self.instance_class is None:
+            return {
+                'innodb_buffer_pool_size': '{DBInstanceClassMemory*3/4}',
+                'innodb_log_file_size': str(512 * MIB),
+            }
+
+        memory = self.instance_class.memory_mib * MIB
+        buffer_pool_size = memory * 3 // 4
+        return {
+            'innodb_buffer_pool_size': str(buffer_pool_size),
+            # One instance per GiB of buffer pool cuts mutex contention, up to two per vCPU
+            'innodb_buffer_pool_instances': str(max(1, min(self.instance_class.vcpus * 2, buffer_pool_size // GIB))),
+            # Two log files of a quarter of the buffer pool
+            'innodb_log_file_size': str(max(128 * MIB, min(buffer_pool_size // 8, MAX_LOG_FILE_SIZE))),
+        }
+
+    def __connections(self):
+        parameters = {
+            # No reverse DNS lookups on connect
+            'skip_name_resolve': '1',
+        }
+        if self.is_aurora:
+            return parameters
+        if self.instance_class is None:
+            # RDS formulas do not nest: with a minimum only instances over 190 GiB go past MAX_CONNECTIONS
+            if self.min_connections:
+                parameters['max_connections'] = 'GREATEST({DBInstanceClassMemory/%d}, %d)' % (
+                    MAX_CONNECTIONS_DIVISOR, self.min_connections)
+            else:
+                parameters['max_connections'] = 'LEAST({DBInstanceClassMemory/%d}, %d)' % (MAX_CONNECTIONS_DIVISOR,
+                                                                                          MAX_CONNECTIONS)
+            return parameters
+
+        max_connections = min(self.instance_class.memory_mib * MIB // MAX_CONNECTIONS_DIVISOR, MAX_CONNECTIONS)
+        max_connections = max(max_connections, self.min_connections or 0)
+        parameters['max_connections'] = str(max_connections)
+        parameters['thread_cache_size'] = str(8 + max_connections // 100)
+        return parameters
+
+    def __caches(self):
+        parameters = {
+            'table_open_cache': '4000',
+            'table_definition_cache': '2000',
+        }
+        if self.family in NO_QUERY_CACHE_FAMILIES:
+            return parameters
+        if self.is_aurora:
+            parameters['query_cache_type'] = '1'
+        else:
+            parameters['query_cache_type'] = '0'
+            parameters['query_cache_size'] = '0'
+        return parameters
+
+    def __storage(self):
+        return {
+            'innodb_io_capacity': str(max(100, self.storage_iops // 2)),
+            'innodb_io_capacity_max': str(max(200, self.storage_iops)),
+        }
+
+
+def parameter_group_builder_from_user_data(sceptre_user_data, default_family):
+    """ParameterGroupBuilder described in sceptre_user_data, every key is optional
+
+    ParameterGroup:
+        Family: mariadb10.3
+        # Without it sizes come from RDS formulas, with it the instance class parameter
+        # of the stack only accepts this class.
+        InstanceClass: db.r5.large
+        StorageIops: 1000
+    """
+    parameter_group = (sceptre_user_data or {}).get('ParameterGroup') or {}
+    return ParameterGroupBuilder(parameter_group.get('Family', default_family), parameter_group.get('InstanceClass'),
+                                 parameter_group.get('StorageIops'))
+
+
+def parameter_group_export_name(stack_name):
+    return Join("-", [stack_name, "parameter-group"])
+
+
+def parameter_group_output(parameter_group):
+    """Exports the name of a parameter group, other stacks use it with shared_parameter_group"""
+    return Output(
+        "ParameterGroupName",
+        Value=Ref(parameter_group),
+        Export=Export(parameter_group_export_name(StackName))
+    )
+
+
+def shared_parameter_group(sceptre_user_data):
+    """Name of the parameter group exported by the stack in the SharedParameterGroupStack key, None without it
+
+    SharedParameterGroupStack: hive-dev-rds-parameter-group
+    """
+    stack_name = (sceptre_user_data or {}).get('SharedParameterGroupStack')
+    if not stack_name:
+        return None
+    return ImportValue(parameter_group_export_name(stack_name))